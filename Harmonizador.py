@@ -1,145 +1,942 @@
-import random
-import tkinter as tk
-from tkinter import ttk, messagebox, scrolledtext
+import csv
+import html
+import importlib
+import io
+import itertools
 import json
+import os
+import random
+import re
+import string
+import sys
+import threading
+import time
+import weakref
+from bisect import bisect_left
+from collections import OrderedDict, deque
 from datetime import datetime
-import requests  # For API simulation
+from functools import partial, wraps
+from types import MappingProxyType
+
+# tkinter (harmonizador_gui), requests (harmonizador_http), asyncio and
+# concurrent.futures are only imported when the code that needs them runs,
+# so engine-only users start fast and work on hosts without a display.
+_EXPORTACOES_TARDIAS = {
+    "HarmonizadorApp": "harmonizador_gui",
+    "INTERVALO_ATUALIZACAO_MS": "harmonizador_gui",
+    "ClientePrecosHttp": "harmonizador_http",
+    "ServidorPrecosLocal": "harmonizador_http",
+    "PontuadorHarmonizacao": "harmonizador_pontuacao",
+    "ArmazemCatalogo": "harmonizador_catalogo",
+    "CatalogoCompilado": "harmonizador_catalogo",
+    "compilar_catalogo": "harmonizador_catalogo",
+    "carregar_catalogo": "harmonizador_catalogo",
+}
+
+def __getattr__(nome):
+    modulo = _EXPORTACOES_TARDIAS.get(nome)
+    if modulo is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {nome!r}")
+    return getattr(importlib.import_module(modulo), nome)
+
+# ================== INSTRUMENTAÇÃO ==================
+# Upper bounds, in seconds, of the latency histogram buckets (plus +Inf)
+LIMITES_LATENCIA = (0.000005, 0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025,
+                    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+class Instrumentacao:
+    """Per-stage call counters and latency histograms of menu generation.
+
+    Stages are the functions wrapped with ``medir``; while ``ativa`` is
+    False a wrapped call costs one attribute check. ``prometheus()`` and
+    ``json()`` export a snapshot; ``coletar``/``mesclar`` move raw data
+    between processes.
+    """
+
+    def __init__(self):
+        self.ativa = False
+        self._lock = threading.Lock()
+        self._etapas = {}   # etapa -> [contagem, erros, soma, maximo, buckets]
+
+    def ativar(self, ativa=True):
+        self.ativa = ativa
+
+    def desativar(self):
+        self.ativa = False
+
+    def registrar(self, etapa, duracao, erro=False):
+        posicao = bisect_left(LIMITES_LATENCIA, duracao)
+        with self._lock:
+            dados = self._etapas.get(etapa)
+            if dados is None:
+                dados = self._etapas[etapa] = [0, 0, 0.0, 0.0, [0] * (len(LIMITES_LATENCIA) + 1)]
+            dados[0] += 1
+            dados[1] += erro
+            dados[2] += duracao
+            dados[3] = max(dados[3], duracao)
+            dados[4][posicao] += 1
+
+    def zerar(self):
+        with self._lock:
+            self._etapas.clear()
+
+    def coletar(self, zerar=False):
+        """Raw copy of every stage, picklable; optionally resets the counters"""
+        with self._lock:
+            dados = {etapa: (c, e, s, m, tuple(b)) for etapa, (c, e, s, m, b) in self._etapas.items()}
+            if zerar:
+                self._etapas.clear()
+        return dados
+
+    def mesclar(self, dados):
+        """Adds the output of another process's ``coletar``"""
+        with self._lock:
+            for etapa, (contagem, erros, soma, maximo, buckets) in dados.items():
+                atual = self._etapas.get(etapa)
+                if atual is None:
+                    atual = self._etapas[etapa] = [0, 0, 0.0, 0.0, [0] * (len(LIMITES_LATENCIA) + 1)]
+                atual[0] += contagem
+                atual[1] += erros
+                atual[2] += soma
+                atual[3] = max(atual[3], maximo)
+                atual[4] = [a + b for a, b in zip(atual[4], buckets)]
+
+    @staticmethod
+    def _quantil(q, contagem, maximo, buckets):
+        # Linear interpolation inside the bucket, as Prometheus' histogram_quantile
+        alvo = q * contagem
+        acumulado = 0
+        for i, quantidade in enumerate(buckets):
+            if quantidade and acumulado + quantidade >= alvo:
+                if i == len(LIMITES_LATENCIA):
+                    return maximo
+                inferior = LIMITES_LATENCIA[i - 1] if i else 0.0
+                superior = min(LIMITES_LATENCIA[i], maximo)
+                return inferior + (superior - inferior) * (alvo - acumulado) / quantidade
+            acumulado += quantidade
+        return 0.0
+
+    def instantaneo(self):
+        """Per-stage summary with p50/p99 estimated from the histogram, in milliseconds"""
+        resumo = {}
+        for etapa, (contagem, erros, soma, maximo, buckets) in sorted(self.coletar().items()):
+            resumo[etapa] = {
+                "contagem": contagem,
+                "erros": erros,
+                "total_ms": round(soma * 1000, 3),
+                "media_ms": round(soma * 1000 / contagem, 4) if contagem else 0.0,
+                "p50_ms": round(self._quantil(0.5, contagem, maximo, buckets) * 1000, 4),
+                "p99_ms": round(self._quantil(0.99, contagem, maximo, buckets) * 1000, 4),
+                "max_ms": round(maximo * 1000, 4),
+                "buckets": dict(zip([str(l) for l in LIMITES_LATENCIA] + ["+Inf"], buckets)),
+            }
+        return resumo
+
+    def json(self):
+        return json.dumps(self.instantaneo(), ensure_ascii=False, indent=2)
+
+    def prometheus(self):
+        """Snapshot in the Prometheus text exposition format"""
+        linhas = [
+            "# HELP harmonizador_etapa_segundos Latência das etapas da geração de menus.",
+            "# TYPE harmonizador_etapa_segundos histogram",
+        ]
+        dados = sorted(self.coletar().items())
+        for etapa, (contagem, _, soma, _, buckets) in dados:
+            acumulado = 0
+            for limite, quantidade in zip(LIMITES_LATENCIA + (None,), buckets):
+                acumulado += quantidade
+                le = "+Inf" if limite is None else repr(limite)
+                linhas.append(f'harmonizador_etapa_segundos_bucket{{etapa="{etapa}",le="{le}"}} {acumulado}')
+            linhas.append(f'harmonizador_etapa_segundos_sum{{etapa="{etapa}"}} {soma!r}')
+            linhas.append(f'harmonizador_etapa_segundos_count{{etapa="{etapa}"}} {contagem}')
+        linhas += [
+            "# HELP harmonizador_etapa_erros_total Chamadas das etapas que terminaram em exceção.",
+            "# TYPE harmonizador_etapa_erros_total counter",
+        ]
+        linhas += [f'harmonizador_etapa_erros_total{{etapa="{etapa}"}} {erros}'
+                   for etapa, (_, erros, _, _, _) in dados]
+        return "\n".join(linhas) + "\n"
+
+    def exportar(self, formato="prometheus"):
+        return self.prometheus() if formato == "prometheus" else self.json()
+
+instrumentacao = Instrumentacao()
+
+def medir(etapa):
+    """Decorator recording each call under ``etapa`` while instrumentacao is on"""
+    def decorar(funcao):
+        @wraps(funcao)
+        def medida(*args, **kwargs):
+            if not instrumentacao.ativa:
+                return funcao(*args, **kwargs)
+            inicio = time.perf_counter()
+            erro = True
+            try:
+                resultado = funcao(*args, **kwargs)
+                erro = False
+                return resultado
+            finally:
+                instrumentacao.registrar(etapa, time.perf_counter() - inicio, erro)
+        return medida
+    return decorar
+
+def capturar_perfil(funcao, *args, memoria=True, linhas=25, **kwargs):
+    """Runs one call under cProfile (and tracemalloc); returns (resultado, relatorio).
+
+    Only the calling thread is profiled, so run the whole request in it.
+    """
+    import cProfile
+    import pstats
+    import tracemalloc
+    rastrear = memoria and not tracemalloc.is_tracing()
+    if rastrear:
+        tracemalloc.start()
+    perfil = cProfile.Profile()
+    try:
+        perfil.enable()
+        try:
+            resultado = funcao(*args, **kwargs)
+        finally:
+            perfil.disable()
+        if memoria:
+            atual, pico = tracemalloc.get_traced_memory()
+            alocacoes = tracemalloc.take_snapshot().statistics("lineno")[:10]
+    finally:
+        if rastrear:
+            tracemalloc.stop()
+
+    relatorio = io.StringIO()
+    pstats.Stats(perfil, stream=relatorio).sort_stats("cumulative").print_stats(linhas)
+    if memoria:
+        relatorio.write(f"Memória: atual {atual / 1024:.1f} KiB, pico {pico / 1024:.1f} KiB\n")
+        for estatistica in alocacoes:
+            relatorio.write(f"  {estatistica}\n")
+    return resultado, relatorio.getvalue()
 
 # ================== MOCK API FOR ONLINE SEARCHES ==================
+MOCK_API_DATA = {
+    "pratos": {
+        "Bruschetta": {"preco": 35, "gastronomia": "italiana"},
+        "Carpaccio": {"preco": 45, "gastronomia": "europeia"},
+        "Tábua de Queijos": {"preco": 60, "gastronomia": "francesa"},
+        "Filé Mignon": {"preco": 90, "gastronomia": "francesa"},
+        "Risoto de Funghi": {"preco": 65, "gastronomia": "italiana"},
+        "Salmão Grelhado": {"preco": 80, "gastronomia": "mediterrânea"},
+        "Petit Gateau": {"preco": 30, "gastronomia": "francesa"},
+    },
+    "bebidas": {
+        "Prosecco": {"preco": 130, "harmonizacao": ["Aperitivos", "Queijos"], "categoria": "vinhos"},
+        "Malbec": {"preco": 260, "harmonizacao": ["Carnes", "Pratos fortes"], "categoria": "vinhos"},
+        "Sauvignon Blanc": {"preco": 160, "harmonizacao": ["Peixes", "Saladas"], "categoria": "vinhos"},
+        "IPA": {"preco": 30, "harmonizacao": ["Pratos fortes", "Carnes"], "categoria": "cervejas"},
+        "Weissbier": {"preco": 25, "harmonizacao": ["Entradas", "Pratos leves"], "categoria": "cervejas"},
+        "Porto": {"preco": 85, "harmonizacao": ["Sobremesas", "Doces"], "categoria": "digestivos"},
+        "Amaretto": {"preco": 70, "harmonizacao": ["Doces", "Sobremesas"], "categoria": "digestivos"},
+        "Mocktail de Frutas": {"preco": 20, "harmonizacao": ["Sobremesas", "Pratos leves"], "categoria": "sem_alcool"},
+        "Suco de Uva": {"preco": 15, "harmonizacao": ["Geral"], "categoria": "sem_alcool"},
+    },
+    "gastronomias": {
+        "italiana": ["Bruschetta", "Risoto de Funghi"],
+        "francesa": ["Tábua de Queijos", "Filé Mignon", "Petit Gateau"],
+        "mediterrânea": ["Salmão Grelhado"],
+    }
+}
+
+# Prices used when the pricing API does not know an item or fails to answer
+PRECO_PADRAO_PRATO = 50
+PRECO_PADRAO_BEBIDA = 30
+
+def _congelar(valor):
+    """Read-only copy of an API document: dicts become mapping proxies, lists tuples"""
+    if isinstance(valor, (dict, MappingProxyType)):
+        return MappingProxyType({chave: _congelar(v) for chave, v in valor.items()})
+    if isinstance(valor, (list, tuple)):
+        return tuple(_congelar(v) for v in valor)
+    return valor
+
+class CatalogoOnline:
+    """Price/pairing catalog loaded once, with precomputed lookup indexes.
+
+    Answers the same ``prato=`` / ``bebida=`` / ``gastronomia=`` queries as
+    ``fetch_online_data`` with a single dict lookup each; every response is
+    built at load time, so the hot path does not allocate. Responses are
+    read-only (mapping proxies and tuples), so one caller cannot change what
+    the next one sees; copy with ``dict(...)`` to edit.
+    """
+
+    def __init__(self, dados=None):
+        self.dados = _congelar(dados if dados is not None else MOCK_API_DATA)
+        self.pratos = dict(self.dados["pratos"])
+        self.bebidas = dict(self.dados["bebidas"])
+        self.prato_desconhecido = _congelar({"preco": PRECO_PADRAO_PRATO, "gastronomia": "desconhecida"})
+        self.bebida_desconhecida = _congelar({"preco": PRECO_PADRAO_BEBIDA, "harmonizacao": ["Geral"],
+                                              "categoria": "desconhecida"})
+
+        # Cuisine -> ready response, same shape fetch_online_data returns
+        bebidas_sugeridas = self.dados["bebidas"]
+        self.gastronomias = {
+            nome: MappingProxyType({"pratos": pratos, "bebidas_sugeridas": bebidas_sugeridas})
+            for nome, pratos in self.dados["gastronomias"].items()
+        }
+        self.gastronomia_desconhecida = MappingProxyType({"pratos": (), "bebidas_sugeridas": bebidas_sugeridas})
+
+        # Pairing tag -> drink names, drink category -> drink names
+        por_harmonizacao = {}
+        por_categoria = {}
+        for nome, info in self.bebidas.items():
+            for tag in info.get("harmonizacao", ()):
+                por_harmonizacao.setdefault(tag, []).append(nome)
+            por_categoria.setdefault(info.get("categoria"), []).append(nome)
+        self.por_harmonizacao = {tag: tuple(nomes) for tag, nomes in por_harmonizacao.items()}
+        self.por_categoria = {cat: tuple(nomes) for cat, nomes in por_categoria.items()}
+
+    def buscar(self, prato=None, bebida=None, gastronomia=None):
+        if prato:
+            return self.pratos.get(prato, self.prato_desconhecido)
+        if bebida:
+            return self.bebidas.get(bebida, self.bebida_desconhecida)
+        if gastronomia:
+            return self.gastronomias.get(gastronomia, self.gastronomia_desconhecida)
+        return self.dados
+
+    def bebidas_por_harmonizacao(self, tag):
+        return self.por_harmonizacao.get(tag, ())
+
+    def buscar_lote(self, pratos=(), bebidas=()):
+        return {
+            "pratos": {nome: self.pratos.get(nome, self.prato_desconhecido) for nome in pratos},
+            "bebidas": {nome: self.bebidas.get(nome, self.bebida_desconhecida) for nome in bebidas},
+        }
+
+    def bebidas_por_categoria(self, categoria):
+        return self.por_categoria.get(categoria, ())
+
+catalogo_online = CatalogoOnline()
+
+# Any object with buscar(prato=, bebida=, gastronomia=); see configurar_fonte_precos
+fonte_precos = catalogo_online
+
+def configurar_fonte_precos(fonte):
+    """Points fetch_online_data at another pricing source; returns the previous one"""
+    global fonte_precos
+    anterior = fonte_precos
+    fonte_precos = fonte
+    # Pairing data comes from the same source
+    recarregar_catalogo()
+    return anterior
+
+@medir("fetch_online_data")
 def fetch_online_data(prato=None, bebida=None, gastronomia=None):
     """Simulates fetching data from an online API for prices and pairings"""
-    mock_api_data = {
-        "pratos": {
-            "Bruschetta": {"preco": 35, "gastronomia": "italiana"},
-            "Carpaccio": {"preco": 45, "gastronomia": "europeia"},
-            "Tábua de Queijos": {"preco": 60, "gastronomia": "francesa"},
-            "Filé Mignon": {"preco": 90, "gastronomia": "francesa"},
-            "Risoto de Funghi": {"preco": 65, "gastronomia": "italiana"},
-            "Salmão Grelhado": {"preco": 80, "gastronomia": "mediterrânea"},
-            "Petit Gateau": {"preco": 30, "gastronomia": "francesa"},
-        },
-        "bebidas": {
-            "Prosecco": {"preco": 130, "harmonizacao": ["Aperitivos", "Queijos"], "categoria": "vinhos"},
-            "Malbec": {"preco": 260, "harmonizacao": ["Carnes", "Pratos fortes"], "categoria": "vinhos"},
-            "Sauvignon Blanc": {"preco": 160, "harmonizacao": ["Peixes", "Saladas"], "categoria": "vinhos"},
-            "IPA": {"preco": 30, "harmonizacao": ["Pratos fortes", "Carnes"], "categoria": "cervejas"},
-            "Weissbier": {"preco": 25, "harmonizacao": ["Entradas", "Pratos leves"], "categoria": "cervejas"},
-            "Porto": {"preco": 85, "harmonizacao": ["Sobremesas", "Doces"], "categoria": "digestivos"},
-            "Amaretto": {"preco": 70, "harmonizacao": ["Doces", "Sobremesas"], "categoria": "digestivos"},
-            "Mocktail de Frutas": {"preco": 20, "harmonizacao": ["Sobremesas", "Pratos leves"], "categoria": "sem_alcool"},
-            "Suco de Uva": {"preco": 15, "harmonizacao": ["Geral"], "categoria": "sem_alcool"},
-        },
-        "gastronomias": {
-            "italiana": ["Bruschetta", "Risoto de Funghi"],
-            "francesa": ["Tábua de Queijos", "Filé Mignon", "Petit Gateau"],
-            "mediterrânea": ["Salmão Grelhado"],
-        }
-    }
-    
     try:
+        return fonte_precos.buscar(prato=prato, bebida=bebida, gastronomia=gastronomia)
+    except Exception as e:
+        return {"erro": f"Falha na busca online: {str(e)}"}
+
+@medir("fetch_online_data_lote")
+def fetch_online_data_lote(pratos=(), bebidas=()):
+    """Prices several dishes and drinks in one call when the source supports it.
+
+    Returns ``{"pratos": {nome: dados}, "bebidas": {nome: dados}}``.
+    """
+    try:
+        buscar_lote = getattr(fonte_precos, "buscar_lote", None)
+        if buscar_lote is not None:
+            return buscar_lote(pratos=pratos, bebidas=bebidas)
+        return {
+            "pratos": {nome: fonte_precos.buscar(prato=nome) for nome in pratos},
+            "bebidas": {nome: fonte_precos.buscar(bebida=nome) for nome in bebidas},
+        }
+    except Exception as e:
+        return {"erro": f"Falha na busca online: {str(e)}"}
+
+# ================== CACHE DE PREÇOS ==================
+class CachePrecos:
+    """Thread-safe TTL + LRU cache in front of a pricing source.
+
+    Unknown items (the ``desconhecida`` fallbacks) are cached too, with their
+    own shorter TTL. An expired entry is still served for ``janela_stale``
+    seconds while a single background refresh runs, so a hot key never
+    blocks on the backend. Error responses are never cached.
+
+        configurar_fonte_precos(CachePrecos(fonte=catalogo_online, ttl=300))
+    """
+
+    def __init__(self, fonte=None, ttl=300.0, ttl_negativo=60.0, janela_stale=600.0,
+                 max_itens=10000, relogio=time.monotonic):
+        self.fonte = fonte or catalogo_online
+        self.ttl = ttl
+        self.ttl_negativo = ttl_negativo
+        self.janela_stale = janela_stale
+        self.max_itens = max_itens
+        self.relogio = relogio
+        self._itens = OrderedDict()     # chave -> (valor, expira_em)
+        self._lock = threading.Lock()
+        self._revalidando = set()
+        self._executor = None
+        self.hits = 0
+        self.misses = 0
+        self.stale_hits = 0
+        self.evictions = 0
+        self.revalidacoes = 0
+        # Bumped when a refresh brings a different value; see versao_dados
+        self.versao = 0
+
+    @staticmethod
+    def _chave(prato, bebida, gastronomia):
         if prato:
-            return mock_api_data["pratos"].get(prato, {"preco": 50, "gastronomia": "desconhecida"})
+            return ("prato", prato)
         if bebida:
-            return mock_api_data["bebidas"].get(bebida, {"preco": 30, "harmonizacao": ["Geral"], "categoria": "desconhecida"})
+            return ("bebida", bebida)
         if gastronomia:
+            return ("gastronomia", gastronomia)
+        return None
+
+    @staticmethod
+    def _desconhecido(valor):
+        return (valor.get("gastronomia") == "desconhecida" or valor.get("categoria") == "desconhecida"
+                or ("pratos" in valor and not valor["pratos"]))
+
+    def _ler(self, chave):
+        """Cached value for ``chave`` or None on a miss; schedules stale refreshes"""
+        agora = self.relogio()
+        revalidar = False
+        with self._lock:
+            item = self._itens.get(chave)
+            if item is None:
+                self.misses += 1
+                return None
+            valor, expira_em = item
+            if agora < expira_em:
+                self._itens.move_to_end(chave)
+                self.hits += 1
+                return valor
+            if agora >= expira_em + self.janela_stale:
+                self.misses += 1
+                return None
+            self._itens.move_to_end(chave)
+            self.stale_hits += 1
+            if chave not in self._revalidando:
+                self._revalidando.add(chave)
+                revalidar = True
+        if revalidar:
+            self._agendar_revalidacao(chave)
+        return valor
+
+    def buscar(self, prato=None, bebida=None, gastronomia=None):
+        chave = self._chave(prato, bebida, gastronomia)
+        if chave is None:
+            return self.fonte.buscar()
+
+        valor = self._ler(chave)
+        if valor is None:
+            valor = self._consultar(chave)
+            self._guardar(chave, valor)
+        return valor
+
+    def buscar_lote(self, pratos=(), bebidas=()):
+        """Serves cached entries and fetches all misses with one bulk lookup"""
+        resultado = {"pratos": {}, "bebidas": {}}
+        faltam = {"pratos": [], "bebidas": []}
+        for grupo, tipo, nomes in (("pratos", "prato", pratos), ("bebidas", "bebida", bebidas)):
+            for nome in nomes:
+                valor = self._ler((tipo, nome))
+                if valor is None:
+                    faltam[grupo].append(nome)
+                else:
+                    resultado[grupo][nome] = valor
+
+        if faltam["pratos"] or faltam["bebidas"]:
+            buscar_lote = getattr(self.fonte, "buscar_lote", None)
+            if buscar_lote is not None:
+                obtidos = buscar_lote(pratos=faltam["pratos"], bebidas=faltam["bebidas"])
+            else:
+                obtidos = {
+                    "pratos": {nome: self.fonte.buscar(prato=nome) for nome in faltam["pratos"]},
+                    "bebidas": {nome: self.fonte.buscar(bebida=nome) for nome in faltam["bebidas"]},
+                }
+            if "erro" in obtidos:
+                return obtidos
+            for grupo, tipo in (("pratos", "prato"), ("bebidas", "bebida")):
+                for nome, valor in obtidos.get(grupo, {}).items():
+                    self._guardar((tipo, nome), valor)
+                    resultado[grupo][nome] = valor
+        return resultado
+
+    def _consultar(self, chave):
+        tipo, nome = chave
+        return self.fonte.buscar(**{tipo: nome})
+
+    def _guardar(self, chave, valor):
+        if "erro" in valor:
+            return
+        ttl = self.ttl_negativo if self._desconhecido(valor) else self.ttl
+        with self._lock:
+            anterior = self._itens.get(chave)
+            if anterior is not None and anterior[0] != valor:
+                self.versao += 1
+            self._itens[chave] = (valor, self.relogio() + ttl)
+            self._itens.move_to_end(chave)
+            while len(self._itens) > self.max_itens:
+                self._itens.popitem(last=False)
+                self.evictions += 1
+
+    def _agendar_revalidacao(self, chave):
+        with self._lock:
+            if self._executor is None:
+                from concurrent.futures import ThreadPoolExecutor
+                self._executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="precos")
+        self._executor.submit(self._revalidar, chave)
+
+    def _revalidar(self, chave):
+        try:
+            self._guardar(chave, self._consultar(chave))
+            with self._lock:
+                self.revalidacoes += 1
+        except Exception:
+            pass  # keep serving the stale value until the next attempt
+        finally:
+            with self._lock:
+                self._revalidando.discard(chave)
+
+    def limpar(self):
+        with self._lock:
+            self._itens.clear()
+            self.versao += 1
+
+    def estatisticas(self):
+        with self._lock:
             return {
-                "pratos": mock_api_data["gastronomias"].get(gastronomia, []),
-                "bebidas_sugeridas": mock_api_data["bebidas"]
+                "itens": len(self._itens),
+                "max_itens": self.max_itens,
+                "hits": self.hits,
+                "misses": self.misses,
+                "stale_hits": self.stale_hits,
+                "evictions": self.evictions,
+                "revalidacoes": self.revalidacoes,
+                "versao": self.versao,
             }
-        return mock_api_data
-    except Exception as e:
-        return {"erro": f"Falha na busca online: {str(e)}"}
+
+# ================== REGISTROS IMUTÁVEIS DO CATÁLOGO ==================
+class Registro:
+    """Immutable catalog entry with __slots__ and read-only dict-style access.
+
+    ``registro["nome"]`` and ``registro.get("nome")`` keep working for code
+    written against the old dict entries; changes go through ``com()``,
+    which returns a new record and leaves the shared one untouched.
+    """
+    __slots__ = ()
+    padroes = {}
+
+    def __init__(self, *args, **kwargs):
+        valores = dict(zip(self.__slots__, args), **kwargs)
+        for campo in self.__slots__:
+            object.__setattr__(self, campo, valores.pop(campo, self.padroes.get(campo)))
+        if valores:
+            raise TypeError(f"Campos desconhecidos para {type(self).__name__}: {', '.join(valores)}")
+
+    @classmethod
+    def de_dict(cls, dados):
+        return dados if isinstance(dados, cls) else cls(**dados)
+
+    def __setattr__(self, campo, valor):
+        raise AttributeError(f"{type(self).__name__} é imutável; use com({campo}=...)")
+
+    def __delattr__(self, campo):
+        raise AttributeError(f"{type(self).__name__} é imutável")
+
+    def __getitem__(self, campo):
+        if campo in self.__slots__:
+            return getattr(self, campo)
+        raise KeyError(campo)
+
+    def __contains__(self, campo):
+        return campo in self.__slots__
+
+    def get(self, campo, padrao=None):
+        if campo in self.__slots__:
+            return getattr(self, campo)
+        return padrao
+
+    def valores(self):
+        return tuple(getattr(self, campo) for campo in self.__slots__)
+
+    def com(self, **alteracoes):
+        return type(self)(**dict(self.as_dict(), **alteracoes))
+
+    def as_dict(self):
+        return {campo: getattr(self, campo) for campo in self.__slots__}
+
+    def __eq__(self, outro):
+        return type(self) is type(outro) and self.valores() == outro.valores()
+
+    def __hash__(self):
+        return hash((type(self), self.valores()))
+
+    def __reduce__(self):
+        return (type(self), self.valores())
+
+    def __repr__(self):
+        campos = ", ".join(f"{c}={getattr(self, c)!r}" for c in self.__slots__)
+        return f"{type(self).__name__}({campos})"
+
+class Prato(Registro):
+    __slots__ = ("nome", "tipo", "dieta", "intensidade")
+
+class Sobremesa(Registro):
+    __slots__ = ("nome", "tipo", "dieta", "intensidade", "harmonizacao", "dica_servico")
+
+class Bebida(Registro):
+    __slots__ = ("nome", "tipo", "intensidade", "harmonizacao")
+    padroes = {"harmonizacao": "Geral"}
+
+class PresetOcasiao(Registro):
+    __slots__ = ("cozinha", "dieta_entrada", "dieta_principal", "bebida", "sugestao_especial",
+                 "intensidade", "orcamento")
+    padroes = {"bebida": "vinhos"}
+
+class BebidaSugerida(Registro):
+    """A drink priced for one menu; reads fall through to the catalog record"""
+    __slots__ = ("bebida", "preco")
+
+    def __init__(self, bebida, preco):
+        # Built four times per menu: skip the generic keyword handling
+        object.__setattr__(self, "bebida", bebida)
+        object.__setattr__(self, "preco", preco)
+
+    def __getitem__(self, campo):
+        if campo == "preco":
+            return self.preco
+        return self.bebida[campo]
+
+    def __contains__(self, campo):
+        return campo == "preco" or campo in self.bebida
+
+    def get(self, campo, padrao=None):
+        if campo == "preco":
+            return self.preco
+        return self.bebida.get(campo, padrao)
+
+    def __getattr__(self, campo):
+        # Only reached for names that are not slots, e.g. ``sugerida.nome``
+        if campo.startswith("__"):
+            raise AttributeError(campo)
+        return getattr(self.bebida, campo)
+
+# Bumped after every ListaCatalogo mutation; part of the catalog signature
+_edicoes_catalogo = 0
+
+def _catalogo_editado():
+    global _edicoes_catalogo
+    _edicoes_catalogo += 1
+
+class ListaCatalogo(list):
+    """List of catalog records that reports its in-place changes.
+
+    Records are immutable, so ``lista[i] = item.com(...)``, append, del and
+    the other list mutations are the only ways to edit a catalog; each one
+    bumps the version the dish index, the pairing matrix and versao_dados()
+    are keyed on.
+    """
+    __slots__ = ()
+
+def _mutacao(nome):
+    original = getattr(list, nome)
+
+    def mutar(self, *args, **kwargs):
+        resultado = original(self, *args, **kwargs)
+        _catalogo_editado()
+        return resultado
+    mutar.__name__ = nome
+    return mutar
+
+for _nome in ("__setitem__", "__delitem__", "__iadd__", "__imul__", "append", "extend", "insert", "pop",
+              "remove", "clear", "sort", "reverse"):
+    setattr(ListaCatalogo, _nome, _mutacao(_nome))
+del _nome
+
+def _listas_catalogo(secoes):
+    # Mapped tables stay read-only views; adicionar/remover_prato copy one on its first edit
+    return {categoria: itens if isinstance(itens, ListaCatalogo) or hasattr(itens, "coluna")
+            else ListaCatalogo(itens) for categoria, itens in secoes.items()}
+
+PRESET_PADRAO = PresetOcasiao(
+    cozinha=None,
+    dieta_entrada=None,
+    dieta_principal=None,
+    bebida="vinhos",
+    sugestao_especial="Sugestão personalizada do chef"
+)
+
+# ================== SORTEIO REPRODUTÍVEL ==================
+def semente_de(*partes):
+    """Stable 64-bit seed from ints and strings, e.g. a request id or (seed, chunk)"""
+    if len(partes) == 1 and isinstance(partes[0], int) and partes[0] >= 0:
+        return partes[0]
+    import hashlib
+    resumo = hashlib.sha256("\x1f".join(map(str, partes)).encode("utf-8")).digest()
+    return int.from_bytes(resumo[:8], "little")
+
+def rng_para(semente=None):
+    """Independent random.Random for one request; unseeded when ``semente`` is None"""
+    return random.Random(None if semente is None else semente_de(semente))
+
+def _numpy():
+    # Optional: batch sampling falls back to random.Random without NumPy
+    try:
+        import numpy
+    except ImportError:
+        return None
+    return numpy
+
+class AmostradorLote:
+    """Draws the choices of a whole batch of menus at once.
+
+    Candidate lists are resolved once per distinct key (course, cuisine and
+    diet, or dish and drink type) and a single NumPy ``Generator.integers``
+    call draws one index per menu. Without NumPy a seeded random.Random is
+    used, so results stay deterministic either way (but differ between the two).
+    """
+
+    def __init__(self, semente=None):
+        semente = None if semente is None else semente_de(semente)
+        self.np = _numpy()
+        self.gerador = self.np.random.default_rng(semente) if self.np is not None else None
+        self.rng = random.Random(semente)
+
+    def escolher(self, chaves, candidatos):
+        """One draw per entry of ``chaves``; ``candidatos(chave)`` runs once per distinct key"""
+        codigos = {}
+        por_item = [codigos.setdefault(chave, len(codigos)) for chave in chaves]
+        listas = [candidatos(chave) for chave in codigos]
+        if self.gerador is None:
+            return [opcoes[self.rng.randrange(len(opcoes))] for opcoes in map(listas.__getitem__, por_item)]
+
+        # One integers() call draws the whole batch, each within its own list
+        np = self.np
+        tamanhos = np.fromiter(map(len, listas), dtype=np.int64, count=len(listas))
+        por_item = np.fromiter(por_item, dtype=np.int64, count=len(por_item))
+        sorteio = self.gerador.integers(0, tamanhos[por_item])
+        # Indexed per list: candidates may be mapped tables, built only when drawn
+        return [listas[k][i] for k, i in zip(por_item.tolist(), sorteio.tolist())]
+
+# ================== INTERPRETAÇÃO DE PEDIDOS ==================
+# Field -> value -> synonyms, written without accents (the text is normalized the same way)
+LEXICO_PEDIDOS = {
+    "dieta": {
+        "vegetariana": ("vegetariano", "vegetariana", "vegetarianos", "vegetarianas", "veggie", "sem carne"),
+        "vegana": ("vegano", "vegana", "veganos", "veganas", "plant based", "sem nada de origem animal"),
+        "carnes": ("carne", "carnes", "carne vermelha", "churrasco", "bife", "steak"),
+        "peixes": ("peixe", "peixes", "frutos do mar", "pescado", "salmao", "camarao"),
+    },
+    "cozinha": {
+        "italiana": ("italiana", "italiano", "italia", "massa", "massas", "risoto", "pizza"),
+        "francesa": ("francesa", "frances", "franca", "bistro"),
+        "mediterrânea": ("mediterranea", "mediterraneo", "grega", "grego"),
+        "europeia": ("europeia", "europeu"),
+        "brasileira": ("brasileira", "brasileiro", "caseira", "comida caseira"),
+        "internacional": ("internacional",),
+    },
+    "bebida": {
+        "vinhos": ("vinho", "vinhos", "tinto", "branco", "rose", "espumante", "prosecco", "champanhe"),
+        "cervejas": ("cerveja", "cervejas", "chope", "chopp", "breja", "ipa", "cerveja artesanal"),
+        "sem_alcool": ("sem alcool", "nao alcoolico", "nao alcoolica", "zero alcool", "suco", "sucos",
+                       "refrigerante", "mocktail", "nao bebo"),
+        "digestivos": ("digestivo", "digestivos", "licor", "licores"),
+    },
+    "intensidade": {
+        "leve": ("leve", "leves", "light", "suave", "suaves", "refeicao leve"),
+        "média": ("equilibrado", "equilibrada", "confort food", "comfort food"),
+        "alta": ("intenso", "intensa", "forte", "fortes", "encorpado", "encorpada", "marcante"),
+    },
+    # Terms after a negation are ignored ("não quero carne", "nada de peixe nem carne") as long as
+    # only connectors and intensifiers sit between them; any other word or punctuation ends it.
+    # "sem carne" and "sem álcool" are synonyms above and win as the longer match
+    "negacao": {
+        "marcador": ("nao", "nao quero", "nao gosto de", "nao como", "nada de", "sem", "nem", "evitar",
+                     "evite", "exceto"),
+        "ligacao": ("e", "ou", "muito", "muita", "muitos", "muitas", "tao", "tanto", "tanta", "demais",
+                    "de", "do", "da", "dos", "das", "o", "a", "os", "as", "um", "uma", "algo", "nada",
+                    "comida", "bebida"),
+    },
+    # A number right after a prefix or right before a suffix is the budget, unless
+    # a quantity unit follows it ("até 4 pessoas")
+    "orcamento": {
+        "prefixo": ("r$", "rs", "ate", "orcamento", "orcamento de", "maximo", "no maximo", "limite", "gastar"),
+        "sufixo": ("reais", "real", "conto", "contos"),
+        "quantidade": ("pessoa", "pessoas", "convidado", "convidados", "garrafa", "garrafas", "prato", "pratos",
+                       "anos"),
+    },
+}
+
+_SEM_ACENTO = str.maketrans("áàâãäéèêëíìîïóòôõöúùûüç", "aaaaaeeeeiiiiooooouuuuc")
+
+def _normalizar(texto):
+    return texto.lower().translate(_SEM_ACENTO)
+
+def _regex_trie(no):
+    """Regex matching every word of a trie; longer words are tried first"""
+    ramos = [re.escape(letra) + _regex_trie(filho) for letra, filho in sorted(no.items()) if letra]
+    if not ramos:
+        return ""
+    corpo = ramos[0] if len(ramos) == 1 else "(?:" + "|".join(ramos) + ")"
+    if "" in no:
+        return f"(?:{corpo})?"
+    return corpo
+
+def _numero(texto):
+    # "1.500" and "1.500,00" are Brazilian thousands; "99.90" a decimal point
+    if "," in texto:
+        texto = texto.replace(".", "").replace(",", ".")
+    elif re.fullmatch(r"\d{1,3}(?:\.\d{3})+", texto):
+        texto = texto.replace(".", "")
+    try:
+        return float(texto)
+    except ValueError:
+        return None
+
+class InterpretadorPedidos:
+    """Extracts diet, cuisine, drink type, intensity and budget from free text.
+
+    The lexicon's synonyms are compiled once into a trie, emitted as a single
+    regular expression with word boundaries, so a request is scanned in one
+    pass by the regex engine whatever the lexicon size; each match is one
+    dict lookup. Numbers are captured in the same pass and become the budget
+    when they sit next to a budget prefix or suffix. Preferences inside a
+    negation's scope are dropped rather than read as requests.
+    """
+
+    def __init__(self, lexico=None):
+        self.lexico = LEXICO_PEDIDOS if lexico is None else lexico
+        self.termos = {}   # normalized synonym -> (campo, valor)
+        trie = {}
+        for campo, valores in self.lexico.items():
+            for valor, sinonimos in valores.items():
+                for sinonimo in sinonimos:
+                    termo = " ".join(_normalizar(sinonimo).split())
+                    self.termos.setdefault(termo, (campo, valor))
+                    no = trie
+                    for letra in termo:
+                        no = no.setdefault(letra, {})
+                    no[""] = {}
+        # A term ends on a word boundary unless its last character is not a word character ("r$")
+        self.padrao = re.compile(
+            r"(?<!\w)(?P<termo>" + (_regex_trie(trie) or "(?!)") + r")(?:(?<=\w)(?!\w)|(?<!\w))"
+            r"|(?<![\w.,])(?P<numero>\d+(?:[.,]\d+)*)")
+        self._espaco = re.compile(r"\s+")
+
+    def interpretar(self, *textos):
+        """Fields found in ``textos``; later texts override earlier ones, first mention wins within one"""
+        intencao = {}
+        for texto in textos:
+            if texto:
+                for campo, valor in self._interpretar(texto).items():
+                    intencao[campo] = valor
+        return intencao
+
+    def _interpretar(self, texto):
+        encontrados = {}
+        anterior = None       # (campo, valor, fim) of the term just before
+        candidato = None      # (numero, fim, after a budget prefix) waiting for the next term
+        negacao = None        # end of the negation scope so far, while one is open
+
+        def fechar():
+            if candidato is not None and candidato[2] and candidato[0] is not None:
+                encontrados.setdefault("orcamento", candidato[0])
+
+        normalizado = self._espaco.sub(" ", _normalizar(texto))
+        for achado in self.padrao.finditer(normalizado):
+            inicio, fim = achado.span()
+            numero = achado.group("numero")
+            if numero is not None:
+                fechar()
+                apos_prefixo = (anterior is not None and anterior[:2] == ("orcamento", "prefixo")
+                                and not normalizado[anterior[2]:inicio].strip(" :"))
+                candidato = (_numero(numero), fim, apos_prefixo)
+                anterior = None
+                negacao = None
+                continue
+
+            campo, valor = self.termos[achado.group("termo")]
+            em_negacao = negacao is not None and not normalizado[negacao:inicio].strip()
+            if campo == "negacao" and valor == "ligacao":
+                # Connectors only matter inside a negation; elsewhere they are plain text
+                negacao = fim if em_negacao else None
+                continue
+            colado = candidato is not None and not normalizado[candidato[1]:inicio].strip()
+            if campo == "orcamento" and valor == "sufixo" and colado:
+                if candidato[0] is not None:
+                    encontrados.setdefault("orcamento", candidato[0])
+            elif not (campo == "orcamento" and valor == "quantidade" and colado):
+                fechar()
+            candidato = None
+            negacao = None
+            if campo == "negacao":
+                negacao = fim     # chains: "não quero nada de carne", "nada de peixe nem carne"
+            elif campo != "orcamento":
+                if em_negacao:
+                    negacao = fim
+                else:
+                    encontrados.setdefault(campo, valor)
+            anterior = (campo, valor, fim)
+        fechar()
+        return encontrados
+
+_interpretador = None
+
+def interpretador_pedidos():
+    """Shared InterpretadorPedidos for LEXICO_PEDIDOS, compiled on first use"""
+    global _interpretador
+    if _interpretador is None:
+        _interpretador = InterpretadorPedidos()
+    return _interpretador
 
 # ================== SISTEMA DE RECOMENDAÇÃO SIMULADO ==================
 class SistemaIA:
-    def __init__(self):
-        self.sugestoes = {
-            "Jantar Romântico": {
-                "cozinha": "francesa",
-                "dieta_entrada": "vegetariana",
-                "dieta_principal": "carnes",
-                "bebida": "vinhos",
-                "sugestao_especial": "Menu especial para uma noite romântica"
-            },
-            "Aniversário": {
-                "cozinha": "italiana",
-                "dieta_entrada": None,
-                "dieta_principal": None,
-                "bebida": "vinhos",
-                "sugestao_especial": "Celebre com sabores especiais"
-            },
-            "Jantar de Negócios": {
-                "cozinha": "internacional",
-                "dieta_entrada": "leve",
-                "dieta_principal": None,
-                "bebida": "vinhos",
-                "sugestao_especial": "Menu profissional para impressionar"
-            },
-            "Família": {
-                "cozinha": "brasileira",
-                "dieta_entrada": None,
-                "dieta_principal": None,
-                "bebida": "sem_alcool",
-                "sugestao_especial": "Sabores que agradam a toda família"
-            },
-            "Amigos": {
-                "cozinha": None,
-                "dieta_entrada": None,
-                "dieta_principal": None,
-                "bebida": "cervejas",
-                "sugestao_especial": "Para compartilhar momentos especiais"
-            },
-            "Outro": {
-                "cozinha": None,
-                "dieta_entrada": None,
-                "dieta_principal": None,
-                "bebida": "vinhos",
-                "sugestao_especial": "Sugestão do chef para ocasião especial"
-            }
-        }
+    def __init__(self, sugestoes=None, lexico=None):
+        # Without explicit presets the current ``ocasioes`` table is used,
+        # so a reloaded catalog reaches existing instances too
+        self._sugestoes = sugestoes
+        self._interpretador = InterpretadorPedidos(lexico) if lexico is not None else None
+
+    @property
+    def interpretador(self):
+        return self._interpretador or interpretador_pedidos()
+
+    @property
+    def sugestoes(self):
+        return ocasioes if self._sugestoes is None else self._sugestoes
 
+    @medir("analisar_contexto")
     def analisar_contexto(self, comando, ocasiao, expectativas):
-        sugestao = self.sugestoes.get(ocasiao, {
-            "cozinha": None,
-            "dieta_entrada": None,
-            "dieta_principal": None,
-            "bebida": "vinhos",
-            "sugestao_especial": "Sugestão personalizada do chef"
-        })
+        sugestao = self.sugestoes.get(ocasiao, PRESET_PADRAO)
         
-        if "vegetariano" in comando.lower():
-            sugestao["dieta_entrada"] = "vegetariana"
-            sugestao["dieta_principal"] = "vegetariana"
-        elif "vegano" in comando.lower():
-            sugestao["dieta_entrada"] = "vegana"
-            sugestao["dieta_principal"] = "vegana"
+        # The free-text command wins over the expectations
+        intencao = self.interpretador.interpretar(expectativas, comando)
+        if not intencao:
+            return sugestao
         
-        return sugestao
-
-    def recomendar_sobremesa(self, contexto):
-        sobremesas = [
-            {
-                "nome": "Petit Gateau",
-                "tipo": "francesa",
-                "dieta": "vegetariana",
-                "harmonizacao": "Sorvete de baunilha",
-                "intensidade": "alta",
-                "dica_servico": "Servir quente com sorvete"
-            },
-            {
-                "nome": "Tiramisu",
-                "tipo": "italiana",
-                "dieta": "vegetariana",
-                "harmonizacao": "Vinho doce",
-                "intensidade": "média",
-                "dica_servico": "Servir gelado"
-            }
-        ]
+        # Presets are shared; overrides produce a new record
+        alteracoes = {campo: intencao[campo] for campo in ("cozinha", "bebida", "intensidade", "orcamento")
+                      if campo in intencao}
+        if "dieta" in intencao:
+            alteracoes["dieta_entrada"] = alteracoes["dieta_principal"] = intencao["dieta"]
+        return sugestao.com(**alteracoes)
+
+    def opcoes_sobremesa(self, contexto, indice=None):
+        """Desserts of the menu's diet from the IndiceCardapio; the first dessert if none matches"""
         dieta = contexto.get("dieta_principal") or contexto.get("dieta_entrada")
         if dieta:
-            opcoes = [s for s in sobremesas if s["dieta"] == dieta]
-            return random.choice(opcoes) if opcoes else sobremesas[0]
-        return random.choice(sobremesas)
+            indice = indice or indice_cardapio()
+            if ("sobremesas", "dieta", dieta) in indice.postings:
+                return indice.filtrar("sobremesas", dieta=dieta)
+            return cardapio["sobremesas"][:1]
+        return cardapio["sobremesas"]
+
+    @medir("recomendar_sobremesa")
+    def recomendar_sobremesa(self, contexto, rng=None):
+        return (rng or random).choice(self.opcoes_sobremesa(contexto))
 
     def explicar_harmonizacao(self, menu_completo):
         return (f"Este menu foi elaborado para {menu_completo['ocasiao']}. "
@@ -149,234 +946,639 @@ class SistemaIA:
 # ================== BANCO DE DADOS GASTRONÔMICO ==================
 cardapio = {
     "entradas": [
-        {"nome": "Bruschetta", "tipo": "italiana", "dieta": "vegetariana", "intensidade": "leve"},
-        {"nome": "Tábua de Queijos", "tipo": "francesa", "dieta": "vegetariana", "intensidade": "média"},
-        {"nome": "Carpaccio", "tipo": "europeia", "dieta": "carnes", "intensidade": "média"},
+        Prato(nome="Bruschetta", tipo="italiana", dieta="vegetariana", intensidade="leve"),
+        Prato(nome="Tábua de Queijos", tipo="francesa", dieta="vegetariana", intensidade="média"),
+        Prato(nome="Carpaccio", tipo="europeia", dieta="carnes", intensidade="média"),
     ],
     "principais": [
-        {"nome": "Risoto de Funghi", "tipo": "italiana", "dieta": "vegetariana", "intensidade": "média"},
-        {"nome": "Filé Mignon", "tipo": "francesa", "dieta": "carnes", "intensidade": "alta"},
-        {"nome": "Salmão Grelhado", "tipo": "mediterrânea", "dieta": "peixes", "intensidade": "média"},
+        Prato(nome="Risoto de Funghi", tipo="italiana", dieta="vegetariana", intensidade="média"),
+        Prato(nome="Filé Mignon", tipo="francesa", dieta="carnes", intensidade="alta"),
+        Prato(nome="Salmão Grelhado", tipo="mediterrânea", dieta="peixes", intensidade="média"),
+    ],
+    "sobremesas": [
+        Sobremesa(nome="Petit Gateau", tipo="francesa", dieta="vegetariana", intensidade="alta",
+                  harmonizacao="Sorvete de baunilha", dica_servico="Servir quente com sorvete"),
+        Sobremesa(nome="Tiramisu", tipo="italiana", dieta="vegetariana", intensidade="média",
+                  harmonizacao="Vinho doce", dica_servico="Servir gelado"),
     ]
 }
 
 bebidas_base = {
     "vinhos": [
-        {"nome": "Prosecco", "tipo": "espumante", "intensidade": "leve", "harmonizacao": "Aperitivos"},
-        {"nome": "Malbec", "tipo": "tinto", "intensidade": "alta", "harmonizacao": "Carnes"},
-        {"nome": "Sauvignon Blanc", "tipo": "branco", "intensidade": "leve", "harmonizacao": "Peixes"},
+        Bebida(nome="Prosecco", tipo="espumante", intensidade="leve", harmonizacao="Aperitivos"),
+        Bebida(nome="Malbec", tipo="tinto", intensidade="alta", harmonizacao="Carnes"),
+        Bebida(nome="Sauvignon Blanc", tipo="branco", intensidade="leve", harmonizacao="Peixes"),
     ],
     "cervejas": [
-        {"nome": "IPA", "tipo": "artesanal", "intensidade": "alta", "harmonizacao": "Pratos fortes"},
-        {"nome": "Weissbier", "tipo": "trigo", "intensidade": "leve", "harmonizacao": "Entradas"},
+        Bebida(nome="IPA", tipo="artesanal", intensidade="alta", harmonizacao="Pratos fortes"),
+        Bebida(nome="Weissbier", tipo="trigo", intensidade="leve", harmonizacao="Entradas"),
     ],
     "digestivos": [
-        {"nome": "Porto", "tipo": "vinho doce", "intensidade": "alta", "harmonizacao": "Sobremesas"},
-        {"nome": "Amaretto", "tipo": "licor", "intensidade": "média", "harmonizacao": "Doces"},
+        Bebida(nome="Porto", tipo="vinho doce", intensidade="alta", harmonizacao="Sobremesas"),
+        Bebida(nome="Amaretto", tipo="licor", intensidade="média", harmonizacao="Doces"),
     ],
     "sem_alcool": [
-        {"nome": "Mocktail de Frutas", "tipo": "coquetel", "intensidade": "média", "harmonizacao": "Sobremesas"},
-        {"nome": "Suco de Uva", "tipo": "suco", "intensidade": "leve", "harmonizacao": "Geral"},
+        Bebida(nome="Mocktail de Frutas", tipo="coquetel", intensidade="média", harmonizacao="Sobremesas"),
+        Bebida(nome="Suco de Uva", tipo="suco", intensidade="leve", harmonizacao="Geral"),
     ]
 }
 
+cardapio = _listas_catalogo(cardapio)
+bebidas_base = _listas_catalogo(bebidas_base)
+
+# Occasion presets used by SistemaIA.analisar_contexto
+ocasioes = {
+    "Jantar Romântico": PresetOcasiao(
+        cozinha="francesa",
+        dieta_entrada="vegetariana",
+        dieta_principal="carnes",
+        bebida="vinhos",
+        sugestao_especial="Menu especial para uma noite romântica"
+    ),
+    "Aniversário": PresetOcasiao(
+        cozinha="italiana",
+        dieta_entrada=None,
+        dieta_principal=None,
+        bebida="vinhos",
+        sugestao_especial="Celebre com sabores especiais"
+    ),
+    "Jantar de Negócios": PresetOcasiao(
+        cozinha="internacional",
+        dieta_entrada="leve",
+        dieta_principal=None,
+        bebida="vinhos",
+        sugestao_especial="Menu profissional para impressionar"
+    ),
+    "Família": PresetOcasiao(
+        cozinha="brasileira",
+        dieta_entrada=None,
+        dieta_principal=None,
+        bebida="sem_alcool",
+        sugestao_especial="Sabores que agradam a toda família"
+    ),
+    "Amigos": PresetOcasiao(
+        cozinha=None,
+        dieta_entrada=None,
+        dieta_principal=None,
+        bebida="cervejas",
+        sugestao_especial="Para compartilhar momentos especiais"
+    ),
+    "Outro": PresetOcasiao(
+        cozinha=None,
+        dieta_entrada=None,
+        dieta_principal=None,
+        bebida="vinhos",
+        sugestao_especial="Sugestão do chef para ocasião especial"
+    )
+}
+
 # ================== LÓGICA DE HARMONIZAÇÃO ==================
 def filtrar_itens(lista, filtros):
-    resultado = lista
-    if filtros.get("cozinha"):
-        filtrados = [item for item in resultado if item["tipo"] == filtros["cozinha"]]
-        if filtrados:
-            resultado = filtrados
-    if filtros.get("dieta"):
-        filtrados = [item for item in resultado if item["dieta"] == filtros["dieta"]]
-        if filtrados:
-            resultado = filtrados
-    return resultado
-
-def recomendar_bebida(prato, tipo_bebida, cozinha=None):
-    intensidade = prato["intensidade"]
-    opcoes = bebidas_base.get(tipo_bebida, [])
-    intensidade_map = {
-        "leve": ["leve"],
-        "média": ["leve", "média"],
-        "alta": ["média", "alta"]
-    }
-    opcoes = [b for b in opcoes if b["intensidade"] in intensidade_map[intensidade]]
-    
-    # Fetch online pairing data
-    online_data = fetch_online_data(prato=prato["nome"])
-    if "harmonizacao" in online_data and opcoes:
-        online_harmonizacoes = online_data["harmonizacao"]
-        opcoes = [b for b in opcoes if any(h in online_harmonizacoes for h in b.get("harmonizacao", ["Geral"]))]
-    
-    if not opcoes:
-        opcoes = bebidas_base.get(tipo_bebida, [])
-    
-    bebida = random.choice(opcoes) if opcoes else {"nome": "Seleção do Chef", "tipo": tipo_bebida, "harmonizacao": "Geral"}
-    
-    # Ensure harmonizacao exists
-    bebida["harmonizacao"] = bebida.get("harmonizacao", "Geral")
+    """Items of ``lista`` matching the ``cozinha`` and ``dieta`` filters.
+
+    Kept for callers outside MenuEngine; builds a one-off IndiceCardapio, so
+    repeated queries over the same catalog should use ``indice_cardapio()``.
+    """
+    if not filtros.get("cozinha") and not filtros.get("dieta"):
+        return lista
+    return list(IndiceCardapio({None: lista}).filtrar(None, filtros.get("cozinha"), filtros.get("dieta")))
+
+class IndiceCardapio:
+    """Inverted index over the cardapio by tipo, dieta and intensidade.
+
+    ``filtrar`` answers with set intersections and relaxes progressively:
+    cuisine, then diet, then intensity, each dropped only when it would
+    empty the result. Dishes can be added and removed without rebuilding the index.
+    Mapped tables (harmonizador_catalogo.TabelaCatalogo) are indexed from their
+    columns and filtered into views of the table, so records are only built
+    for the dishes actually drawn.
+    """
+    CAMPOS = (("cozinha", "tipo"), ("dieta", "dieta"), ("intensidade", "intensidade"))
+
+    def __init__(self, cardapio=None):
+        self._lock = threading.Lock()
+        self._seq = 0
+        self.itens = {}       # categoria -> {id: prato}, in insertion order
+        self.ids = {}         # (categoria, nome) -> {id}
+        self.postings = {}    # (categoria, campo, valor) -> {id}
+        self.tabelas = {}     # categoria -> (mapped table, id of its first row)
+        self._resultados = {}
+        for categoria, pratos in (cardapio or {}).items():
+            self.itens.setdefault(categoria, {})
+            if hasattr(pratos, "coluna"):
+                self._indexar_tabela(categoria, pratos)
+                continue
+            for prato in pratos:
+                self._adicionar(categoria, prato)
+
+    def _indexar_tabela(self, categoria, tabela):
+        primeiro = self._seq + 1
+        self._seq += len(tabela)
+        self.tabelas[categoria] = (tabela, primeiro)
+        for _, campo in self.CAMPOS:
+            for id_prato, valor in enumerate(tabela.coluna(campo), primeiro):
+                self.postings.setdefault((categoria, campo, valor), set()).add(id_prato)
+
+    def _materializar(self, categoria):
+        # Before an edit: the table's rows become records under the ids they already have
+        tabela, primeiro = self.tabelas.pop(categoria, (None, None))
+        if tabela is not None:
+            itens = self.itens[categoria]
+            for id_prato, prato in enumerate(tabela, primeiro):
+                itens[id_prato] = prato
+                self.ids.setdefault((categoria, prato["nome"]), set()).add(id_prato)
+
+    def _adicionar(self, categoria, prato):
+        self._seq += 1
+        id_prato = self._seq
+        self.itens.setdefault(categoria, {})[id_prato] = prato
+        self.ids.setdefault((categoria, prato["nome"]), set()).add(id_prato)
+        for _, campo in self.CAMPOS:
+            self.postings.setdefault((categoria, campo, prato.get(campo)), set()).add(id_prato)
+
+    def adicionar(self, categoria, prato):
+        with self._lock:
+            self._materializar(categoria)
+            self._adicionar(categoria, prato)
+            self._resultados.clear()
+
+    def remover(self, categoria, nome):
+        """Removes every dish called ``nome`` from the category; returns how many"""
+        with self._lock:
+            self._materializar(categoria)
+            ids = self.ids.pop((categoria, nome), ())
+            for id_prato in ids:
+                prato = self.itens[categoria].pop(id_prato)
+                for _, campo in self.CAMPOS:
+                    chave = (categoria, campo, prato.get(campo))
+                    postings = self.postings[chave]
+                    postings.discard(id_prato)
+                    if not postings:
+                        del self.postings[chave]
+            if ids:
+                self._resultados.clear()
+            return len(ids)
+
+    def filtrar(self, categoria, cozinha=None, dieta=None, intensidade=None):
+        # A value no dish has filters nothing; dropping it from the key bounds
+        # the memo by the catalog's own values, whatever the requests contain
+        postings = self.postings
+        if cozinha and (categoria, "tipo", cozinha) not in postings:
+            cozinha = None
+        if dieta and (categoria, "dieta", dieta) not in postings:
+            dieta = None
+        if intensidade and (categoria, "intensidade", intensidade) not in postings:
+            intensidade = None
+        chave = (categoria, cozinha, dieta, intensidade)
+        resultado = self._resultados.get(chave)
+        if resultado is None:
+            filtros = {"cozinha": cozinha, "dieta": dieta, "intensidade": intensidade}
+            with self._lock:
+                itens = self.itens.get(categoria, {})
+                ids = None
+                for filtro, campo in self.CAMPOS:
+                    valor = filtros[filtro]
+                    if not valor:
+                        continue
+                    postings = self.postings.get((categoria, campo, valor))
+                    if postings:
+                        filtrados = postings if ids is None else ids & postings
+                        if filtrados:
+                            ids = filtrados
+                tabela, primeiro = self.tabelas.get(categoria, (None, None))
+                if tabela is not None:
+                    resultado = tabela if ids is None else tabela.selecionar([i - primeiro for i in sorted(ids)])
+                elif ids is None:
+                    resultado = tuple(itens.values())
+                else:
+                    resultado = tuple(itens[i] for i in sorted(ids))
+                self._resultados[chave] = resultado
+        return resultado
+
+INTENSIDADES_COMPATIVEIS = {
+    "leve": ("leve",),
+    "média": ("leve", "média"),
+    "alta": ("média", "alta")
+}
+
+def _tags_harmonizacao(valor):
+    return (valor,) if isinstance(valor, str) else tuple(valor)
+
+def _filtrar_bebidas(bebidas, campo, aceita):
+    """Drinks whose ``campo`` passes ``aceita``; a mapped table is filtered on its column"""
+    if hasattr(bebidas, "coluna"):
+        return bebidas.selecionar([i for i, valor in enumerate(bebidas.coluna(campo)) if aceita(valor)])
+    return tuple(b for b in bebidas if aceita(b.get(campo, Bebida.padroes.get(campo))))
+
+class MatrizHarmonizacao:
+    """(dish, drink category) -> drink candidates, resolved on demand.
+
+    A dish's online pairing data is fetched once, in bulk together with the
+    other dishes of its menu or batch (``preparar``), and only for dishes
+    that are actually requested. Each cell has the intensity and pairing
+    filters applied and the fallback to the whole category resolved, so
+    picking a drink is one dict lookup plus one random choice.
+    """
+
+    def __init__(self, bebidas_base, fonte=None):
+        self.bebidas_base = bebidas_base
+        self.fonte = fonte or fetch_online_data_lote
+
+        # (drink category, dish intensity) -> compatible drinks
+        self.por_intensidade = {}
+        for tipo, bebidas in bebidas_base.items():
+            for intensidade, aceitas in INTENSIDADES_COMPATIVEIS.items():
+                self.por_intensidade[(tipo, intensidade)] = _filtrar_bebidas(
+                    bebidas, "intensidade", aceitas.__contains__)
+
+        self.celulas = {}
+        self.online = {}     # dish name -> online data
+
+    def faltam(self, pratos):
+        """Names of the dishes whose online data was not fetched yet"""
+        return sorted({p["nome"] for p in pratos} - self.online.keys())
+
+    def registrar(self, nome, dados):
+        """Stores online data fetched elsewhere (e.g. by PrecificadorAsync); errors are skipped"""
+        if "erro" not in dados:
+            self.online.setdefault(nome, dados)
+
+    def preparar(self, pratos):
+        """Fetches the online data of the dishes not seen yet, with one bulk call"""
+        faltam = self.faltam(pratos)
+        if not faltam:
+            return
+        dados = self.fonte(pratos=faltam)
+        if "erro" in dados:
+            return  # resolved without online data and tried again next time
+        encontrados = dados.get("pratos", {})
+        for nome in faltam:
+            self.online[nome] = encontrados.get(nome, {})
+
+    def _resolver(self, prato, tipo_bebida):
+        opcoes = self.por_intensidade.get((tipo_bebida, prato["intensidade"]), ())
+
+        # Online pairing data for the dish
+        online_data = self.online.get(prato["nome"], {})
+        if "harmonizacao" in online_data and opcoes:
+            online_harmonizacoes = online_data["harmonizacao"]
+            opcoes = _filtrar_bebidas(opcoes, "harmonizacao",
+                                      lambda valor: any(h in online_harmonizacoes
+                                                        for h in _tags_harmonizacao(valor)))
+
+        if not opcoes:
+            opcoes = self.bebidas_base.get(tipo_bebida, ())
+        if not opcoes:
+            opcoes = (Bebida(nome="Seleção do Chef", tipo=tipo_bebida, intensidade=None, harmonizacao="Geral"),)
+        return opcoes
+
+    def descartar(self, nome):
+        """Drops the cells of one dish; they are resolved again on next use"""
+        self.online.pop(nome, None)
+        for tipo in self.bebidas_base:
+            self.celulas.pop((nome, tipo), None)
+
+    def candidatos(self, prato, tipo_bebida):
+        chave = (prato["nome"], tipo_bebida)
+        opcoes = self.celulas.get(chave)
+        if opcoes is None:
+            self.preparar((prato,))
+            opcoes = self._resolver(prato, tipo_bebida)
+            if prato["nome"] in self.online:
+                self.celulas[chave] = opcoes
+        return opcoes
+
+_matriz = None
+_indice = None
+_assinatura = None
+# Bumped on every explicit catalog change; see versao_dados
+_versao_catalogo = 0
+# Held while swapping the catalog and while building from it
+_troca_catalogo = threading.RLock()
+
+def _assinatura_catalogo():
+    # Replaced lists show up as a new id, edits inside a ListaCatalogo as a new count
+    return (_edicoes_catalogo,
+            tuple((c, id(itens), len(itens)) for c, itens in cardapio.items()),
+            tuple((c, id(itens), len(itens)) for c, itens in bebidas_base.items()))
+
+def _sincronizar_catalogo():
+    global _matriz, _indice, _assinatura
+    assinatura = _assinatura_catalogo()
+    if assinatura != _assinatura:
+        _matriz = None
+        _indice = None
+        _assinatura = assinatura
+
+def matriz_harmonizacao():
+    """Current pairing matrix, rebuilt when cardapio or bebidas_base change.
+
+    Adding, removing or replacing entries (``lista[i] = item.com(...)``) is
+    detected automatically, as is assigning a new list to a category. A
+    plain list assigned that way is not watched afterwards: edit it before
+    assigning it, or call recarregar_catalogo() after changing it.
+    """
+    global _matriz
+    _sincronizar_catalogo()
+    matriz = _matriz
+    if matriz is None:
+        with _troca_catalogo:
+            _sincronizar_catalogo()
+            if _matriz is None:
+                _matriz = MatrizHarmonizacao(bebidas_base)
+            matriz = _matriz
+    return matriz
+
+def indice_cardapio():
+    """Current dish index, rebuilt under the same rules as the pairing matrix"""
+    global _indice
+    _sincronizar_catalogo()
+    indice = _indice
+    if indice is None:
+        with _troca_catalogo:
+            _sincronizar_catalogo()
+            if _indice is None:
+                _indice = IndiceCardapio(cardapio)
+            indice = _indice
+    return indice
+
+def recarregar_catalogo():
+    global _matriz, _indice, _versao_catalogo
+    _matriz = None
+    _indice = None
+    _versao_catalogo += 1
+
+def versao_dados():
+    """Token that changes whenever the catalog or the pricing source changes.
+
+    Covers recarregar_catalogo, instalar_catalogo, adicionar/remover_prato,
+    replaced catalog lists, configurar_fonte_precos and sources with a
+    ``versao`` counter (CachePrecos bumps it when a refresh changes a price).
+    """
+    return (_versao_catalogo, _assinatura_catalogo(), id(fonte_precos), getattr(fonte_precos, "versao", None))
+
+def instalar_catalogo(novo_cardapio, novas_bebidas, novas_ocasioes=None):
+    """Swaps in a whole catalog at once, e.g. one loaded by ArmazemCatalogo.
+
+    Requests already running keep the index and pairing matrix they started
+    with; the next ones see the new catalog.
+    """
+    global cardapio, bebidas_base, ocasioes
+    with _troca_catalogo:
+        cardapio = _listas_catalogo(novo_cardapio)
+        bebidas_base = _listas_catalogo(novas_bebidas)
+        if novas_ocasioes is not None:
+            ocasioes = novas_ocasioes
+        recarregar_catalogo()
+
+def _pratos_editaveis(categoria):
+    """cardapio[categoria] as a ListaCatalogo, copying a mapped table the first time"""
+    pratos = cardapio.setdefault(categoria, ListaCatalogo())
+    if not isinstance(pratos, ListaCatalogo):
+        pratos = cardapio[categoria] = ListaCatalogo(pratos)
+    return pratos
+
+def adicionar_prato(categoria, prato):
+    """Adds a dish to the cardapio, updating the index and matrix incrementally"""
+    global _assinatura, _versao_catalogo
+    _sincronizar_catalogo()
+    _pratos_editaveis(categoria).append(prato)
+    if _indice is not None:
+        _indice.adicionar(categoria, prato)
+    if _matriz is not None:
+        _matriz.descartar(prato["nome"])
+    _versao_catalogo += 1
+    _assinatura = _assinatura_catalogo()
+
+def remover_prato(categoria, nome):
+    """Removes the named dish from the cardapio without rebuilding the index"""
+    global _assinatura, _versao_catalogo
+    _sincronizar_catalogo()
+    if categoria in cardapio:
+        pratos = _pratos_editaveis(categoria)
+        pratos[:] = [p for p in pratos if p["nome"] != nome]
+    if _indice is not None:
+        _indice.remover(categoria, nome)
+    if _matriz is not None:
+        _matriz.descartar(nome)
+    _versao_catalogo += 1
+    _assinatura = _assinatura_catalogo()
+
+def _preparar(matriz, pratos):
+    # Bulk-fetches the dishes' online data when the matrix supports it (PontuadorHarmonizacao does not need to)
+    preparar = getattr(matriz, "preparar", None)
+    if preparar is not None:
+        preparar(pratos)
+
+@medir("escolher_bebida")
+def escolher_bebida(prato, tipo_bebida, matriz=None, rng=None):
+    """Picks the drink for a dish without pricing it"""
+    matriz = matriz or matriz_harmonizacao()
+    return (rng or random).choice(matriz.candidatos(prato, tipo_bebida))
+
+@medir("recomendar_bebida")
+def recomendar_bebida(prato, tipo_bebida, cozinha=None, rng=None):
+    bebida = escolher_bebida(prato, tipo_bebida, rng=rng)
     
-    # Fetch price from API
+    # Fetch price from API; the catalog entry itself is never written to
     bebida_data = fetch_online_data(bebida=bebida["nome"])
-    bebida["preco"] = bebida_data.get("preco", 30)
-    
-    return bebida
-
-# ================== INTERFACE GRÁFICA ==================
-class HarmonizadorApp:
-    def __init__(self, root):
-        self.root = root
-        self.root.title("Métre Digital - Versão Atualizada")
-        self.ia = SistemaIA()
-        self.menu_gerado = None
-        self.explicacao_detalhada = None
-        self.sugestao_especial = None
-        self.criar_interface()
-
-    def criar_interface(self):
-        self.root.geometry("1200x900")
-        
-        # Create notebook for tabs
-        notebook = ttk.Notebook(self.root)
-        notebook.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
-        
-        # Tab 1: Manual Selection
-        tab_manual = ttk.Frame(notebook)
-        notebook.add(tab_manual, text="Seleção Manual")
-        
-        # Tab 2: Automatic Recommendation
-        tab_auto = ttk.Frame(notebook)
-        notebook.add(tab_auto, text="Métre Online")
-        
-        # === Manual Tab ===
-        manual_frame = ttk.Frame(tab_manual, padding=20)
-        manual_frame.pack(fill=tk.BOTH, expand=True)
-        
-        # Context Section
-        context_frame = ttk.LabelFrame(manual_frame, text="Contexto da Refeição", padding=10)
-        context_frame.pack(fill=tk.X, pady=10)
-        
-        ttk.Label(context_frame, text="Ocasião:").grid(row=0, column=0, sticky=tk.W, padx=5)
-        self.ocasiao = ttk.Combobox(context_frame, values=["Jantar Romântico", "Aniversário", "Jantar de Negócios", "Família", "Amigos", "Outro"])
-        self.ocasiao.grid(row=0, column=1, sticky=tk.EW, padx=5)
-        
-        ttk.Label(context_frame, text="Expectativas:").grid(row=1, column=0, sticky=tk.W, padx=5)
-        self.expectativas = ttk.Combobox(context_frame, values=["Refeição Leve", "Experiência Gourmet", "Confort Food", "Culinária Internacional"])
-        self.expectativas.grid(row=1, column=1, sticky=tk.EW, padx=5)
-        
-        # Command Section
-        ttk.Label(manual_frame, text="Comando Específico:").pack(pady=(10,0))
-        self.entrada_comando = ttk.Entry(manual_frame, width=80)
-        self.entrada_comando.pack(pady=5)
-        
-        # Preferences Section
-        control_frame = ttk.LabelFrame(manual_frame, text="Preferências", padding=10)
-        control_frame.pack(fill=tk.X, pady=10)
-        
-        ttk.Label(control_frame, text="Cozinha:").grid(row=0, column=0, sticky=tk.W, padx=5)
-        self.cozinha = ttk.Combobox(control_frame, values=["", "italiana", "francesa", "mediterrânea", "brasileira"])
-        self.cozinha.grid(row=0, column=1, sticky=tk.EW, padx=5)
-        
-        ttk.Label(control_frame, text="Bebida:").grid(row=1, column=0, sticky=tk.W, padx=5)
-        self.tipo_bebida = ttk.Combobox(control_frame, values=["vinhos", "cervejas", "digestivos", "sem_alcool"])
-        self.tipo_bebida.grid(row=1, column=1, sticky=tk.EW, padx=5)
-        self.tipo_bebida.set("vinhos")
-        
-        ttk.Label(control_frame, text="Dieta Entrada:").grid(row=2, column=0, sticky=tk.W, padx=5)
-        self.dieta_entrada = ttk.Combobox(control_frame, values=["", "vegetariana", "carnes", "peixes"])
-        self.dieta_entrada.grid(row=2, column=1, sticky=tk.EW, padx=5)
-        
-        ttk.Label(control_frame, text="Dieta Principal:").grid(row=3, column=0, sticky=tk.W, padx=5)
-        self.dieta_principal = ttk.Combobox(control_frame, values=["", "vegetariana", "carnes", "peixes"])
-        self.dieta_principal.grid(row=3, column=1, sticky=tk.EW, padx=5)
-        
-        # Action Buttons
-        btn_frame = ttk.Frame(manual_frame)
-        btn_frame.pack(pady=10)
-        
-        ttk.Button(btn_frame, text="Gerar Menu", command=self.consultar_metre).pack(side=tk.LEFT, padx=5)
-        ttk.Button(btn_frame, text="Limpar", command=self.limpar_tela).pack(side=tk.LEFT, padx=5)
-        
-        # Result Area
-        self.resultado_manual = scrolledtext.ScrolledText(manual_frame, wrap=tk.WORD, height=20, font=('Arial', 11))
-        self.resultado_manual.pack(fill=tk.BOTH, expand=True, pady=10)
-        
-        # === Automatic Tab ===
-        auto_frame = ttk.Frame(tab_auto, padding=20)
-        auto_frame.pack(fill=tk.BOTH, expand=True)
-        
-        # Occasion Selection
-        auto_context_frame = ttk.LabelFrame(auto_frame, text="Seleção de Ocasião", padding=10)
-        auto_context_frame.pack(fill=tk.X, pady=10)
-        
-        ttk.Label(auto_context_frame, text="Ocasião:").grid(row=0, column=0, sticky=tk.W, padx=5)
-        self.ocasiao_auto = ttk.Combobox(auto_context_frame, values=["Jantar Romântico", "Aniversário", "Jantar de Negócios", "Família", "Amigos", "Outro"])
-        self.ocasiao_auto.grid(row=0, column=1, sticky=tk.EW, padx=5)
-        self.ocasiao_auto.set("Jantar Romântico")
-        
-        ttk.Button(auto_frame, text="Consultar Métre Online", command=self.consultar_metre_online).pack(pady=10)
-        
-        self.resultado_auto = scrolledtext.ScrolledText(auto_frame, wrap=tk.WORD, height=25, font=('Arial', 11))
-        self.resultado_auto.pack(fill=tk.BOTH, expand=True, pady=10)
-        
-        # Secondary Buttons
-        btn_auto_frame = ttk.Frame(auto_frame)
-        btn_auto_frame.pack(pady=10)
-        
-        ttk.Button(btn_auto_frame, text="Salvar Menu", command=self.salvar_menu).pack(side=tk.LEFT, padx=5)
-        ttk.Button(btn_auto_frame, text="Explicação", command=self.mostrar_explicacao).pack(side=tk.LEFT, padx=5)
-        
-        # Initial Message
-        self.exibir_resultado_manual("Selecione suas preferências e clique em 'Gerar Menu'.")
-        self.exibir_resultado_auto("Escolha a ocasião e clique em 'Consultar Métre Online' para recomendações automáticas.")
+    return BebidaSugerida(Bebida.de_dict(bebida), bebida_data.get("preco", PRECO_PADRAO_BEBIDA))
 
-    def consultar_metre(self):
-        try:
-            ocasiao = self.ocasiao.get()
-            expectativas = self.expectativas.get()
-            comando = self.entrada_comando.get().strip()
-            
-            if not ocasiao or not expectativas:
-                raise ValueError("Informe ocasião e expectativas!")
-            
-            contexto_ia = self.ia.analisar_contexto(comando, ocasiao, expectativas)
-            cozinha = self.cozinha.get() or contexto_ia.get("cozinha")
-            dieta_entrada = self.dieta_entrada.get() or contexto_ia.get("dieta_entrada")
-            dieta_principal = self.dieta_principal.get() or contexto_ia.get("dieta_principal")
-            tipo_bebida = self.tipo_bebida.get() or contexto_ia.get("bebida", "vinhos")
-            self.sugestao_especial = contexto_ia.get("sugestao_especial")
-            
-            self.gerar_menu(cozinha, dieta_entrada, dieta_principal, tipo_bebida, ocasiao, expectativas, manual=True)
-            
-        except Exception as e:
-            self.exibir_resultado_manual(f"⚠️ Erro: {str(e)}")
+def candidatos_cardapio(categoria, cozinha, dieta, indice=None, intensidade=None):
+    """Dishes selecionar_com_fallback draws from"""
+    indice = indice or indice_cardapio()
+    itens = indice.filtrar(categoria, cozinha=cozinha, dieta=dieta, intensidade=intensidade)
+    if not itens:
+        itens = cardapio[categoria]
+    return itens
+
+@medir("selecionar_com_fallback")
+def selecionar_com_fallback(categoria, cozinha, dieta, indice=None, rng=None, intensidade=None):
+    return (rng or random).choice(candidatos_cardapio(categoria, cozinha, dieta, indice, intensidade))
+
+# ================== PRECIFICAÇÃO ASSÍNCRONA ==================
+async def transporte_local(prato=None, bebida=None, gastronomia=None):
+    """Default async transport: runs the blocking fetch_online_data in a thread"""
+    import asyncio
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        None, partial(fetch_online_data, prato=prato, bebida=bebida, gastronomia=gastronomia))
+
+class TransporteSimulado:
+    """Offline stand-in for a remote pricing backend.
+
+    Answers from a CatalogoOnline after ``latencia`` seconds; names listed in
+    ``falhas`` raise ConnectionError, so timeouts and fallbacks can be
+    exercised without a network.
+    """
+
+    def __init__(self, latencia=0.05, falhas=(), catalogo=None):
+        self.latencia = latencia
+        self.falhas = set(falhas)
+        self.catalogo = catalogo or catalogo_online
+        self.chamadas = 0
+
+    async def __call__(self, prato=None, bebida=None, gastronomia=None):
+        import asyncio
+        self.chamadas += 1
+        await asyncio.sleep(self.latencia)
+        if (prato or bebida or gastronomia) in self.falhas:
+            raise ConnectionError(f"Falha simulada para {prato or bebida or gastronomia}")
+        return self.catalogo.buscar(prato=prato, bebida=bebida, gastronomia=gastronomia)
+
+class PrecificadorAsync:
+    """Concurrent price lookups with a concurrency limit, per-call timeouts and fallbacks"""
+
+    def __init__(self, transporte=None, limite=8, timeout=2.0):
+        self.transporte = transporte or transporte_local
+        self.limite = limite
+        self.timeout = timeout
+        self._semaforo = None
+        self._loop = None
+
+    def _semaforo_do_loop(self):
+        # Semaphores are bound to the loop they were first used in
+        import asyncio
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._semaforo = asyncio.Semaphore(self.limite)
+            self._loop = loop
+        return self._semaforo
 
-    def consultar_metre_online(self):
+    async def buscar(self, prato=None, bebida=None, gastronomia=None):
+        import asyncio
         try:
-            ocasiao = self.ocasiao_auto.get()
-            if not ocasiao:
-                raise ValueError("Selecione uma ocasião!")
-            
-            # Randomly select expectations for variety
-            expectativas = random.choice(["Experiência Gourmet", "Refeição Leve", "Confort Food"])
-            contexto_ia = self.ia.analisar_contexto("", ocasiao, expectativas)
-            
-            cozinha = contexto_ia.get("cozinha")
-            dieta_entrada = contexto_ia.get("dieta_entrada")
-            dieta_principal = contexto_ia.get("dieta_principal")
-            tipo_bebida = contexto_ia.get("bebida", "vinhos")
-            self.sugestao_especial = contexto_ia.get("sugestao_especial")
-            
-            self.gerar_menu(cozinha, dieta_entrada, dieta_principal, tipo_bebida, ocasiao, expectativas, manual=False)
-            
+            async with self._semaforo_do_loop():
+                return await asyncio.wait_for(
+                    self.transporte(prato=prato, bebida=bebida, gastronomia=gastronomia), self.timeout)
+        except asyncio.TimeoutError:
+            return {"erro": f"Tempo esgotado na busca online ({self.timeout}s)"}
         except Exception as e:
-            self.exibir_resultado_auto(f"⚠️ Erro: {str(e)}")
+            return {"erro": f"Falha na busca online: {str(e)}"}
+
+    async def preco_prato(self, nome):
+        return (await self.buscar(prato=nome)).get("preco", PRECO_PADRAO_PRATO)
+
+    async def preco_bebida(self, nome):
+        return (await self.buscar(bebida=nome)).get("preco", PRECO_PADRAO_BEBIDA)
+
+# Default precificador of each running event loop, dropped with the loop
+_precificadores = weakref.WeakKeyDictionary()
+
+def precificador_padrao():
+    """Shared PrecificadorAsync of the running loop, created on first use"""
+    import asyncio
+    loop = asyncio.get_running_loop()
+    precificador = _precificadores.get(loop)
+    if precificador is None:
+        precificador = _precificadores[loop] = PrecificadorAsync()
+    return precificador
+
+async def fetch_online_data_async(prato=None, bebida=None, gastronomia=None, precificador=None):
+    """Async counterpart of fetch_online_data; failures return an ``erro`` dict"""
+    precificador = precificador or precificador_padrao()
+    return await precificador.buscar(prato=prato, bebida=bebida, gastronomia=gastronomia)
+
+async def gerar_menu_async(contexto, engine=None, precificador=None):
+    """Generates one Menu with all price lookups issued concurrently"""
+    engine = engine or MenuEngine()
+    return await engine.generate_async(contexto, precificador)
+
+# ================== MOTOR DE GERAÇÃO (SEM INTERFACE) ==================
+class Menu:
+    """Structured result of one menu generation, independent of any UI"""
+    __slots__ = ("ocasiao", "expectativas", "sugestao_especial", "entrada", "principal",
+                 "sobremesa", "precos", "bebidas", "valor_total", "explicacao")
+
+    def __init__(self, ocasiao, expectativas, sugestao_especial, entrada, principal,
+                 sobremesa, precos, bebidas, valor_total, explicacao=None):
+        self.ocasiao = ocasiao
+        self.expectativas = expectativas
+        self.sugestao_especial = sugestao_especial
+        self.entrada = entrada
+        self.principal = principal
+        self.sobremesa = sobremesa
+        self.precos = precos
+        self.bebidas = bebidas
+        self.valor_total = valor_total
+        self.explicacao = explicacao
+
+    def as_dict(self):
+        """Same shape as the ``menu_completo`` dict used by SistemaIA"""
+        return {
+            "ocasiao": self.ocasiao,
+            "expectativas": self.expectativas,
+            "sugestao_especial": self.sugestao_especial,
+            "entrada": self.entrada,
+            "principal": self.principal,
+            "sobremesa": self.sobremesa,
+            "precos": self.precos,
+            "bebidas": self.bebidas,
+            "valor_total": self.valor_total,
+            "explicacao": self.explicacao,
+        }
+
+class MenuEngine:
+    """Generates menus without any Tkinter dependency.
+
+    A ``contexto`` is a dict with ``ocasiao`` and ``expectativas`` plus the
+    optional ``comando``, ``cozinha``, ``dieta_entrada``, ``dieta_principal``,
+    ``tipo_bebida`` and ``intensidade`` overrides, the same fields the GUI
+    collects. An optional ``semente`` (e.g. the request id) makes its draws
+    reproducible.
+
+    With a ``pontuador`` (PontuadorHarmonizacao) drinks are drawn from its
+    top-ranked candidates instead of the filtered MatrizHarmonizacao cells.
+    """
+
+    def __init__(self, ia=None, pontuador=None):
+        self.ia = ia or SistemaIA()
+        self.pontuador = pontuador
+        self._otimizador = None     # (versao_dados(), OtimizadorMenu)
+
+    def resolver_contexto(self, contexto, cache=None):
+        """Merges SistemaIA's suggestion for the occasion with the manual overrides"""
+        ocasiao = contexto.get("ocasiao") or ""
+        expectativas = contexto.get("expectativas") or ""
+        comando = (contexto.get("comando") or "").strip()
+
+        chave = ("contexto", comando, ocasiao, expectativas)
+        contexto_ia = cache.get(chave) if cache is not None else None
+        if contexto_ia is None:
+            contexto_ia = self.ia.analisar_contexto(comando, ocasiao, expectativas)
+            if cache is not None:
+                cache[chave] = contexto_ia
+
+        return {
+            "cozinha": contexto.get("cozinha") or contexto_ia.get("cozinha"),
+            "dieta_entrada": contexto.get("dieta_entrada") or contexto_ia.get("dieta_entrada"),
+            "dieta_principal": contexto.get("dieta_principal") or contexto_ia.get("dieta_principal"),
+            "tipo_bebida": contexto.get("tipo_bebida") or contexto_ia.get("bebida", "vinhos"),
+            "ocasiao": ocasiao,
+            "expectativas": expectativas,
+            "sugestao_especial": contexto_ia.get("sugestao_especial"),
+            "intensidade": contexto.get("intensidade") or contexto_ia.get("intensidade"),
+        }
+
+    def _catalogo(self, cache=None):
+        """Index and pairing matrix used for one menu, or for a whole batch when cached"""
+        if cache is not None and "catalogo" in cache:
+            return cache["catalogo"]
+        catalogo = (indice_cardapio(), self.pontuador or matriz_harmonizacao())
+        if cache is not None:
+            cache["catalogo"] = catalogo
+        return catalogo
+
+    @staticmethod
+    def _rng(contexto):
+        semente = contexto.get("semente")
+        return rng_para(semente) if semente is not None else None
+
+    def _escolher_pratos(self, cozinha, dieta_entrada, dieta_principal, ocasiao, expectativas,
+                         indice=None, rng=None, intensidade=None):
+        entrada = selecionar_com_fallback("entradas", cozinha, dieta_entrada, indice, rng, intensidade)
+        principal = selecionar_com_fallback("principais", cozinha, dieta_principal, indice, rng, intensidade)
 
-    def gerar_menu(self, cozinha, dieta_entrada, dieta_principal, tipo_bebida, ocasiao, expectativas, manual=True):
-        entrada = self.selecionar_com_fallback("entradas", cozinha, dieta_entrada)
-        principal = self.selecionar_com_fallback("principais", cozinha, dieta_principal)
-        
         contexto_sobremesa = {
             "ocasiao": ocasiao,
             "expectativas": expectativas,
@@ -384,146 +1586,915 @@ class HarmonizadorApp:
             "dieta_entrada": dieta_entrada,
             "dieta_principal": dieta_principal
         }
-        sobremesa = self.ia.recomendar_sobremesa(contexto_sobremesa)
-        
-        # Fetch online prices
-        entrada_preco = fetch_online_data(prato=entrada["nome"])["preco"]
-        principal_preco = fetch_online_data(prato=principal["nome"])["preco"]
-        sobremesa_preco = fetch_online_data(prato=sobremesa["nome"])["preco"]
-        
+        sobremesa = self.ia.recomendar_sobremesa(contexto_sobremesa, rng)
+        return entrada, principal, sobremesa
+
+    @staticmethod
+    def _escolher_bebidas(entrada, principal, sobremesa, tipo_bebida, matriz=None, rng=None):
+        matriz = matriz or matriz_harmonizacao()
+        _preparar(matriz, (entrada, principal, sobremesa))
+        return {
+            "entrada": escolher_bebida(entrada, tipo_bebida, matriz, rng),
+            "principal": escolher_bebida(principal, tipo_bebida, matriz, rng),
+            "sobremesa_alcool": escolher_bebida(sobremesa, "digestivos", matriz, rng),
+            "sobremesa_sem_alcool": escolher_bebida(sobremesa, "sem_alcool", matriz, rng)
+        }
+
+    def _sortear_lote(self, resolvidos, amostrador, indice, matriz):
+        """Vectorized _escolher_pratos/_escolher_bebidas for many resolved contexts.
+
+        Each bulk draw is one call for the whole batch, so it is measured under
+        its own ``_lote`` stage instead of the per-menu stage it replaces.
+        """
+        @medir("selecionar_com_fallback_lote")
+        def pratos(categoria, campo_dieta):
+            return amostrador.escolher(
+                [(categoria, r["cozinha"], r[campo_dieta], r.get("intensidade")) for r in resolvidos],
+                lambda chave: candidatos_cardapio(*chave[:3], indice, chave[3]))
+
+        @medir("recomendar_sobremesa_lote")
+        def sobremesas():
+            return amostrador.escolher(
+                [r["dieta_principal"] or r["dieta_entrada"] for r in resolvidos],
+                lambda dieta: self.ia.opcoes_sobremesa({"dieta_principal": dieta}))
+
+        entradas = pratos("entradas", "dieta_entrada")
+        principais = pratos("principais", "dieta_principal")
+        sobremesas = sobremesas()
+
+        _preparar(matriz, itertools.chain(entradas, principais, sobremesas))
+
+        @medir("escolher_bebida_lote")
+        def bebidas(cursos, tipos):
+            # Keyed by object identity: hashing records field by field is the slow part
+            por_id = {id(prato): prato for prato in cursos}
+            return amostrador.escolher([(id(prato), tipo) for prato, tipo in zip(cursos, tipos)],
+                                       lambda chave: matriz.candidatos(por_id[chave[0]], chave[1]))
+
+        tipos = [r["tipo_bebida"] for r in resolvidos]
+        escolhas = zip(bebidas(entradas, tipos), bebidas(principais, tipos),
+                       bebidas(sobremesas, itertools.repeat("digestivos", len(resolvidos))),
+                       bebidas(sobremesas, itertools.repeat("sem_alcool", len(resolvidos))))
+        return [
+            (entrada, principal, sobremesa, dict(zip(BEBIDAS_MENU, bebidas_menu)))
+            for entrada, principal, sobremesa, bebidas_menu in zip(entradas, principais, sobremesas, escolhas)
+        ]
+
+    @staticmethod
+    def _precificar(pratos, escolhas, cache=None):
+        """Prices every dish and drink of a menu with one bulk lookup.
+
+        Prices already in ``cache`` (shared across a batch) are not fetched again.
+        """
+        cache = {} if cache is None else cache
+        faltam_pratos = {p["nome"] for p in pratos.values() if ("preco", p["nome"]) not in cache}
+        faltam_bebidas = {b["nome"] for b in escolhas.values() if ("preco_bebida", b["nome"]) not in cache}
+        obtidos = {}
+        if faltam_pratos or faltam_bebidas:
+            dados = fetch_online_data_lote(pratos=sorted(faltam_pratos), bebidas=sorted(faltam_bebidas))
+            for nome in faltam_pratos:
+                obtidos[("preco", nome)] = dados.get("pratos", {}).get(nome, {}).get("preco", PRECO_PADRAO_PRATO)
+            for nome in faltam_bebidas:
+                obtidos[("preco_bebida", nome)] = dados.get("bebidas", {}).get(nome, {}).get(
+                    "preco", PRECO_PADRAO_BEBIDA)
+            if "erro" not in dados:
+                cache.update(obtidos)
+
+        def preco(chave):
+            return obtidos[chave] if chave in obtidos else cache[chave]
+
+        precos = {curso: preco(("preco", p["nome"])) for curso, p in pratos.items()}
         bebidas = {
-            "entrada": recomendar_bebida(entrada, tipo_bebida, cozinha),
-            "principal": recomendar_bebida(principal, tipo_bebida, cozinha),
-            "sobremesa_alcool": recomendar_bebida(sobremesa, "digestivos", cozinha),
-            "sobremesa_sem_alcool": recomendar_bebida(sobremesa, "sem_alcool", cozinha)
+            curso: BebidaSugerida(Bebida.de_dict(b), preco(("preco_bebida", b["nome"])))
+            for curso, b in escolhas.items()
         }
-        
+        return precos, bebidas
+
+    def _finalizar(self, ocasiao, expectativas, sugestao_especial, entrada, principal, sobremesa,
+                   precos, bebidas):
         # Calculate total cost
-        valor_total = (entrada_preco + principal_preco + sobremesa_preco +
+        valor_total = (precos["entrada"] + precos["principal"] + precos["sobremesa"] +
                        sum(b.get("preco", 0) for b in bebidas.values()))
-        
-        menu_completo = {
+
+        menu = Menu(ocasiao, expectativas, sugestao_especial, entrada, principal,
+                    sobremesa, precos, bebidas, valor_total)
+        menu.explicacao = self.ia.explicar_harmonizacao(menu.as_dict())
+        if self.pontuador is not None:
+            detalhe = self.pontuador.descrever(principal, bebidas["principal"])
+            if detalhe:
+                menu.explicacao = f"{menu.explicacao} {detalhe}"
+        return menu
+
+    @medir("montar_menu")
+    def montar_menu(self, cozinha, dieta_entrada, dieta_principal, tipo_bebida, ocasiao,
+                    expectativas, sugestao_especial=None, cache=None, rng=None, intensidade=None):
+        indice, matriz = self._catalogo(cache)
+        entrada, principal, sobremesa = self._escolher_pratos(
+            cozinha, dieta_entrada, dieta_principal, ocasiao, expectativas, indice, rng, intensidade)
+        escolhas = self._escolher_bebidas(entrada, principal, sobremesa, tipo_bebida, matriz, rng)
+        return self._compor(ocasiao, expectativas, sugestao_especial, entrada, principal,
+                            sobremesa, escolhas, cache)
+
+    def _compor(self, ocasiao, expectativas, sugestao_especial, entrada, principal, sobremesa,
+                escolhas, cache=None):
+        pratos = {"entrada": entrada, "principal": principal, "sobremesa": sobremesa}
+
+        # Fetch online prices
+        precos, bebidas = self._precificar(pratos, escolhas, cache)
+        return self._finalizar(ocasiao, expectativas, sugestao_especial, entrada, principal,
+                               sobremesa, precos, bebidas)
+
+    async def montar_menu_async(self, cozinha, dieta_entrada, dieta_principal, tipo_bebida, ocasiao,
+                                expectativas, sugestao_especial=None, precificador=None, rng=None,
+                                intensidade=None):
+        """Same as montar_menu, but lookups run concurrently and never block the loop.
+
+        When the pairing matrix already knows the dishes, every price is
+        requested at once: one round trip. Otherwise the dish lookups come
+        first, their records also feed the matrix, and the drinks are picked
+        and priced in a second round trip.
+        """
+        import asyncio
+        precificador = precificador or precificador_padrao()
+        indice, matriz = self._catalogo()
+        entrada, principal, sobremesa = self._escolher_pratos(
+            cozinha, dieta_entrada, dieta_principal, ocasiao, expectativas, indice, rng, intensidade)
+        pratos = {"entrada": entrada, "principal": principal, "sobremesa": sobremesa}
+
+        faltam = getattr(matriz, "faltam", None)
+        if faltam is not None and faltam(pratos.values()):
+            dados = await asyncio.gather(*(precificador.buscar(prato=p["nome"]) for p in pratos.values()))
+            for prato, info in zip(pratos.values(), dados):
+                matriz.registrar(prato["nome"], info)
+            if faltam(pratos.values()):
+                # Lookups that failed: the matrix fetches them itself, off the loop
+                await asyncio.get_running_loop().run_in_executor(None, matriz.preparar, tuple(pratos.values()))
+            precos = {curso: info.get("preco", PRECO_PADRAO_PRATO) for curso, info in zip(pratos, dados)}
+            escolhas = self._escolher_bebidas(entrada, principal, sobremesa, tipo_bebida, matriz, rng)
+            precos_bebidas = await asyncio.gather(
+                *(precificador.preco_bebida(b["nome"]) for b in escolhas.values()))
+        else:
+            escolhas = self._escolher_bebidas(entrada, principal, sobremesa, tipo_bebida, matriz, rng)
+            resultados = await asyncio.gather(
+                *(precificador.preco_prato(p["nome"]) for p in pratos.values()),
+                *(precificador.preco_bebida(b["nome"]) for b in escolhas.values()))
+            precos = dict(zip(pratos, resultados[:len(pratos)]))
+            precos_bebidas = resultados[len(pratos):]
+        bebidas = {
+            chave: BebidaSugerida(Bebida.de_dict(bebida), preco)
+            for (chave, bebida), preco in zip(escolhas.items(), precos_bebidas)
+        }
+        return self._finalizar(ocasiao, expectativas, sugestao_especial, entrada, principal,
+                               sobremesa, precos, bebidas)
+
+    def generate(self, contexto, rng=None):
+        """Generates one structured Menu for the given context"""
+        return self.montar_menu(rng=rng or self._rng(contexto), **self.resolver_contexto(contexto))
+
+    async def generate_async(self, contexto, precificador=None, rng=None):
+        """Async variant of generate using a PrecificadorAsync for prices"""
+        return await self.montar_menu_async(precificador=precificador, rng=rng or self._rng(contexto),
+                                            **self.resolver_contexto(contexto))
+
+    def orcamento_do_contexto(self, contexto):
+        """Budget given in the context or mentioned in its comando/expectativas, or None"""
+        if contexto.get("orcamento") is not None:
+            return contexto["orcamento"]
+        return self.ia.analisar_contexto((contexto.get("comando") or "").strip(), contexto.get("ocasiao") or "",
+                                         contexto.get("expectativas") or "").get("orcamento")
+
+    def otimizar(self, contexto, orcamento=None, quantidade=3, passo=None):
+        """Best ``quantidade`` menus with valor_total within ``orcamento``, as (nota, Menu).
+
+        Maximizes the PontuadorHarmonizacao pairing score; needs NumPy.
+        Without ``orcamento`` the budget comes from the context (e.g. "até R$ 300").
+        Returns an empty list when no menu fits the budget. The optimizer is
+        rebuilt when the catalog or the price source changes.
+        """
+        if orcamento is None:
+            orcamento = self.orcamento_do_contexto(contexto)
+            if orcamento is None:
+                raise ValueError("Informe um orçamento ou cite-o no comando")
+        from harmonizador_orcamento import OtimizadorMenu
+        versao = versao_dados()
+        if self._otimizador is None or self._otimizador[0] != versao:
+            self._otimizador = (versao, OtimizadorMenu(self))
+        return self._otimizador[1].melhores(contexto, orcamento, quantidade, passo)
+
+    @medir("generate_batch")
+    def generate_batch(self, contextos, semente=None):
+        """Generates one Menu per context, sharing lookups across the whole batch.
+
+        Context analysis and dish/drink prices are resolved once per distinct
+        key and reused by every request in the batch; filtered candidate lists
+        come from one IndiceCardapio/MatrizHarmonizacao snapshot for the batch.
+
+        With ``semente`` the draws of every context without its own
+        ``semente`` are made in bulk by an AmostradorLote, so the same batch
+        and seed always give the same menus.
+        """
+        cache = {}
+        indice, matriz = self._catalogo(cache)
+        contextos = list(contextos)
+        resolvidos = [self.resolver_contexto(contexto, cache) for contexto in contextos]
+        rngs = [self._rng(contexto) for contexto in contextos]
+
+        sorteados = {}
+        if semente is not None:
+            livres = [i for i, rng in enumerate(rngs) if rng is None]
+            sorteados = dict(zip(livres, self._sortear_lote(
+                [resolvidos[i] for i in livres], AmostradorLote(semente), indice, matriz)))
+
+        menus = []
+        for i, resolvido in enumerate(resolvidos):
+            if i in sorteados:
+                menus.append(self._compor(resolvido["ocasiao"], resolvido["expectativas"],
+                                          resolvido["sugestao_especial"], *sorteados[i], cache))
+            else:
+                menus.append(self.montar_menu(cache=cache, rng=rngs[i], **resolvido))
+        return menus
+
+# ================== CACHE DE MENUS ==================
+# Resolved-context fields a cached menu depends on
+CAMPOS_CHAVE_MENU = ("cozinha", "dieta_entrada", "dieta_principal", "tipo_bebida",
+                     "ocasiao", "expectativas", "sugestao_especial", "intensidade")
+
+class CacheMenus:
+    """Bounded LRU cache of generated menus in front of a MenuEngine.
+
+    Keyed by the resolved context (SistemaIA.analisar_contexto merged with
+    the manual overrides), so different wordings that resolve to the same
+    choices share an entry. Each key holds up to ``variantes`` menus: the
+    first requests for a key generate new variants, later ones rotate over
+    the pool, keeping variety without generating again. Contexts with a
+    ``semente`` are deterministic and keep a single menu per seed.
+
+    Everything is dropped when versao_dados() changes (catalog swap or
+    edit, new pricing source, prices refreshed by a CachePrecos). Sources
+    without a ``versao`` counter cannot report price changes, so each menu
+    is also served for at most ``max_idade`` seconds (None keeps it until
+    invalidated). Cached Menu objects are shared between callers and must
+    be treated as read-only.
+
+        cache = CacheMenus(MenuEngine(), variantes=4)
+        menu = cache.generate({"ocasiao": "Amigos"})
+    """
+
+    def __init__(self, engine=None, max_chaves=1024, variantes=1, max_idade=300.0, relogio=time.monotonic):
+        self.engine = engine or MenuEngine()
+        self.max_chaves = max_chaves
+        self.variantes = max(int(variantes), 1)
+        self.max_idade = max_idade
+        self.relogio = relogio
+        self._itens = OrderedDict()     # chave -> [[(menu, expira_em)], próximo índice]
+        self._lock = threading.Lock()
+        self._versao = versao_dados()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidacoes = 0
+        self.expirados = 0
+
+    @staticmethod
+    def chave(resolvido, semente=None):
+        # "" and None select the same thing in every filter
+        chave = tuple(resolvido.get(campo) or None for campo in CAMPOS_CHAVE_MENU)
+        return chave if semente is None else chave + (("semente", semente),)
+
+    def _verificar_versao(self):
+        versao = versao_dados()
+        if versao != self._versao:
+            with self._lock:
+                if versao != self._versao:
+                    self._itens.clear()
+                    self._versao = versao
+                    self.invalidacoes += 1
+
+    def _servir(self, chave, limite):
+        """A pooled menu for ``chave``, or None when the pool still has room"""
+        agora = self.relogio()
+        with self._lock:
+            item = self._itens.get(chave)
+            if item is not None:
+                validos = [entrada for entrada in item[0] if agora < entrada[1]]
+                if len(validos) < len(item[0]):
+                    self.expirados += len(item[0]) - len(validos)
+                    item[0] = validos
+                    item[1] = 0
+            if item is None or len(item[0]) < limite:
+                self.misses += 1
+                return None
+            self._itens.move_to_end(chave)
+            self.hits += 1
+            menus, proximo = item
+            item[1] = (proximo + 1) % len(menus)
+            return menus[proximo][0]
+
+    def _guardar(self, chave, menu, limite, versao):
+        with self._lock:
+            if versao != self._versao:
+                return  # generated from data that has been replaced since
+            item = self._itens.get(chave)
+            if item is None:
+                self._itens[chave] = item = [[], 0]
+            if len(item[0]) < limite:
+                expira_em = float("inf") if self.max_idade is None else self.relogio() + self.max_idade
+                item[0].append((menu, expira_em))
+            self._itens.move_to_end(chave)
+            while len(self._itens) > self.max_chaves:
+                self._itens.popitem(last=False)
+                self.evictions += 1
+
+    def montar_menu(self, cozinha, dieta_entrada, dieta_principal, tipo_bebida, ocasiao,
+                    expectativas, sugestao_especial=None, rng=None, intensidade=None):
+        """Drop-in for MenuEngine.montar_menu; ``rng`` only drives new variants"""
+        resolvido = {
+            "cozinha": cozinha,
+            "dieta_entrada": dieta_entrada,
+            "dieta_principal": dieta_principal,
+            "tipo_bebida": tipo_bebida,
             "ocasiao": ocasiao,
             "expectativas": expectativas,
-            "entrada": entrada,
-            "principal": principal,
-            "sobremesa": sobremesa,
-            "bebidas": bebidas,
-            "valor_total": valor_total
+            "sugestao_especial": sugestao_especial,
+            "intensidade": intensidade,
         }
-        
-        self.explicacao_detalhada = self.ia.explicar_harmonizacao(menu_completo)
-        self.menu_gerado = self.formatar_menu(menu_completo, entrada_preco, principal_preco, sobremesa_preco)
-        
-        if manual:
-            self.exibir_resultado_manual(self.menu_gerado)
-        else:
-            self.exibir_resultado_auto(self.menu_gerado)
+        return self._obter(resolvido, rng)
 
-    def selecionar_com_fallback(self, categoria, cozinha, dieta):
-        filtros = {}
-        if cozinha:
-            filtros["cozinha"] = cozinha
-        if dieta:
-            filtros["dieta"] = dieta
-        
-        itens = filtrar_itens(cardapio[categoria], filtros)
-        if not itens:
-            itens = cardapio[categoria]
-        return random.choice(itens)
-
-    def formatar_menu(self, menu, entrada_preco, principal_preco, sobremesa_preco):
-        data_atual = datetime.now().strftime("%d/%m/%Y %H:%M")
-        texto = f"""🍽️ *MENU RECOMENDADO* • {data_atual}
+    def _obter(self, resolvido, rng=None, semente=None):
+        self._verificar_versao()
+        versao = self._versao
+        chave = self.chave(resolvido, semente)
+        limite = 1 if semente is not None else self.variantes
+        menu = self._servir(chave, limite)
+        if menu is None:
+            menu = self.engine.montar_menu(rng=rng, **resolvido)
+            self._guardar(chave, menu, limite, versao)
+        return menu
+
+    def generate(self, contexto, rng=None):
+        """Same as MenuEngine.generate, served from the cache when possible"""
+        semente = contexto.get("semente")
+        return self._obter(self.engine.resolver_contexto(contexto),
+                           rng or self.engine._rng(contexto), semente)
+
+    def limpar(self):
+        with self._lock:
+            self._itens.clear()
+
+    def estatisticas(self):
+        with self._lock:
+            consultas = self.hits + self.misses
+            return {
+                "chaves": len(self._itens),
+                "max_chaves": self.max_chaves,
+                "variantes": self.variantes,
+                "menus": sum(len(menus) for menus, _ in self._itens.values()),
+                "hits": self.hits,
+                "misses": self.misses,
+                "taxa_acerto": round(self.hits / consultas, 3) if consultas else 0.0,
+                "evictions": self.evictions,
+                "invalidacoes": self.invalidacoes,
+                "expirados": self.expirados,
+                "max_idade": self.max_idade,
+            }
+
+# ================== RENDERIZAÇÃO DE MENUS ==================
+SUGESTAO_PADRAO = "Sugestão especial: Uma experiência única!"
+
+TEMPLATE_WHATSAPP = """🍽️ *MENU RECOMENDADO* • {data}
 ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
-🎉 *Ocasião*: {menu['ocasiao']}
-✨ *Expectativas*: {menu['expectativas']}
+🎉 *Ocasião*: {ocasiao}
+✨ *Expectativas*: {expectativas}
 
-{self.sugestao_especial or "Sugestão especial: Uma experiência única!"}
+{sugestao_especial|sugestao}
 
 ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
-🍴 *ENTRADA*: {menu['entrada']['nome']}
-   ├─ *Estilo*: {menu['entrada']['tipo'].title()}
-   ├─ *Dieta*: {menu['entrada']['dieta'].title()}
-   ├─ *Preço*: R${entrada_preco}
-   └─ *Bebida*: {menu['bebidas']['entrada']['nome']}
-      ├─ *Preço*: R${menu['bebidas']['entrada']['preco']}
-      └─ *Harmonização*: {menu['bebidas']['entrada']['harmonizacao']}
+🍴 *ENTRADA*: {entrada.nome}
+   ├─ *Estilo*: {entrada.tipo|title}
+   ├─ *Dieta*: {entrada.dieta|title}
+   ├─ *Preço*: R${precos.entrada}
+   └─ *Bebida*: {bebidas.entrada.nome}
+      ├─ *Preço*: R${bebidas.entrada.preco}
+      └─ *Harmonização*: {bebidas.entrada.harmonizacao}
 
 ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
-🍲 *PRATO PRINCIPAL*: {menu['principal']['nome']}
-   ├─ *Estilo*: {menu['principal']['tipo'].title()}
-   ├─ *Dieta*: {menu['principal']['dieta'].title()}
-   ├─ *Preço*: R${principal_preco}
-   └─ *Bebida*: {menu['bebidas']['principal']['nome']}
-      ├─ *Preço*: R${menu['bebidas']['principal']['preco']}
-      └─ *Harmonização*: {menu['bebidas']['principal']['harmonizacao']}
+🍲 *PRATO PRINCIPAL*: {principal.nome}
+   ├─ *Estilo*: {principal.tipo|title}
+   ├─ *Dieta*: {principal.dieta|title}
+   ├─ *Preço*: R${precos.principal}
+   └─ *Bebida*: {bebidas.principal.nome}
+      ├─ *Preço*: R${bebidas.principal.preco}
+      └─ *Harmonização*: {bebidas.principal.harmonizacao}
 
 ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
-🍰 *SOBREMESA*: {menu['sobremesa']['nome']}
-   ├─ *Estilo*: {menu['sobremesa']['tipo'].title()}
-   ├─ *Dieta*: {menu['sobremesa']['dieta'].title()}
-   ├─ *Preço*: R${sobremesa_preco}
-   ├─ *Bebida Alcoólica*: {menu['bebidas']['sobremesa_alcool']['nome']}
-   │  ├─ *Preço*: R${menu['bebidas']['sobremesa_alcool']['preco']}
-   │  └─ *Harmonização*: {menu['bebidas']['sobremesa_alcool']['harmonizacao']}
-   └─ *Bebida Sem Álcool*: {menu['bebidas']['sobremesa_sem_alcool']['nome']}
-      ├─ *Preço*: R${menu['bebidas']['sobremesa_sem_alcool']['preco']}
-      └─ *Harmonização*: {menu['bebidas']['sobremesa_sem_alcool']['harmonizacao']}
+🍰 *SOBREMESA*: {sobremesa.nome}
+   ├─ *Estilo*: {sobremesa.tipo|title}
+   ├─ *Dieta*: {sobremesa.dieta|title}
+   ├─ *Preço*: R${precos.sobremesa}
+   ├─ *Bebida Alcoólica*: {bebidas.sobremesa_alcool.nome}
+   │  ├─ *Preço*: R${bebidas.sobremesa_alcool.preco}
+   │  └─ *Harmonização*: {bebidas.sobremesa_alcool.harmonizacao}
+   └─ *Bebida Sem Álcool*: {bebidas.sobremesa_sem_alcool.nome}
+      ├─ *Preço*: R${bebidas.sobremesa_sem_alcool.preco}
+      └─ *Harmonização*: {bebidas.sobremesa_sem_alcool.harmonizacao}
 
 ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
-💰 *VALOR TOTAL*: R${menu['valor_total']:.2f}"""
-        return texto
+💰 *VALOR TOTAL*: R${valor_total|moeda}"""
 
-    def mostrar_explicacao(self):
-        if not self.explicacao_detalhada:
-            messagebox.showwarning("Aviso", "Gere um menu primeiro!")
-            return
-        explicacao_window = tk.Toplevel(self.root)
-        explicacao_window.title("Explicação do Métre")
-        text_area = scrolledtext.ScrolledText(explicacao_window, wrap=tk.WORD, font=('Arial', 11))
-        text_area.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
-        text_area.insert(tk.END, self.explicacao_detalhada)
-        ttk.Button(explicacao_window, text="Fechar", command=explicacao_window.destroy).pack(pady=10)
-
-    def salvar_menu(self):
-        if not self.menu_gerado:
-            messagebox.showerror("Erro", "Nenhum menu para salvar!")
-            return
-        filename = f"menu_{datetime.now().strftime('%Y%m%d_%H%M%S')}.txt"
-        with open(filename, "w", encoding="utf-8") as f:
-            f.write(self.menu_gerado)
-            if self.explicacao_detalhada:
-                f.write("\n\n=== ANÁLISE DO MÉTRE ===\n" + self.explicacao_detalhada)
-        messagebox.showinfo("Sucesso", f"Menu salvo como '{filename}'")
-
-    def exibir_resultado_manual(self, texto):
-        self.resultado_manual.config(state=tk.NORMAL)
-        self.resultado_manual.delete(1.0, tk.END)
-        self.resultado_manual.insert(tk.END, texto)
-        self.resultado_manual.config(state=tk.DISABLED)
-
-    def exibir_resultado_auto(self, texto):
-        self.resultado_auto.config(state=tk.NORMAL)
-        self.resultado_auto.delete(1.0, tk.END)
-        self.resultado_auto.insert(tk.END, texto)
-        self.resultado_auto.config(state=tk.DISABLED)
-
-    def limpar_tela(self):
-        self.menu_gerado = None
-        self.explicacao_detalhada = None
-        self.sugestao_especial = None
-        self.exibir_resultado_manual("Selecione suas preferências e clique em 'Gerar Menu'.")
-        self.entrada_comando.delete(0, tk.END)
-        self.ocasiao.set("")
-        self.expectativas.set("")
-        self.cozinha.set("")
-        self.dieta_entrada.set("")
-        self.dieta_principal.set("")
-        self.tipo_bebida.set("vinhos")
+# Same layout without the WhatsApp bold markers
+TEMPLATE_TEXTO = TEMPLATE_WHATSAPP.replace("*", "")
+
+TEMPLATE_HTML = """<article class="menu">
+<h2>🍽️ Menu Recomendado <small>{data}</small></h2>
+<p><strong>Ocasião:</strong> {ocasiao}<br><strong>Expectativas:</strong> {expectativas}</p>
+<p class="sugestao">{sugestao_especial|sugestao}</p>
+<section class="curso"><h3>🍴 Entrada: {entrada.nome}</h3><ul>
+<li>Estilo: {entrada.tipo|title}</li><li>Dieta: {entrada.dieta|title}</li><li>Preço: R${precos.entrada}</li>
+<li>Bebida: {bebidas.entrada.nome} (R${bebidas.entrada.preco}, {bebidas.entrada.harmonizacao})</li>
+</ul></section>
+<section class="curso"><h3>🍲 Prato Principal: {principal.nome}</h3><ul>
+<li>Estilo: {principal.tipo|title}</li><li>Dieta: {principal.dieta|title}</li><li>Preço: R${precos.principal}</li>
+<li>Bebida: {bebidas.principal.nome} (R${bebidas.principal.preco}, {bebidas.principal.harmonizacao})</li>
+</ul></section>
+<section class="curso"><h3>🍰 Sobremesa: {sobremesa.nome}</h3><ul>
+<li>Estilo: {sobremesa.tipo|title}</li><li>Dieta: {sobremesa.dieta|title}</li><li>Preço: R${precos.sobremesa}</li>
+<li>Bebida Alcoólica: {bebidas.sobremesa_alcool.nome} (R${bebidas.sobremesa_alcool.preco}, {bebidas.sobremesa_alcool.harmonizacao})</li>
+<li>Bebida Sem Álcool: {bebidas.sobremesa_sem_alcool.nome} (R${bebidas.sobremesa_sem_alcool.preco}, {bebidas.sobremesa_sem_alcool.harmonizacao})</li>
+</ul></section>
+<p class="total">💰 <strong>Valor Total:</strong> R${valor_total|moeda}</p>
+</article>
+"""
+
+# Filter name -> Python expression applied to the field value ``{v}``
+FILTROS_TEMPLATE = {
+    "": "{v}",
+    "title": "str({v}).title()",
+    "moeda": 'format({v}, ".2f")',
+    "sugestao": "({v} or _sugestao)",
+}
+
+def _expressao_campo(expressao, escapar):
+    """``bebidas.entrada.preco|filtro`` -> Python source reading it from ``menu``"""
+    caminho, _, nome_filtro = expressao.partition("|")
+    partes = caminho.split(".")
+    if not all(parte.isidentifier() for parte in partes):
+        raise ValueError(f"Campo inválido no template: {expressao!r}")
+    if caminho == "data":
+        acesso = "data"
+    else:
+        acesso = "menu." + partes[0] + "".join(f'["{chave}"]' for chave in partes[1:])
+    if nome_filtro not in FILTROS_TEMPLATE:
+        raise ValueError(f"Filtro desconhecido no template: {nome_filtro!r} em {expressao!r}")
+    codigo = FILTROS_TEMPLATE[nome_filtro].format(v=acesso)
+    return f"_escapar(str({codigo}))" if escapar else codigo
+
+def _literal_fstring(texto):
+    """Escapes template text for the literal part of a single-quoted f-string"""
+    for original, escapado in (("\\", "\\\\"), ("'", "\\'"), ("\n", "\\n"), ("\r", "\\r"),
+                               ("{", "{{"), ("}", "}}")):
+        texto = texto.replace(original, escapado)
+    return texto
+
+def compilar_template(template, escapar=None):
+    """Compiles a template into one function ``(menu, data) -> str``.
+
+    The layout is parsed once and turned into a single f-string, so a render
+    is one string build with no intermediate pieces or per-field lookups
+    into the template.
+    """
+    partes = []
+    for literal, expressao, _, _ in string.Formatter().parse(template):
+        partes.append(_literal_fstring(literal))
+        if expressao is not None:
+            partes.append("{" + _expressao_campo(expressao, escapar) + "}")
+    codigo = "def _render(menu, data):\n    return f'" + "".join(partes) + "'\n"
+    namespace = {"_sugestao": SUGESTAO_PADRAO, "_escapar": escapar}
+    exec(compile(codigo, "<template de menu>", "exec"), namespace)
+    return namespace["_render"]
+
+class RenderizadorMenu:
+    """Menu layout compiled on first use, written straight to a file-like sink.
+
+    The header date has minute resolution, so it is formatted at most once
+    per minute; ``render_lote`` uses a single date for a whole batch.
+    """
+
+    def __init__(self, template, escapar=None):
+        self.template = template
+        self.escapar = escapar
+        self._compilado = None
+        self._minuto = None
+        self._data = None
+
+    @property
+    def _render(self):
+        # Compiling is idempotent, so two threads racing here are harmless
+        if self._compilado is None:
+            self._compilado = compilar_template(self.template, self.escapar)
+        return self._compilado
+
+    def data_atual(self):
+        minuto = int(time.time() // 60)
+        if minuto != self._minuto:
+            self._data = datetime.now().strftime("%d/%m/%Y %H:%M")
+            self._minuto = minuto
+        return self._data
+
+    def render(self, menu, sink, data=None):
+        sink.write(self._render(menu, data or self.data_atual()))
+
+    def render_lote(self, menus, sink, separador="\n\n"):
+        data = self.data_atual()
+        render = self._render
+        if instrumentacao.ativa:
+            # Same stage as formatar_menu, one observation per menu
+            render = medir("formatar_menu")(render)
+        escrever = sink.write
+        for menu in menus:
+            escrever(render(menu, data))
+            escrever(separador)
+
+    def renderizar(self, menu, data=None):
+        return self._render(menu, data or self.data_atual())
+
+RENDERIZADORES = {
+    "whatsapp": RenderizadorMenu(TEMPLATE_WHATSAPP),
+    "texto": RenderizadorMenu(TEMPLATE_TEXTO),
+    "html": RenderizadorMenu(TEMPLATE_HTML, escapar=html.escape),
+}
+
+@medir("formatar_menu")
+def formatar_menu(menu, formato="whatsapp"):
+    """Pretty WhatsApp-style text rendering of a Menu (or ``texto`` / ``html``)"""
+    return RENDERIZADORES[formato].renderizar(menu)
+
+# ================== EXPORTAÇÃO DE MENUS ==================
+CURSOS = ("entrada", "principal", "sobremesa")
+BEBIDAS_MENU = ("entrada", "principal", "sobremesa_alcool", "sobremesa_sem_alcool")
+
+CAMPOS_CSV = (
+    ("gerado_em", "ocasiao", "expectativas", "sugestao_especial")
+    + tuple(f"{curso}{sufixo}" for curso in CURSOS for sufixo in ("", "_tipo", "_dieta", "_preco"))
+    + tuple(f"bebida_{curso}{sufixo}" for curso in BEBIDAS_MENU
+            for sufixo in ("", "_tipo", "_harmonizacao", "_preco"))
+    + ("valor_total", "explicacao")
+)
+
+def menu_para_registro(menu, gerado_em=None):
+    """Plain, JSON-serializable record of a Menu"""
+    return {
+        "gerado_em": gerado_em or datetime.now().isoformat(timespec="seconds"),
+        "ocasiao": menu.ocasiao,
+        "expectativas": menu.expectativas,
+        "sugestao_especial": menu.sugestao_especial,
+        "itens": {
+            curso: {
+                "nome": prato.get("nome"),
+                "tipo": prato.get("tipo"),
+                "dieta": prato.get("dieta"),
+                "intensidade": prato.get("intensidade"),
+                "preco": menu.precos[curso],
+            }
+            for curso, prato in zip(CURSOS, (menu.entrada, menu.principal, menu.sobremesa))
+        },
+        "bebidas": {
+            curso: {
+                "nome": bebida.get("nome"),
+                "tipo": bebida.get("tipo"),
+                "harmonizacao": bebida.get("harmonizacao"),
+                "preco": bebida.get("preco"),
+            }
+            for curso, bebida in menu.bebidas.items()
+        },
+        "valor_total": menu.valor_total,
+        "explicacao": menu.explicacao,
+    }
+
+def _linha_csv(registro):
+    linha = {campo: registro[campo] for campo in ("gerado_em", "ocasiao", "expectativas",
+                                                   "sugestao_especial", "valor_total", "explicacao")}
+    for curso, item in registro["itens"].items():
+        linha[curso] = item["nome"]
+        linha[f"{curso}_tipo"] = item["tipo"]
+        linha[f"{curso}_dieta"] = item["dieta"]
+        linha[f"{curso}_preco"] = item["preco"]
+    for curso, bebida in registro["bebidas"].items():
+        linha[f"bebida_{curso}"] = bebida["nome"]
+        linha[f"bebida_{curso}_tipo"] = bebida["tipo"]
+        linha[f"bebida_{curso}_harmonizacao"] = bebida["harmonizacao"]
+        linha[f"bebida_{curso}_preco"] = bebida["preco"]
+    return linha
+
+
+class ExportadorMenus:
+    """Appends menus to a JSONL, CSV or text file in constant memory.
+
+    Writes go through a large buffer and are fsync'ed every ``fsync_a_cada``
+    menus and on close, so a crash loses at most that many records. The
+    ``txt`` format is the pretty formatar_menu rendering of the same menus.
+
+        with ExportadorMenus("menus.jsonl") as exportador:
+            exportador.escrever_todos(engine.generate(c) for c in contextos)
+    """
+    FORMATOS = ("jsonl", "csv", "txt")
+
+    def __init__(self, caminho, formato=None, fsync_a_cada=1000, buffer=1 << 20):
+        self.caminho = caminho
+        self.formato = formato or os.path.splitext(caminho)[1].lstrip(".").lower() or "jsonl"
+        if self.formato not in self.FORMATOS:
+            raise ValueError(f"Formato de exportação desconhecido: {self.formato}")
+        self.fsync_a_cada = fsync_a_cada
+        novo = not os.path.exists(caminho) or os.path.getsize(caminho) == 0
+        self.arquivo = open(caminho, "a", encoding="utf-8", newline="", buffering=buffer)
+        self.escritos = 0
+        self._csv = None
+        if self.formato == "csv":
+            self._csv = csv.DictWriter(self.arquivo, fieldnames=CAMPOS_CSV)
+            if novo:
+                self._csv.writeheader()
+
+    def escrever(self, menu):
+        if self.formato == "txt":
+            RENDERIZADORES["whatsapp"].render(menu, self.arquivo)
+            if menu.explicacao:
+                self.arquivo.write("\n\n=== ANÁLISE DO MÉTRE ===\n")
+                self.arquivo.write(menu.explicacao)
+            self.arquivo.write("\n\n")
+        else:
+            registro = menu_para_registro(menu)
+            if self._csv is not None:
+                self._csv.writerow(_linha_csv(registro))
+            else:
+                self.arquivo.write(json.dumps(registro, ensure_ascii=False))
+                self.arquivo.write("\n")
+        self.escritos += 1
+        if self.fsync_a_cada and self.escritos % self.fsync_a_cada == 0:
+            self.sincronizar()
+
+    def escrever_todos(self, menus):
+        """Consumes any iterable (e.g. a generator) one menu at a time"""
+        for menu in menus:
+            self.escrever(menu)
+        return self.escritos
+
+    def sincronizar(self):
+        self.arquivo.flush()
+        os.fsync(self.arquivo.fileno())
+
+    def fechar(self):
+        if not self.arquivo.closed:
+            self.sincronizar()
+            self.arquivo.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.fechar()
+
+def exportar_menus(menus, caminho, formato=None, fsync_a_cada=1000):
+    """Streams menus to ``caminho``; returns how many were written"""
+    with ExportadorMenus(caminho, formato, fsync_a_cada) as exportador:
+        return exportador.escrever_todos(menus)
+
+# ================== LINHA DE COMANDO ==================
+FORMATOS_SAIDA = ("jsonl", "csv", "whatsapp", "texto", "html")
+
+def ler_contextos(fluxo):
+    """Yields one context dict per JSONL line; bad lines are reported and skipped"""
+    for numero, linha in enumerate(fluxo, 1):
+        linha = linha.strip()
+        if not linha:
+            continue
+        try:
+            contexto = json.loads(linha)
+        except ValueError as e:
+            print(f"⚠️ Linha {numero} ignorada: {str(e)}", file=sys.stderr)
+            continue
+        if not isinstance(contexto, dict):
+            print(f"⚠️ Linha {numero} ignorada: esperado um objeto JSON", file=sys.stderr)
+            continue
+        yield contexto
+
+def serializar_menus(menus, formato="jsonl"):
+    """One block of output text for a list of menus (CSV rows without header).
+
+    Text and HTML renders are measured under ``formatar_menu``.
+    """
+    gerado_em = datetime.now().isoformat(timespec="seconds")
+    if formato == "jsonl":
+        return "".join(json.dumps(menu_para_registro(menu, gerado_em), ensure_ascii=False) + "\n"
+                       for menu in menus)
+    sink = io.StringIO()
+    if formato == "csv":
+        escritor = csv.DictWriter(sink, fieldnames=CAMPOS_CSV)
+        for menu in menus:
+            escritor.writerow(_linha_csv(menu_para_registro(menu, gerado_em)))
+    else:
+        RENDERIZADORES[formato].render_lote(menus, sink)
+    return sink.getvalue()
+
+def _em_lotes(iteravel, tamanho):
+    lote = []
+    for item in iteravel:
+        lote.append(item)
+        if len(lote) >= tamanho:
+            yield lote
+            lote = []
+    if lote:
+        yield lote
+
+_engine_processo = None
+
+def _iniciar_processo(catalogo=None):
+    global _engine_processo
+    if catalogo is not None:
+        # Every worker maps the compiled file (pages shared, records built on use), not the JSON
+        from harmonizador_catalogo import carregar_catalogo
+        carregar_catalogo(catalogo)
+    _engine_processo = MenuEngine()
+
+def _processar_lote(contextos, formato, semente=None):
+    engine = _engine_processo or MenuEngine()
+    return serializar_menus(engine.generate_batch(contextos, semente), formato)
+
+def _processar_lote_medido(contextos, formato, semente=None):
+    # Worker side of an instrumented run: the stage data goes back with the block
+    instrumentacao.ativar()
+    bloco = _processar_lote(contextos, formato, semente)
+    return bloco, instrumentacao.coletar(zerar=True)
+
+def gerar_fluxo(contextos, formato="jsonl", workers=1, tamanho_lote=256, semente=None, catalogo=None):
+    """Yields serialized output blocks for ``contextos``, in input order.
+
+    Contexts are consumed lazily in chunks of ``tamanho_lote``. With more
+    than one worker the chunks go to a multiprocessing pool, keeping at most
+    two chunks per worker in flight so memory stays bounded.
+
+    With ``semente`` each chunk is sampled from its own seed derived from
+    (semente, chunk number): the output depends on the seed and chunk size
+    only, never on the number of workers. ``catalogo`` is a compiled catalog
+    file for the workers to map. While instrumentacao is on, the workers'
+    stage data is merged into this process's.
+    """
+    lotes = _em_lotes(contextos, tamanho_lote)
+
+    def semente_do_lote(numero):
+        return None if semente is None else semente_de(semente, numero)
+
+    if workers <= 1:
+        for numero, lote in enumerate(lotes):
+            yield _processar_lote(lote, formato, semente_do_lote(numero))
+        return
+
+    medido = instrumentacao.ativa
+    tarefa = _processar_lote_medido if medido else _processar_lote
+
+    def resultado(pendente):
+        bloco = pendente.get()
+        if medido:
+            bloco, dados = bloco
+            instrumentacao.mesclar(dados)
+        return bloco
+
+    import multiprocessing
+    with multiprocessing.Pool(workers, initializer=_iniciar_processo, initargs=(catalogo,)) as pool:
+        pendentes = deque()
+        for numero, lote in enumerate(lotes):
+            pendentes.append(pool.apply_async(tarefa, (lote, formato, semente_do_lote(numero))))
+            if len(pendentes) >= 2 * workers:
+                yield resultado(pendentes.popleft())
+        while pendentes:
+            yield resultado(pendentes.popleft())
+
+def _contexto_dos_argumentos(args):
+    return {
+        "ocasiao": args.ocasiao,
+        "expectativas": args.expectativas,
+        "comando": args.comando,
+        "cozinha": args.cozinha,
+        "dieta_entrada": args.dieta_entrada or args.dieta,
+        "dieta_principal": args.dieta_principal or args.dieta,
+        "tipo_bebida": args.tipo_bebida,
+        "intensidade": args.intensidade,
+    }
+
+def main(argv=None):
+    """Command-line entry point; with no arguments opens the GUI"""
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        prog="Harmonizador", description="Métre Digital: menus harmonizados, com ou sem interface gráfica.")
+    subcomandos = parser.add_subparsers(dest="modo")
+    gui = subcomandos.add_parser("gui", help="abre a interface gráfica (padrão sem argumentos)")
+
+    gerar = subcomandos.add_parser("gerar", help="gera N menus para um mesmo contexto")
+    gerar.add_argument("-n", "--quantidade", type=int, default=1)
+    gerar.add_argument("--ocasiao", required=True)
+    gerar.add_argument("--expectativas", default="")
+    gerar.add_argument("--comando", default="", help="pedido em texto livre, como no campo 'Comando Específico'")
+    gerar.add_argument("--cozinha")
+    gerar.add_argument("--dieta", help="dieta da entrada e do prato principal")
+    gerar.add_argument("--dieta-entrada")
+    gerar.add_argument("--dieta-principal")
+    gerar.add_argument("--tipo-bebida")
+    gerar.add_argument("--intensidade", choices=tuple(INTENSIDADES_COMPATIVEIS))
+    gerar.add_argument("--orcamento", type=float,
+                       help="valor máximo do menu: devolve os N melhores menus dentro dele (requer NumPy)")
+
+    lote = subcomandos.add_parser("lote", help="lê contextos JSONL de um arquivo ou da entrada padrão")
+    lote.add_argument("entrada", nargs="?", default="-", help="arquivo JSONL ('-' para stdin)")
+
+    for subparser in (gerar, lote):
+        subparser.add_argument("--formato", choices=FORMATOS_SAIDA, default="jsonl")
+        subparser.add_argument("--workers", type=int, default=1, help="processos em paralelo (0 = um por núcleo)")
+        subparser.add_argument("--tamanho-lote", type=int, default=256, help="contextos por tarefa de worker")
+        subparser.add_argument("--saida", default="-", help="arquivo de saída ('-' para stdout)")
+        subparser.add_argument("--metricas", choices=("prometheus", "json"),
+                               help="mede as etapas e escreve as métricas na saída de erro ao final")
+        subparser.add_argument("--perfil", action="store_true",
+                               help="perfila um pedido (cProfile + tracemalloc) e escreve o relatório na saída de erro")
+    for subparser in (gui, gerar, lote):
+        subparser.add_argument("--semente", help="semente para sorteios reproduzíveis")
+        subparser.add_argument("--catalogo", help="catálogo em JSON (compilado e recarregado automaticamente)")
+
+    args = parser.parse_args(argv)
+    armazem = None
+    if getattr(args, "catalogo", None):
+        from harmonizador_catalogo import ArmazemCatalogo
+        armazem = ArmazemCatalogo(args.catalogo)
+        try:
+            armazem.carregar()
+        except (OSError, ValueError, TypeError) as e:
+            parser.error(f"catálogo inválido: {str(e)}")
+
+    if args.modo in (None, "gui"):
+        from harmonizador_gui import main as main_gui
+        if armazem is not None:
+            armazem.observar()
+        main_gui(getattr(args, "semente", None))
+        return 0
+
+    if args.modo == "gerar":
+        contextos = itertools.repeat(_contexto_dos_argumentos(args), max(args.quantidade, 0))
+        fluxo_entrada = None
+    else:
+        try:
+            fluxo_entrada = sys.stdin if args.entrada == "-" else open(args.entrada, encoding="utf-8")
+        except OSError as e:
+            parser.error(f"não foi possível ler {args.entrada}: {e.strerror or str(e)}")
+        contextos = ler_contextos(fluxo_entrada)
+
+    if args.metricas:
+        instrumentacao.ativar()
+    if args.perfil:
+        # One request of the run, in this process, before the output starts
+        if args.modo == "gerar":
+            contexto_perfil = _contexto_dos_argumentos(args)
+        else:
+            contextos = iter(contextos)
+            contexto_perfil = next(contextos, None)
+            if contexto_perfil is not None:
+                contextos = itertools.chain([contexto_perfil], contextos)
+        if contexto_perfil is not None:
+            _, relatorio = capturar_perfil(MenuEngine().generate, contexto_perfil)
+            print(relatorio, file=sys.stderr)
+
+    workers = args.workers if args.workers > 0 else (os.cpu_count() or 1)
+    if getattr(args, "orcamento", None) is not None:
+        melhores = MenuEngine().otimizar(_contexto_dos_argumentos(args), args.orcamento, max(args.quantidade, 1))
+        if not melhores:
+            print(f"Nenhum menu completo cabe no orçamento de R${args.orcamento:.2f}", file=sys.stderr)
+            return 1
+        blocos = [serializar_menus([menu for _, menu in melhores], args.formato)]
+    else:
+        blocos = gerar_fluxo(contextos, args.formato, workers, max(args.tamanho_lote, 1), args.semente,
+                             armazem.compilado if armazem is not None else None)
+    try:
+        saida = sys.stdout if args.saida == "-" else open(args.saida, "w", encoding="utf-8", newline="")
+    except OSError as e:
+        parser.error(f"não foi possível escrever {args.saida}: {e.strerror or str(e)}")
+    try:
+        if args.formato == "csv":
+            csv.DictWriter(saida, fieldnames=CAMPOS_CSV).writeheader()
+        for bloco in blocos:
+            saida.write(bloco)
+        saida.flush()
+    except BrokenPipeError:
+        # Output closed early (e.g. piped into head); not an error
+        sys.stdout = None
+    finally:
+        if saida is not sys.stdout and saida is not None:
+            saida.close()
+        if fluxo_entrada is not None and fluxo_entrada is not sys.stdin:
+            fluxo_entrada.close()
+    if args.metricas:
+        sys.stderr.write(instrumentacao.exportar(args.metricas))
+    return 0
 
 # ================== EXECUÇÃO ==================
 if __name__ == "__main__":
-    root = tk.Tk()
-    app = HarmonizadorApp(root)
-    root.mainloop()
\ No newline at end of file
+    # Run from the importable module so that helpers importing Harmonizador
+    # (GUI, optimizer, pool workers) share its classes instead of __main__'s
+    import Harmonizador
+    sys.exit(Harmonizador.main())
@@ -0,0 +1,285 @@
+"""Hot-path benchmark of selection, pairing, pricing and rendering.
+
+Builds synthetic catalogs in the ``cardapio``/``bebidas_base`` shape (N items
+in total, half dishes and half drinks, with matching mock API data) and
+measures throughput and p50/p99 latency of ``IndiceCardapio.filtrar``,
+``selecionar_com_fallback``, ``recomendar_bebida``, ``fetch_online_data``,
+``formatar_menu`` and a full headless ``MenuEngine.generate``, plus peak
+memory. Each size runs in a fresh
+interpreter so memory figures do not leak between sizes. Results are written
+as JSON; ``--comparar`` checks them against a previous run:
+
+    python benchmarks/bench_geracao.py --saida base.json
+    python benchmarks/bench_geracao.py --tamanhos 10,1000 --comparar base.json
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+from datetime import datetime
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+TAMANHOS = (10, 1000, 100000, 1000000)
+
+# Per operation: stop after this many seconds or iterations, whichever comes first
+TEMPO_POR_OPERACAO = 1.0
+MAX_ITERACOES = 20000
+MIN_ITERACOES = 5
+
+# p50 growth over the previous run that counts as a regression
+TOLERANCIA = 0.25
+
+COZINHAS = ("italiana", "francesa", "mediterrânea", "europeia", "japonesa", "mexicana", "brasileira",
+            "indiana", "tailandesa", "peruana")
+DIETAS = ("vegetariana", "vegana", "carnes", "peixes")
+INTENSIDADES = ("leve", "média", "alta")
+TAGS = ("Aperitivos", "Queijos", "Carnes", "Pratos fortes", "Peixes", "Saladas", "Entradas",
+        "Pratos leves", "Sobremesas", "Doces", "Geral")
+CATEGORIAS_PRATO = (("entradas", 0.4), ("principais", 0.4), ("sobremesas", 0.2))
+CATEGORIAS_BEBIDA = ("vinhos", "cervejas", "digestivos", "sem_alcool")
+
+def catalogo_sintetico(tamanho, semente=0):
+    """(cardapio, bebidas_base, dados da API) with ``tamanho`` items in total"""
+    from Harmonizador import Bebida, Prato, Sobremesa
+
+    rng = random.Random(semente)
+    n_pratos = max(tamanho // 2, len(CATEGORIAS_PRATO))
+    n_bebidas = max(tamanho - tamanho // 2, len(CATEGORIAS_BEBIDA))
+
+    cardapio = {}
+    api_pratos = {}
+    gastronomias = {}
+    inicio = 0
+    for numero, (categoria, fracao) in enumerate(CATEGORIAS_PRATO):
+        quantidade = (n_pratos - inicio if numero == len(CATEGORIAS_PRATO) - 1
+                      else max(int(n_pratos * fracao), 1))
+        pratos = []
+        for i in range(inicio, inicio + quantidade):
+            nome = f"Prato {i:07d}"
+            cozinha = rng.choice(COZINHAS)
+            campos = dict(nome=nome, tipo=cozinha, dieta=rng.choice(DIETAS), intensidade=rng.choice(INTENSIDADES))
+            if categoria == "sobremesas":
+                pratos.append(Sobremesa(harmonizacao=rng.choice(TAGS), dica_servico="Servir gelado", **campos))
+            else:
+                pratos.append(Prato(**campos))
+            api_pratos[nome] = {"preco": rng.randint(20, 150), "gastronomia": cozinha}
+            gastronomias.setdefault(cozinha, []).append(nome)
+        cardapio[categoria] = pratos
+        inicio += quantidade
+
+    bebidas_base = {categoria: [] for categoria in CATEGORIAS_BEBIDA}
+    api_bebidas = {}
+    for i in range(n_bebidas):
+        nome = f"Bebida {i:07d}"
+        categoria = CATEGORIAS_BEBIDA[i % len(CATEGORIAS_BEBIDA)]
+        tags = rng.sample(TAGS, 2)
+        bebidas_base[categoria].append(Bebida(nome=nome, tipo=categoria, intensidade=rng.choice(INTENSIDADES),
+                                              harmonizacao=tags[0]))
+        api_bebidas[nome] = {"preco": rng.randint(10, 300), "harmonizacao": tags, "categoria": categoria}
+
+    dados = {"pratos": api_pratos, "bebidas": api_bebidas, "gastronomias": gastronomias}
+    return cardapio, bebidas_base, dados
+
+def cronometrar(operacao, argumentos, tempo_maximo, max_iteracoes):
+    """Calls ``operacao(*argumentos[i])`` cycling over the inputs; returns the summary"""
+    duracoes = []
+    relogio = time.perf_counter
+    limite = relogio() + tempo_maximo
+    i = 0
+    while i < max_iteracoes and (i < MIN_ITERACOES or relogio() < limite):
+        args = argumentos[i % len(argumentos)]
+        inicio = relogio()
+        operacao(*args)
+        duracoes.append(relogio() - inicio)
+        i += 1
+    duracoes.sort()
+    total = sum(duracoes)
+
+    def percentil(q):
+        return duracoes[min(int(q * len(duracoes)), len(duracoes) - 1)] * 1e6
+
+    return {
+        "iteracoes": len(duracoes),
+        "ops_por_s": round(len(duracoes) / total, 1) if total else None,
+        "p50_us": round(percentil(0.50), 3),
+        "p99_us": round(percentil(0.99), 3),
+        "max_us": round(duracoes[-1] * 1e6, 3),
+    }
+
+def _pico_processo_mib():
+    try:
+        import resource
+    except ImportError:
+        return None
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # KiB on Linux, bytes on macOS
+    return round(pico / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+def medir_tamanho(tamanho, tempo_maximo=TEMPO_POR_OPERACAO, max_iteracoes=MAX_ITERACOES, semente=0):
+    """Every measurement for one catalog size, in the current process"""
+    import Harmonizador
+    from Harmonizador import (CatalogoOnline, MenuEngine, configurar_fonte_precos, fetch_online_data,
+                              formatar_menu, indice_cardapio, instalar_catalogo, recomendar_bebida,
+                              selecionar_com_fallback)
+
+    # Catalog build, install and the first menu (index + pairing matrix); memory is the
+    # growth of the process peak, tracemalloc would slow the 1M build down several times
+    pico_inicial = _pico_processo_mib()
+    inicio = time.perf_counter()
+    cardapio, bebidas_base, dados = catalogo_sintetico(tamanho, semente)
+    gerado = time.perf_counter()
+    instalar_catalogo(cardapio, bebidas_base)
+    configurar_fonte_precos(CatalogoOnline(dados))
+    engine = MenuEngine()
+    random.seed(semente)
+    engine.generate({"ocasiao": "Amigos"})
+    pronto = time.perf_counter()
+    pico_montagem = _pico_processo_mib()
+
+    rng = random.Random(semente)
+    amostra = 1000
+    principais = cardapio["principais"]
+    pratos = [rng.choice(principais) for _ in range(amostra)]
+    nomes = [(p["nome"],) for p in pratos]
+    # Same selection path as MenuEngine: the inverted index, then the draw with fallback
+    indice = indice_cardapio()
+    filtros = [("principais", rng.choice(COZINHAS), rng.choice(DIETAS)) for _ in range(amostra)]
+    bebidas = [(p, rng.choice(CATEGORIAS_BEBIDA)) for p in pratos]
+    contextos = [({"ocasiao": rng.choice(list(Harmonizador.ocasioes)), "cozinha": rng.choice(COZINHAS)},)
+                 for _ in range(amostra)]
+    menus = [(engine.generate(contexto),) for contexto, in contextos[:100]]
+
+    def buscar_preco(nome):
+        return fetch_online_data(prato=nome)
+
+    def filtrar_sem_memo(categoria, cozinha, dieta):
+        # 1,000 filters repeat only len(COZINHAS) * len(DIETAS) combinations; without
+        # clearing the memo this would time dictionary hits, not posting intersections
+        indice._resultados.clear()
+        return indice.filtrar(categoria, cozinha, dieta)
+
+    operacoes = {
+        "indice_filtrar": (filtrar_sem_memo, filtros),
+        "selecionar_com_fallback": (selecionar_com_fallback, filtros),
+        "recomendar_bebida": (recomendar_bebida, bebidas),
+        "fetch_online_data": (buscar_preco, nomes),
+        "formatar_menu": (formatar_menu, menus),
+        "gerar_menu": (engine.generate, contextos),
+    }
+    resultados = {}
+    for nome, (operacao, argumentos) in operacoes.items():
+        random.seed(semente)
+        resultados[nome] = cronometrar(operacao, argumentos, tempo_maximo, max_iteracoes)
+
+    return {
+        "itens": tamanho,
+        "pratos": sum(len(p) for p in cardapio.values()),
+        "bebidas": sum(len(b) for b in bebidas_base.values()),
+        "montagem_s": {"catalogo": round(gerado - inicio, 3), "primeiro_menu": round(pronto - gerado, 3)},
+        "memoria_mib": {
+            "catalogo_pico": None if pico_montagem is None else round(pico_montagem - pico_inicial, 1),
+            "processo_pico": _pico_processo_mib(),
+        },
+        "operacoes": resultados,
+    }
+
+def _medir_em_subprocesso(tamanho, args):
+    comando = [sys.executable, os.path.abspath(__file__), "--interno", str(tamanho),
+               "--tempo", str(args.tempo), "--max-iteracoes", str(args.max_iteracoes),
+               "--semente", str(args.semente)]
+    processo = subprocess.run(comando, cwd=RAIZ, capture_output=True, text=True)
+    if processo.returncode != 0:
+        return {"itens": tamanho, "erro": processo.stderr.strip().splitlines()[-1:]}
+    return json.loads(processo.stdout)
+
+def comparar(atual, anterior, tolerancia=TOLERANCIA):
+    """Lines comparing two result files and the list of regressions found"""
+    linhas = []
+    regressoes = []
+    for tamanho, resultado in atual["resultados"].items():
+        base = anterior.get("resultados", {}).get(tamanho)
+        if not base or "operacoes" not in base or "operacoes" not in resultado:
+            continue
+        for operacao, medida in resultado["operacoes"].items():
+            antes = base["operacoes"].get(operacao)
+            if not antes or not antes["p50_us"]:
+                continue
+            razao = medida["p50_us"] / antes["p50_us"]
+            marca = ""
+            if razao > 1 + tolerancia:
+                marca = "  <- regressão"
+                regressoes.append((tamanho, operacao, razao))
+            linhas.append(f"{tamanho:>8} {operacao:<24} p50 {antes['p50_us']:>12.2f} -> "
+                          f"{medida['p50_us']:>12.2f} us  x{razao:.2f}{marca}")
+    return linhas, regressoes
+
+def _imprimir(resultado):
+    if "erro" in resultado:
+        print(f"{resultado['itens']:>8} itens: falhou ({' '.join(resultado['erro'])})")
+        return
+    memoria = resultado["memoria_mib"]
+    print(f"{resultado['itens']:>8} itens  montagem {resultado['montagem_s']['catalogo']:.2f}s + "
+          f"{resultado['montagem_s']['primeiro_menu']:.2f}s  memória catálogo {memoria['catalogo_pico']} MiB, "
+          f"processo {memoria['processo_pico']} MiB")
+    for operacao, medida in resultado["operacoes"].items():
+        print(f"         {operacao:<24} {medida['ops_por_s']:>12.1f} ops/s  p50 {medida['p50_us']:>12.2f} us  "
+              f"p99 {medida['p99_us']:>12.2f} us")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--tamanhos", default=",".join(map(str, TAMANHOS)),
+                        help="tamanhos de catálogo separados por vírgula")
+    parser.add_argument("--tempo", type=float, default=TEMPO_POR_OPERACAO, help="segundos por operação")
+    parser.add_argument("--max-iteracoes", type=int, default=MAX_ITERACOES)
+    parser.add_argument("--semente", type=int, default=0)
+    parser.add_argument("--saida", help="grava os resultados neste arquivo JSON")
+    parser.add_argument("--comparar", help="resultado JSON anterior para comparar")
+    parser.add_argument("--tolerancia", type=float, default=TOLERANCIA,
+                        help="aumento relativo do p50 considerado regressão")
+    parser.add_argument("--json", action="store_true", help="imprime o resultado como JSON")
+    parser.add_argument("--interno", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.interno is not None:
+        print(json.dumps(medir_tamanho(args.interno, args.tempo, args.max_iteracoes, args.semente)))
+        return 0
+
+    resultado = {
+        "data": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "plataforma": platform.platform(),
+        "parametros": {"tempo": args.tempo, "max_iteracoes": args.max_iteracoes, "semente": args.semente},
+        "resultados": {},
+    }
+    for tamanho in (int(t) for t in args.tamanhos.split(",") if t.strip()):
+        medida = _medir_em_subprocesso(tamanho, args)
+        resultado["resultados"][str(tamanho)] = medida
+        if not args.json:
+            _imprimir(medida)
+
+    if args.saida:
+        with open(args.saida, "w", encoding="utf-8") as arquivo:
+            json.dump(resultado, arquivo, ensure_ascii=False, indent=2)
+            arquivo.write("\n")
+    if args.json:
+        print(json.dumps(resultado, ensure_ascii=False, indent=2))
+
+    falhou = any("erro" in medida for medida in resultado["resultados"].values())
+    if args.comparar:
+        with open(args.comparar, encoding="utf-8") as arquivo:
+            linhas, regressoes = comparar(resultado, json.load(arquivo), args.tolerancia)
+        if not args.json:
+            print("\n".join(linhas))
+            print(f"{len(regressoes)} regressão(ões) acima de {args.tolerancia:.0%}" if regressoes
+                  else "Sem regressões")
+        falhou = falhou or bool(regressoes)
+    return 1 if falhou else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,87 @@
+"""Startup benchmark for the headless engine.
+
+Imports ``Harmonizador`` in fresh interpreters under ``python -X importtime``
+and reports the cumulative import time of the module, failing when the
+median exceeds the target or when the GUI/HTTP stacks get loaded:
+
+    python benchmarks/bench_importacao.py --repeticoes 20 --alvo-ms 15
+"""
+import argparse
+import compileall
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Target for ``import Harmonizador`` alone (cumulative, excluding interpreter startup)
+ALVO_MS = 15.0
+
+# Must not be loaded by an engine-only import
+MODULOS_PROIBIDOS = ("tkinter", "requests", "asyncio", "http.server", "concurrent.futures")
+
+SONDA = (
+    "import sys, json, Harmonizador\n"
+    "print(json.dumps([m for m in %r if m in sys.modules]))" % (MODULOS_PROIBIDOS,)
+)
+
+def medir_importacao():
+    """One fresh interpreter; returns (cumulative ms, forbidden modules loaded)"""
+    # Measure what a deployed worker sees: bytecode cached, not recompiled
+    ambiente = dict(os.environ)
+    ambiente.pop("PYTHONDONTWRITEBYTECODE", None)
+    processo = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", SONDA],
+        cwd=RAIZ, env=ambiente, capture_output=True, text=True, check=True)
+    cumulativo_us = None
+    for linha in processo.stderr.splitlines():
+        # "import time: self [us] | cumulative | imported package"
+        partes = [p.strip() for p in linha.split("|")]
+        if len(partes) == 3 and partes[2] == "Harmonizador":
+            cumulativo_us = int(partes[1])
+    if cumulativo_us is None:
+        raise RuntimeError("Saída de -X importtime sem a linha do Harmonizador")
+    return cumulativo_us / 1000.0, json.loads(processo.stdout)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeticoes", type=int, default=15)
+    parser.add_argument("--alvo-ms", type=float, default=ALVO_MS)
+    parser.add_argument("--json", action="store_true", help="imprime o resultado como JSON")
+    args = parser.parse_args(argv)
+
+    compileall.compile_file(os.path.join(RAIZ, "Harmonizador.py"), quiet=1)
+    # The first run warms the OS file cache and is discarded
+    medir_importacao()
+    tempos = []
+    carregados = set()
+    for _ in range(args.repeticoes):
+        ms, proibidos = medir_importacao()
+        tempos.append(ms)
+        carregados.update(proibidos)
+
+    resultado = {
+        "repeticoes": args.repeticoes,
+        "mediana_ms": round(statistics.median(tempos), 3),
+        "min_ms": round(min(tempos), 3),
+        "max_ms": round(max(tempos), 3),
+        "alvo_ms": args.alvo_ms,
+        "modulos_proibidos_carregados": sorted(carregados),
+    }
+    resultado["ok"] = resultado["mediana_ms"] <= args.alvo_ms and not carregados
+
+    if args.json:
+        print(json.dumps(resultado, indent=2))
+    else:
+        print(f"import Harmonizador: mediana {resultado['mediana_ms']:.1f} ms "
+              f"(min {resultado['min_ms']:.1f}, max {resultado['max_ms']:.1f}) "
+              f"alvo {args.alvo_ms:.1f} ms")
+        if carregados:
+            print("Módulos que não deveriam ser carregados: " + ", ".join(sorted(carregados)))
+        print("OK" if resultado["ok"] else "FALHOU")
+    return 0 if resultado["ok"] else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
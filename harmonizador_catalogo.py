@@ -0,0 +1,381 @@
+"""Catalog store: JSON for authoring, compiled to a memory-mapped columnar file.
+
+``compilar_catalogo`` turns the JSON into a ``.hmzc`` file; ``CatalogoCompilado``
+maps it read-only and serves its tables as ``TabelaCatalogo`` views that
+decode records on access, which is how every worker process loads the
+catalog; ``ArmazemCatalogo`` watches the JSON and swaps new versions into
+the engine with ``instalar_catalogo`` while it keeps serving.
+"""
+import hashlib
+import json
+import mmap
+import os
+import struct
+import sys
+import threading
+from array import array
+from collections.abc import Sequence
+
+import Harmonizador
+from Harmonizador import Bebida, PresetOcasiao, Prato, Sobremesa, instalar_catalogo
+
+# ================== ARQUIVO COMPILADO ==================
+# Layout: magic | u32 schema offset | u32 schema size | string table | u32 columns | JSON schema
+MAGICO = b"HMZCAT\x00\x01"
+CABECALHO = struct.Struct("<8sII")
+NULO = 0xFFFFFFFF
+LISTA = 0x80000000          # high bit of a cell: the string is a "\x1f"-joined list
+SEPARADOR_LISTA = "\x1f"
+
+REGISTROS = {"Prato": Prato, "Sobremesa": Sobremesa, "Bebida": Bebida, "PresetOcasiao": PresetOcasiao}
+
+# Courses every menu needs; a catalog without dishes in one of them is rejected
+CATEGORIAS_OBRIGATORIAS = ("entradas", "principais", "sobremesas")
+
+def _u32(valores):
+    dados = array("I", valores)
+    if sys.byteorder != "little":
+        dados.byteswap()
+    return dados.tobytes()
+
+def validar_cardapio(cardapio):
+    """Raises ValueError unless every course in CATEGORIAS_OBRIGATORIAS has dishes"""
+    vazias = [categoria for categoria in CATEGORIAS_OBRIGATORIAS if not cardapio.get(categoria)]
+    if vazias:
+        raise ValueError(f"cardapio sem pratos em: {', '.join(vazias)}")
+
+def _tabelas_do_json(dados):
+    """(grupo, nome, classe, linhas) for every table of an authoring document"""
+    for categoria, itens in dados.get("cardapio", {}).items():
+        yield "cardapio", categoria, Sobremesa if categoria == "sobremesas" else Prato, itens
+    for categoria, itens in dados.get("bebidas", {}).items():
+        yield "bebidas", categoria, Bebida, itens
+    ocasioes = dados.get("ocasioes", {})
+    if ocasioes:
+        yield "ocasioes", "ocasioes", PresetOcasiao, [dict(preset, ocasiao=nome) for nome, preset in ocasioes.items()]
+
+def compilar_catalogo(origem, destino=None):
+    """Compiles the JSON catalog at ``origem``; returns the path of the written file.
+
+    The file is written next to its final name and moved into place with
+    os.replace, so readers never see a partial file and processes that
+    still map the previous version keep a valid view of it.
+    """
+    destino = destino or os.path.splitext(origem)[0] + ".hmzc"
+    with open(origem, "rb") as arquivo:
+        bruto = arquivo.read()
+    dados = json.loads(bruto.decode("utf-8"))
+    if not isinstance(dados, dict) or not isinstance(dados.get("cardapio"), dict):
+        raise ValueError(f"{origem}: objeto 'cardapio' obrigatório")
+    validar_cardapio(dados["cardapio"])
+
+    textos = {}
+
+    def celula(valor, onde):
+        if valor is None:
+            return NULO
+        if isinstance(valor, (list, tuple)):
+            if not all(isinstance(v, str) for v in valor):
+                raise ValueError(f"{onde}: listas devem conter apenas textos")
+            return textos.setdefault(SEPARADOR_LISTA.join(valor), len(textos)) | LISTA
+        if not isinstance(valor, str):
+            raise ValueError(f"{onde}: valores devem ser texto, lista de textos ou null")
+        return textos.setdefault(valor, len(textos))
+
+    tabelas = []
+    for grupo, nome, classe, linhas in _tabelas_do_json(dados):
+        campos = classe.__slots__ + (("ocasiao",) if grupo == "ocasioes" else ())
+        colunas = {campo: [] for campo in campos}
+        for numero, linha in enumerate(linhas):
+            onde = f"{grupo}.{nome}[{numero}]"
+            desconhecidos = set(linha) - set(campos)
+            if desconhecidos:
+                raise ValueError(f"{onde}: campos desconhecidos {', '.join(sorted(desconhecidos))}")
+            if "nome" in campos and not linha.get("nome"):
+                raise ValueError(f"{onde}: campo 'nome' obrigatório")
+            for campo in campos:
+                colunas[campo].append(celula(linha.get(campo, classe.padroes.get(campo)), f"{onde}.{campo}"))
+        tabelas.append((grupo, nome, classe.__name__, len(linhas), colunas))
+
+    # String table: offsets then UTF-8 bytes, 4-byte aligned sections throughout
+    codificados = [texto.encode("utf-8") for texto in textos]
+    offsets = [0]
+    for texto in codificados:
+        offsets.append(offsets[-1] + len(texto))
+    blob = b"".join(codificados)
+    blob += b"\x00" * (-len(blob) % 4)
+
+    partes = [_u32(offsets), blob]
+    posicao = CABECALHO.size + len(partes[0]) + len(blob)
+    esquema = {
+        "formato": 1,
+        "origem_sha256": hashlib.sha256(bruto).hexdigest(),
+        "textos": {"quantidade": len(codificados), "offsets": CABECALHO.size,
+                   "dados": CABECALHO.size + len(partes[0])},
+        "tabelas": [],
+    }
+    for grupo, nome, registro, linhas, colunas in tabelas:
+        posicoes = {}
+        for campo, valores in colunas.items():
+            partes.append(_u32(valores))
+            posicoes[campo] = posicao
+            posicao += 4 * len(valores)
+        esquema["tabelas"].append({"grupo": grupo, "nome": nome, "registro": registro,
+                                   "linhas": linhas, "colunas": posicoes})
+    esquema_bytes = json.dumps(esquema, ensure_ascii=False).encode("utf-8")
+
+    temporario = f"{destino}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(temporario, "wb") as arquivo:
+        arquivo.write(CABECALHO.pack(MAGICO, posicao, len(esquema_bytes)))
+        for parte in partes:
+            arquivo.write(parte)
+        arquivo.write(esquema_bytes)
+        arquivo.flush()
+        os.fsync(arquivo.fileno())
+    os.replace(temporario, destino)
+    return destino
+
+class TabelaCatalogo(Sequence):
+    """Read-only table of a compiled catalog; rows become records on access.
+
+    Cells are read from the mapped columns, so processes mapping the same
+    file share its pages and each one only builds the records it serves.
+    ``selecionar`` returns a view over some of the rows and ``coluna`` reads
+    one field without building records (the dish index is built that way).
+    The engine copies a table into a ListaCatalogo on its first edit.
+    """
+    __slots__ = ("compilado", "tabela", "classe", "_colunas", "_posicoes")
+
+    def __init__(self, compilado, tabela, posicoes=None):
+        self.compilado = compilado
+        self.tabela = tabela
+        self.classe = REGISTROS[tabela["registro"]]
+        # Fields added to a record after the file was compiled take their default
+        self._colunas = [(campo, compilado._coluna_u32(tabela["colunas"][campo], tabela["linhas"])
+                          if campo in tabela["colunas"] else None) for campo in self.classe.__slots__]
+        self._posicoes = range(tabela["linhas"]) if posicoes is None else posicoes
+
+    def __len__(self):
+        return len(self._posicoes)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        linha = self._posicoes[i]
+        texto = self.compilado.texto
+        padroes = self.classe.padroes
+        return self.classe(*[padroes.get(campo) if coluna is None else texto(coluna[linha])
+                             for campo, coluna in self._colunas])
+
+    def coluna(self, campo):
+        """Values of one field for every row of the view, without building records"""
+        posicao = self.tabela["colunas"].get(campo)
+        if posicao is None:
+            return [self.classe.padroes.get(campo)] * len(self)
+        coluna = self.compilado._coluna_u32(posicao, self.tabela["linhas"])
+        celulas = [coluna[i] for i in self._posicoes]
+        decodificados = {c: self.compilado.texto(c) for c in set(celulas)}
+        return [decodificados[c] for c in celulas]
+
+    def selecionar(self, posicoes):
+        """View over the rows at ``posicoes`` (positions within this view)"""
+        vista = object.__new__(TabelaCatalogo)
+        vista.compilado, vista.tabela, vista.classe = self.compilado, self.tabela, self.classe
+        vista._colunas = self._colunas
+        vista._posicoes = array("I", map(self._posicoes.__getitem__, posicoes))
+        return vista
+
+    def __repr__(self):
+        return f"<TabelaCatalogo {self.classe.__name__} x{len(self)} de {self.compilado.caminho}>"
+
+class CatalogoCompilado:
+    """Read-only, memory-mapped view of a compiled catalog.
+
+    ``catalogo()`` returns TabelaCatalogo views that keep reading from the
+    mapping, so it stays open while the engine uses them and is released
+    with the last view. ``fechar()`` is for a file no view was taken from.
+    """
+
+    def __init__(self, caminho):
+        self.caminho = caminho
+        with open(caminho, "rb") as arquivo:
+            self._mapa = mmap.mmap(arquivo.fileno(), 0, access=mmap.ACCESS_READ)
+        magico, posicao, tamanho = CABECALHO.unpack_from(self._mapa, 0)
+        if magico != MAGICO:
+            self._mapa.close()
+            raise ValueError(f"{caminho} não é um catálogo compilado")
+        self.esquema = json.loads(self._mapa[posicao:posicao + tamanho].decode("utf-8"))
+        self._buffer = memoryview(self._mapa)
+        textos = self.esquema["textos"]
+        self._offsets = self._coluna_u32(textos["offsets"], textos["quantidade"] + 1)
+        self._dados = textos["dados"]
+        self.tabelas = {(t["grupo"], t["nome"]): t for t in self.esquema["tabelas"]}
+
+    def _coluna_u32(self, posicao, quantidade):
+        fatia = self._buffer[posicao:posicao + 4 * quantidade]
+        if sys.byteorder == "little":
+            return fatia.cast("I")
+        valores = array("I", fatia.tobytes())
+        valores.byteswap()
+        return valores
+
+    def texto(self, celula):
+        if celula == NULO:
+            return None
+        i = celula & ~LISTA
+        inicio = self._dados + self._offsets[i]
+        valor = str(self._buffer[inicio:inicio + self._offsets[i + 1] - self._offsets[i]], "utf-8")
+        if celula & LISTA:
+            return tuple(valor.split(SEPARADOR_LISTA)) if valor else ()
+        return valor
+
+    def tabela(self, grupo, nome):
+        return TabelaCatalogo(self, self.tabelas[(grupo, nome)])
+
+    def coluna(self, grupo, nome, campo):
+        """Decoded values of one column, without building records"""
+        return self.tabela(grupo, nome).coluna(campo)
+
+    def registros(self, grupo, nome):
+        return list(self.tabela(grupo, nome))
+
+    def catalogo(self):
+        """(cardapio, bebidas_base, ocasioes) ready for instalar_catalogo.
+
+        Dishes and drinks are TabelaCatalogo views; the few occasion presets
+        are decoded into a dict.
+        """
+        # Checked on the row counts, before any view holds on to the mapping
+        validar_cardapio({nome: tabela["linhas"] for (grupo, nome), tabela in self.tabelas.items()
+                          if grupo == "cardapio"})
+        cardapio, bebidas, ocasioes = {}, {}, None
+        for grupo, nome in self.tabelas:
+            if grupo == "cardapio":
+                cardapio[nome] = self.tabela(grupo, nome)
+            elif grupo == "bebidas":
+                bebidas[nome] = self.tabela(grupo, nome)
+            elif grupo == "ocasioes":
+                ocasioes = dict(zip(self.coluna(grupo, nome, "ocasiao"), self.registros(grupo, nome)))
+        return cardapio, bebidas, ocasioes
+
+    def fechar(self):
+        if isinstance(self._offsets, memoryview):
+            self._offsets.release()
+        self._buffer.release()
+        self._mapa.close()
+
+def carregar_catalogo(caminho):
+    """Maps a compiled catalog and installs it; returns the CatalogoCompilado"""
+    compilado = CatalogoCompilado(caminho)
+    try:
+        catalogo = compilado.catalogo()
+    except ValueError:
+        compilado.fechar()  # rejected before any table view was taken
+        raise
+    instalar_catalogo(*catalogo)
+    return compilado
+
+def exportar_catalogo_json(caminho):
+    """Writes the catalog currently in use as an authoring JSON file"""
+    dados = {
+        "cardapio": {c: [p.as_dict() for p in itens] for c, itens in Harmonizador.cardapio.items()},
+        "bebidas": {c: [b.as_dict() for b in itens] for c, itens in Harmonizador.bebidas_base.items()},
+        "ocasioes": {nome: preset.as_dict() for nome, preset in Harmonizador.ocasioes.items()},
+    }
+    with open(caminho, "w", encoding="utf-8") as arquivo:
+        json.dump(dados, arquivo, ensure_ascii=False, indent=2)
+        arquivo.write("\n")
+
+# ================== RECARGA A QUENTE ==================
+class ArmazemCatalogo:
+    """JSON catalog kept compiled, mapped and installed, with hot reload.
+
+    ``carregar()`` compiles the JSON when the ``.hmzc`` file is missing or
+    was built from other contents, maps it and installs it. ``observar()``
+    starts a thread that polls the JSON every ``intervalo`` seconds and
+    reloads on change; a file that fails to parse or validate is reported
+    and the running version stays in place.
+    """
+
+    def __init__(self, caminho, compilado=None, intervalo=1.0):
+        self.caminho = caminho
+        self.compilado = compilado or os.path.splitext(caminho)[0] + ".hmzc"
+        self.intervalo = intervalo
+        self.versao = 0
+        self.atual = None
+        self._estado_arquivo = None
+        self._lock = threading.Lock()
+        self._parar = threading.Event()
+        self._thread = None
+
+    def _estado(self):
+        estado = os.stat(self.caminho)
+        return (estado.st_mtime_ns, estado.st_size)
+
+    def _compilado_em_dia(self):
+        if not os.path.exists(self.compilado):
+            return False
+        try:
+            with open(self.caminho, "rb") as arquivo:
+                resumo = hashlib.sha256(arquivo.read()).hexdigest()
+            compilado = CatalogoCompilado(self.compilado)
+        except (OSError, ValueError, struct.error):
+            return False
+        try:
+            return compilado.esquema.get("origem_sha256") == resumo
+        finally:
+            compilado.fechar()
+
+    def carregar(self):
+        with self._lock:
+            estado = self._estado()
+            if not self._compilado_em_dia():
+                compilar_catalogo(self.caminho, self.compilado)
+            self.atual = carregar_catalogo(self.compilado)
+            self._estado_arquivo = estado
+            self.versao += 1
+        # The previous mapping is not closed here: requests still running read
+        # its tables, and it is released with the last of them
+        return self.atual
+
+    def verificar(self):
+        """Reloads when the JSON changed; returns True if a new version was installed"""
+        try:
+            estado = self._estado()
+        except OSError:
+            return False  # e.g. mid-way through an editor's save-by-rename
+        if estado == self._estado_arquivo:
+            return False
+        try:
+            self.carregar()
+            return True
+        except (OSError, ValueError, TypeError, KeyError, struct.error) as e:
+            print(f"⚠️ Catálogo {self.caminho} não recarregado: {str(e)}", file=sys.stderr)
+            # Not retried until the file changes again
+            self._estado_arquivo = estado
+            return False
+
+    def _observar(self):
+        while not self._parar.wait(self.intervalo):
+            self.verificar()
+
+    def observar(self):
+        if self.atual is None:
+            self.carregar()
+        if self._thread is None:
+            self._parar.clear()
+            self._thread = threading.Thread(target=self._observar, name="catalogo", daemon=True)
+            self._thread.start()
+        return self
+
+    def parar(self):
+        self._parar.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def __enter__(self):
+        return self.observar()
+
+    def __exit__(self, *exc):
+        self.parar()
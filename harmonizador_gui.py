@@ -0,0 +1,354 @@
+"""Tkinter interface of the Métre Digital.
+
+Only loaded when the GUI is used, so the engine in Harmonizador can run on
+hosts without a display.
+"""
+import tkinter as tk
+from concurrent.futures import ThreadPoolExecutor
+from tkinter import ttk, filedialog, messagebox, scrolledtext
+
+from Harmonizador import (CacheMenus, MenuEngine, SistemaIA, capturar_perfil, exportar_menus, formatar_menu,
+                          instrumentacao, rng_para, selecionar_com_fallback)
+
+# ================== INTERFACE GRÁFICA ==================
+# Polling interval for background results, about one frame at 60 Hz
+INTERVALO_ATUALIZACAO_MS = 16
+
+# Menus kept per context: repeated clicks rotate over them instead of generating again
+VARIANTES_POR_CONTEXTO = 5
+
+class HarmonizadorApp:
+    def __init__(self, root, semente=None):
+        self.root = root
+        self.root.title("Métre Digital - Versão Atualizada")
+        self.ia = SistemaIA()
+        self.engine = MenuEngine(self.ia)
+        self.cache_menus = CacheMenus(self.engine, variantes=VARIANTES_POR_CONTEXTO)
+        self.menu_gerado = None
+        self.menu_atual = None
+        self.explicacao_detalhada = None
+        self.sugestao_especial = None
+        self.intensidade = None
+        # Main-thread RNG; each request gets its own generator seeded from it
+        self.rng = rng_para(semente)
+        # Menu generation runs off the Tk main loop; one pending request per tab
+        self.executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="metre")
+        self.pedidos = {}
+        self.criar_interface()
+        self.root.protocol("WM_DELETE_WINDOW", self.fechar)
+
+    def criar_interface(self):
+        self.root.geometry("1200x900")
+        
+        # Create notebook for tabs
+        notebook = ttk.Notebook(self.root)
+        notebook.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
+        
+        # Tab 1: Manual Selection
+        tab_manual = ttk.Frame(notebook)
+        notebook.add(tab_manual, text="Seleção Manual")
+        
+        # Tab 2: Automatic Recommendation
+        tab_auto = ttk.Frame(notebook)
+        notebook.add(tab_auto, text="Métre Online")
+        
+        # === Manual Tab ===
+        manual_frame = ttk.Frame(tab_manual, padding=20)
+        manual_frame.pack(fill=tk.BOTH, expand=True)
+        
+        # Context Section
+        context_frame = ttk.LabelFrame(manual_frame, text="Contexto da Refeição", padding=10)
+        context_frame.pack(fill=tk.X, pady=10)
+        
+        ttk.Label(context_frame, text="Ocasião:").grid(row=0, column=0, sticky=tk.W, padx=5)
+        self.ocasiao = ttk.Combobox(context_frame, values=list(self.ia.sugestoes),
+                                    postcommand=lambda: self.ocasiao.configure(values=list(self.ia.sugestoes)))
+        self.ocasiao.grid(row=0, column=1, sticky=tk.EW, padx=5)
+        
+        ttk.Label(context_frame, text="Expectativas:").grid(row=1, column=0, sticky=tk.W, padx=5)
+        self.expectativas = ttk.Combobox(context_frame, values=["Refeição Leve", "Experiência Gourmet", "Confort Food", "Culinária Internacional"])
+        self.expectativas.grid(row=1, column=1, sticky=tk.EW, padx=5)
+        
+        # Command Section
+        ttk.Label(manual_frame, text="Comando Específico:").pack(pady=(10,0))
+        self.entrada_comando = ttk.Entry(manual_frame, width=80)
+        self.entrada_comando.pack(pady=5)
+        
+        # Preferences Section
+        control_frame = ttk.LabelFrame(manual_frame, text="Preferências", padding=10)
+        control_frame.pack(fill=tk.X, pady=10)
+        
+        ttk.Label(control_frame, text="Cozinha:").grid(row=0, column=0, sticky=tk.W, padx=5)
+        self.cozinha = ttk.Combobox(control_frame, values=["", "italiana", "francesa", "mediterrânea", "brasileira"])
+        self.cozinha.grid(row=0, column=1, sticky=tk.EW, padx=5)
+        
+        ttk.Label(control_frame, text="Bebida:").grid(row=1, column=0, sticky=tk.W, padx=5)
+        # Empty by default, so the drink asked for in the command or the occasion's preset applies
+        self.tipo_bebida = ttk.Combobox(control_frame, values=["", "vinhos", "cervejas", "digestivos", "sem_alcool"])
+        self.tipo_bebida.grid(row=1, column=1, sticky=tk.EW, padx=5)
+        
+        ttk.Label(control_frame, text="Dieta Entrada:").grid(row=2, column=0, sticky=tk.W, padx=5)
+        self.dieta_entrada = ttk.Combobox(control_frame, values=["", "vegetariana", "carnes", "peixes"])
+        self.dieta_entrada.grid(row=2, column=1, sticky=tk.EW, padx=5)
+        
+        ttk.Label(control_frame, text="Dieta Principal:").grid(row=3, column=0, sticky=tk.W, padx=5)
+        self.dieta_principal = ttk.Combobox(control_frame, values=["", "vegetariana", "carnes", "peixes"])
+        self.dieta_principal.grid(row=3, column=1, sticky=tk.EW, padx=5)
+        
+        # Action Buttons
+        btn_frame = ttk.Frame(manual_frame)
+        btn_frame.pack(pady=10)
+        
+        ttk.Button(btn_frame, text="Gerar Menu", command=self.consultar_metre).pack(side=tk.LEFT, padx=5)
+        ttk.Button(btn_frame, text="Limpar", command=self.limpar_tela).pack(side=tk.LEFT, padx=5)
+        
+        self.progresso_manual = ttk.Progressbar(manual_frame, mode="indeterminate")
+        self.progresso_manual.pack(fill=tk.X)
+        
+        # Result Area
+        self.resultado_manual = scrolledtext.ScrolledText(manual_frame, wrap=tk.WORD, height=20, font=('Arial', 11))
+        self.resultado_manual.pack(fill=tk.BOTH, expand=True, pady=10)
+        
+        # === Automatic Tab ===
+        auto_frame = ttk.Frame(tab_auto, padding=20)
+        auto_frame.pack(fill=tk.BOTH, expand=True)
+        
+        # Occasion Selection
+        auto_context_frame = ttk.LabelFrame(auto_frame, text="Seleção de Ocasião", padding=10)
+        auto_context_frame.pack(fill=tk.X, pady=10)
+        
+        ttk.Label(auto_context_frame, text="Ocasião:").grid(row=0, column=0, sticky=tk.W, padx=5)
+        self.ocasiao_auto = ttk.Combobox(auto_context_frame, values=list(self.ia.sugestoes),
+                                         postcommand=lambda: self.ocasiao_auto.configure(values=list(self.ia.sugestoes)))
+        self.ocasiao_auto.grid(row=0, column=1, sticky=tk.EW, padx=5)
+        self.ocasiao_auto.set("Jantar Romântico")
+        
+        ttk.Button(auto_frame, text="Consultar Métre Online", command=self.consultar_metre_online).pack(pady=10)
+        
+        self.progresso_auto = ttk.Progressbar(auto_frame, mode="indeterminate")
+        self.progresso_auto.pack(fill=tk.X)
+        
+        self.resultado_auto = scrolledtext.ScrolledText(auto_frame, wrap=tk.WORD, height=25, font=('Arial', 11))
+        self.resultado_auto.pack(fill=tk.BOTH, expand=True, pady=10)
+        
+        # Secondary Buttons
+        btn_auto_frame = ttk.Frame(auto_frame)
+        btn_auto_frame.pack(pady=10)
+        
+        ttk.Button(btn_auto_frame, text="Salvar Menu", command=self.salvar_menu).pack(side=tk.LEFT, padx=5)
+        ttk.Button(btn_auto_frame, text="Explicação", command=self.mostrar_explicacao).pack(side=tk.LEFT, padx=5)
+        ttk.Button(btn_auto_frame, text="Cache", command=self.mostrar_estatisticas).pack(side=tk.LEFT, padx=5)
+        ttk.Button(btn_auto_frame, text="Métricas", command=self.mostrar_metricas).pack(side=tk.LEFT, padx=5)
+        
+        # Instrumentation toggles
+        diagnostico_frame = ttk.Frame(auto_frame)
+        diagnostico_frame.pack()
+        self.medir_etapas = tk.BooleanVar(value=instrumentacao.ativa)
+        ttk.Checkbutton(diagnostico_frame, text="Medir etapas", variable=self.medir_etapas,
+                        command=lambda: instrumentacao.ativar(self.medir_etapas.get())).pack(side=tk.LEFT, padx=5)
+        self.perfilar_proximo = tk.BooleanVar(value=False)
+        ttk.Checkbutton(diagnostico_frame, text="Perfilar próximo menu",
+                        variable=self.perfilar_proximo).pack(side=tk.LEFT, padx=5)
+        
+        # Initial Message
+        self.exibir_resultado_manual("Selecione suas preferências e clique em 'Gerar Menu'.")
+        self.exibir_resultado_auto("Escolha a ocasião e clique em 'Consultar Métre Online' para recomendações automáticas.")
+
+    def consultar_metre(self):
+        try:
+            ocasiao = self.ocasiao.get()
+            expectativas = self.expectativas.get()
+            comando = self.entrada_comando.get().strip()
+            
+            if not ocasiao or not expectativas:
+                raise ValueError("Informe ocasião e expectativas!")
+            
+            contexto_ia = self.ia.analisar_contexto(comando, ocasiao, expectativas)
+            cozinha = self.cozinha.get() or contexto_ia.get("cozinha")
+            dieta_entrada = self.dieta_entrada.get() or contexto_ia.get("dieta_entrada")
+            dieta_principal = self.dieta_principal.get() or contexto_ia.get("dieta_principal")
+            tipo_bebida = self.tipo_bebida.get() or contexto_ia.get("bebida", "vinhos")
+            self.sugestao_especial = contexto_ia.get("sugestao_especial")
+            self.intensidade = contexto_ia.get("intensidade")
+            
+            self.gerar_menu(cozinha, dieta_entrada, dieta_principal, tipo_bebida, ocasiao, expectativas, manual=True)
+            
+        except Exception as e:
+            self.exibir_resultado_manual(f"⚠️ Erro: {str(e)}")
+
+    def consultar_metre_online(self):
+        try:
+            ocasiao = self.ocasiao_auto.get()
+            if not ocasiao:
+                raise ValueError("Selecione uma ocasião!")
+            
+            # Randomly select expectations for variety
+            expectativas = self.rng.choice(["Experiência Gourmet", "Refeição Leve", "Confort Food"])
+            contexto_ia = self.ia.analisar_contexto("", ocasiao, expectativas)
+            
+            cozinha = contexto_ia.get("cozinha")
+            dieta_entrada = contexto_ia.get("dieta_entrada")
+            dieta_principal = contexto_ia.get("dieta_principal")
+            tipo_bebida = contexto_ia.get("bebida", "vinhos")
+            self.sugestao_especial = contexto_ia.get("sugestao_especial")
+            self.intensidade = contexto_ia.get("intensidade")
+            
+            self.gerar_menu(cozinha, dieta_entrada, dieta_principal, tipo_bebida, ocasiao, expectativas, manual=False)
+            
+        except Exception as e:
+            self.exibir_resultado_auto(f"⚠️ Erro: {str(e)}")
+
+    def gerar_menu(self, cozinha, dieta_entrada, dieta_principal, tipo_bebida, ocasiao, expectativas, manual=True):
+        aba = "manual" if manual else "auto"
+        
+        # A new click supersedes the pending request of the same tab
+        anterior = self.pedidos.get(aba)
+        if anterior is not None:
+            anterior.cancel()
+        
+        # A profiled request bypasses the menu cache so the whole pipeline shows up
+        perfilar = self.perfilar_proximo.get()
+        self.perfilar_proximo.set(False)
+        pedido = self.executor.submit(self._gerar_em_segundo_plano, cozinha, dieta_entrada, dieta_principal,
+                                      tipo_bebida, ocasiao, expectativas, self.sugestao_especial,
+                                      rng_para(self.rng.getrandbits(64)), perfilar, self.intensidade)
+        self.pedidos[aba] = pedido
+        self._progresso(aba).start(10)
+        self.root.after(INTERVALO_ATUALIZACAO_MS, self._acompanhar_pedido, aba, pedido)
+
+    def _gerar_em_segundo_plano(self, cozinha, dieta_entrada, dieta_principal, tipo_bebida, ocasiao,
+                                expectativas, sugestao_especial, rng=None, perfilar=False, intensidade=None):
+        # Runs on a worker thread: no Tk calls here
+        def gerar(montar_menu):
+            menu = montar_menu(cozinha, dieta_entrada, dieta_principal, tipo_bebida,
+                               ocasiao, expectativas, sugestao_especial, rng=rng, intensidade=intensidade)
+            return menu, formatar_menu(menu)
+        
+        if perfilar:
+            (menu, texto), relatorio = capturar_perfil(gerar, self.engine.montar_menu)
+            return menu, texto, relatorio
+        return gerar(self.cache_menus.montar_menu) + (None,)
+
+    def _acompanhar_pedido(self, aba, pedido):
+        if self.pedidos.get(aba) is not pedido:
+            return  # superseded by a newer click, drop the stale result
+        if not pedido.done():
+            self.root.after(INTERVALO_ATUALIZACAO_MS, self._acompanhar_pedido, aba, pedido)
+            return
+        
+        del self.pedidos[aba]
+        self._progresso(aba).stop()
+        exibir = self.exibir_resultado_manual if aba == "manual" else self.exibir_resultado_auto
+        try:
+            menu, texto, relatorio = pedido.result()
+        except Exception as e:
+            exibir(f"⚠️ Erro: {str(e)}")
+            return
+        
+        self.menu_atual = menu
+        self.explicacao_detalhada = menu.explicacao
+        self.menu_gerado = texto
+        exibir(self.menu_gerado)
+        if relatorio:
+            self._mostrar_texto("Perfil do Pedido", relatorio, fonte=('Courier', 9))
+
+    def _progresso(self, aba):
+        return self.progresso_manual if aba == "manual" else self.progresso_auto
+
+    def fechar(self):
+        for pedido in self.pedidos.values():
+            pedido.cancel()
+        self.pedidos.clear()
+        self.executor.shutdown(wait=False)
+        self.root.destroy()
+
+    def selecionar_com_fallback(self, categoria, cozinha, dieta, rng=None):
+        return selecionar_com_fallback(categoria, cozinha, dieta, rng=rng)
+
+    def _mostrar_texto(self, titulo, texto, fonte=('Arial', 11)):
+        janela = tk.Toplevel(self.root)
+        janela.title(titulo)
+        text_area = scrolledtext.ScrolledText(janela, wrap=tk.WORD, font=fonte)
+        text_area.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
+        text_area.insert(tk.END, texto)
+        ttk.Button(janela, text="Fechar", command=janela.destroy).pack(pady=10)
+
+    def mostrar_explicacao(self):
+        if not self.explicacao_detalhada:
+            messagebox.showwarning("Aviso", "Gere um menu primeiro!")
+            return
+        self._mostrar_texto("Explicação do Métre", self.explicacao_detalhada)
+
+    def mostrar_metricas(self):
+        if not instrumentacao.coletar():
+            messagebox.showinfo("Métricas", "Nenhuma medição ainda: marque 'Medir etapas' e gere menus.")
+            return
+        self._mostrar_texto("Métricas por Etapa", instrumentacao.prometheus(), fonte=('Courier', 9))
+
+    def mostrar_estatisticas(self):
+        stats = self.cache_menus.estatisticas()
+        messagebox.showinfo("Cache de Menus", (
+            f"Contextos em cache: {stats['chaves']} de {stats['max_chaves']}\n"
+            f"Menus guardados: {stats['menus']} (até {stats['variantes']} por contexto)\n"
+            f"Acertos: {stats['hits']} • Gerados: {stats['misses']} ({stats['taxa_acerto']:.0%} de acerto)\n"
+            f"Descartes: {stats['evictions']} • Invalidações: {stats['invalidacoes']} • "
+            f"Expirados: {stats['expirados']}"))
+
+    def salvar_menu(self):
+        if not self.menu_atual:
+            messagebox.showerror("Erro", "Nenhum menu para salvar!")
+            return
+        # Menus are appended, so repeated saves never overwrite each other
+        filename = filedialog.asksaveasfilename(
+            title="Salvar menu",
+            initialfile="menus.jsonl",
+            defaultextension=".jsonl",
+            filetypes=[("JSON Lines", "*.jsonl"), ("CSV", "*.csv"), ("Texto", "*.txt")])
+        if not filename:
+            return
+        try:
+            exportar_menus([self.menu_atual], filename)
+        except (OSError, ValueError) as e:
+            messagebox.showerror("Erro", f"Não foi possível salvar: {str(e)}")
+            return
+        messagebox.showinfo("Sucesso", f"Menu adicionado a '{filename}'")
+
+    def exibir_resultado_manual(self, texto):
+        self.resultado_manual.config(state=tk.NORMAL)
+        self.resultado_manual.delete(1.0, tk.END)
+        self.resultado_manual.insert(tk.END, texto)
+        self.resultado_manual.config(state=tk.DISABLED)
+
+    def exibir_resultado_auto(self, texto):
+        self.resultado_auto.config(state=tk.NORMAL)
+        self.resultado_auto.delete(1.0, tk.END)
+        self.resultado_auto.insert(tk.END, texto)
+        self.resultado_auto.config(state=tk.DISABLED)
+
+    def limpar_tela(self):
+        pedido = self.pedidos.pop("manual", None)
+        if pedido is not None:
+            pedido.cancel()
+            self.progresso_manual.stop()
+        self.menu_gerado = None
+        self.menu_atual = None
+        self.explicacao_detalhada = None
+        self.sugestao_especial = None
+        self.intensidade = None
+        self.exibir_resultado_manual("Selecione suas preferências e clique em 'Gerar Menu'.")
+        self.entrada_comando.delete(0, tk.END)
+        self.ocasiao.set("")
+        self.expectativas.set("")
+        self.cozinha.set("")
+        self.dieta_entrada.set("")
+        self.dieta_principal.set("")
+        self.tipo_bebida.set("")
+
+def main(semente=None):
+    root = tk.Tk()
+    app = HarmonizadorApp(root, semente)
+    root.mainloop()
+
+# ================== EXECUÇÃO ==================
+if __name__ == "__main__":
+    main()
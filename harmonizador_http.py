@@ -0,0 +1,220 @@
+"""HTTP stack for the pricing API: pooled client and a local stand-in server.
+
+Kept out of Harmonizador so that importing the engine does not load
+``requests``; ``Harmonizador.ClientePrecosHttp`` still works and imports
+this module on first access.
+"""
+import json
+import threading
+import time
+from concurrent.futures import Future
+from functools import partial
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import quote, unquote
+
+import requests
+
+from Harmonizador import PRECO_PADRAO_BEBIDA, PRECO_PADRAO_PRATO, catalogo_online
+
+# ================== CLIENTE HTTP DE PREÇOS ==================
+class ClientePrecosHttp:
+    """fetch_online_data-compatible client for a remote pricing API.
+
+    Uses one pooled keep-alive ``requests.Session``, retries connection
+    errors, 429 and 5xx with exponential backoff, and coalesces concurrent
+    requests for the same item into a single in-flight call. Endpoints:
+
+        GET  {base_url}/pratos/<nome>        GET {base_url}/bebidas/<nome>
+        GET  {base_url}/gastronomias/<nome>  POST {base_url}/precos (bulk)
+
+    The bulk endpoint takes ``{"pratos": [...], "bebidas": [...]}`` and
+    answers ``{"pratos": {nome: dados}, "bebidas": {nome: dados}}``.
+    """
+    STATUS_RETENTAVEIS = {429, 500, 502, 503, 504}
+
+    def __init__(self, base_url, timeout=2.0, tentativas=3, backoff=0.1, max_conexoes=10, sessao=None):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.tentativas = tentativas
+        self.backoff = backoff
+        self.sessao = sessao or requests.Session()
+        adaptador = requests.adapters.HTTPAdapter(pool_connections=max_conexoes, pool_maxsize=max_conexoes)
+        self.sessao.mount("http://", adaptador)
+        self.sessao.mount("https://", adaptador)
+        self.sessao.headers.update({"Connection": "keep-alive", "Accept": "application/json"})
+        self._lock = threading.Lock()
+        self._em_voo = {}
+        self.requisicoes = 0
+        self.coalescidas = 0
+
+    def _requisitar(self, metodo, caminho, corpo=None):
+        """One HTTP call with retries; returns the parsed JSON or None on 404"""
+        url = f"{self.base_url}/{caminho}"
+        for tentativa in range(self.tentativas):
+            ultima = tentativa == self.tentativas - 1
+            try:
+                with self._lock:
+                    self.requisicoes += 1
+                resposta = self.sessao.request(metodo, url, json=corpo, timeout=self.timeout)
+            except (requests.ConnectionError, requests.Timeout):
+                if ultima:
+                    raise
+            else:
+                if resposta.status_code == 404:
+                    return None
+                if resposta.status_code not in self.STATUS_RETENTAVEIS or ultima:
+                    resposta.raise_for_status()
+                    return resposta.json()
+            time.sleep(self.backoff * 2 ** tentativa)
+
+    def _uma_vez(self, chave, funcao):
+        """Single-flight: concurrent callers with the same key share one request"""
+        with self._lock:
+            pendente = self._em_voo.get(chave)
+            lider = pendente is None
+            if lider:
+                pendente = self._em_voo[chave] = Future()
+            else:
+                self.coalescidas += 1
+        if not lider:
+            return pendente.result()
+        try:
+            pendente.set_result(funcao())
+        except BaseException as e:
+            pendente.set_exception(e)
+        finally:
+            with self._lock:
+                del self._em_voo[chave]
+        return pendente.result()
+
+    @staticmethod
+    def _desconhecido(tipo):
+        if tipo == "pratos":
+            return {"preco": PRECO_PADRAO_PRATO, "gastronomia": "desconhecida"}
+        if tipo == "bebidas":
+            return {"preco": PRECO_PADRAO_BEBIDA, "harmonizacao": ["Geral"], "categoria": "desconhecida"}
+        return {"pratos": [], "bebidas_sugeridas": {}}
+
+    def buscar(self, prato=None, bebida=None, gastronomia=None):
+        if prato:
+            tipo, nome = "pratos", prato
+        elif bebida:
+            tipo, nome = "bebidas", bebida
+        elif gastronomia:
+            tipo, nome = "gastronomias", gastronomia
+        else:
+            return {"erro": "Consulta sem prato, bebida ou gastronomia"}
+        caminho = f"{tipo}/{quote(nome, safe='')}"
+        try:
+            dados = self._uma_vez(("GET", caminho), partial(self._requisitar, "GET", caminho))
+        except Exception as e:
+            return {"erro": f"Falha na busca online: {str(e)}"}
+        return dados if dados is not None else self._desconhecido(tipo)
+
+    def buscar_lote(self, pratos=(), bebidas=()):
+        corpo = {"pratos": sorted(set(pratos)), "bebidas": sorted(set(bebidas))}
+        chave = ("POST", "precos", tuple(corpo["pratos"]), tuple(corpo["bebidas"]))
+        try:
+            dados = self._uma_vez(chave, partial(self._requisitar, "POST", "precos", corpo)) or {}
+        except Exception as e:
+            return {"erro": f"Falha na busca online: {str(e)}"}
+        return {
+            grupo: {nome: dados.get(grupo, {}).get(nome) or self._desconhecido(grupo) for nome in corpo[grupo]}
+            for grupo in ("pratos", "bebidas")
+        }
+
+    def fechar(self):
+        self.sessao.close()
+
+class ServidorPrecosLocal:
+    """Local stand-in for the pricing API, serving a CatalogoOnline over HTTP.
+
+    ``falhas`` makes the first N requests answer 503 to exercise retries;
+    ``latencia`` delays every answer. Use as a context manager:
+
+        with ServidorPrecosLocal() as servidor:
+            cliente = ClientePrecosHttp(servidor.url)
+    """
+
+    def __init__(self, catalogo=None, porta=0, latencia=0.0, falhas=0):
+        self.catalogo = catalogo or catalogo_online
+        self.latencia = latencia
+        self.falhas = falhas
+        self.requisicoes = 0
+        self._lock = threading.Lock()
+        servidor = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"  # keep-alive
+
+            def log_message(self, *args):
+                pass
+
+            def _responder(self, status, dados=None):
+                # Catalog responses are read-only mapping proxies
+                corpo = json.dumps(dados if dados is not None else {}, ensure_ascii=False,
+                                   default=dict).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json; charset=utf-8")
+                self.send_header("Content-Length", str(len(corpo)))
+                self.end_headers()
+                self.wfile.write(corpo)
+
+            def _antes(self):
+                with servidor._lock:
+                    servidor.requisicoes += 1
+                    falhar = servidor.falhas > 0
+                    if falhar:
+                        servidor.falhas -= 1
+                if servidor.latencia:
+                    time.sleep(servidor.latencia)
+                if falhar:
+                    self._responder(503, {"erro": "Serviço indisponível"})
+                return not falhar
+
+            def do_GET(self):
+                if not self._antes():
+                    return
+                partes = self.path.strip("/").split("/", 1)
+                if len(partes) != 2:
+                    return self._responder(404)
+                tipo, nome = partes[0], unquote(partes[1])
+                tabela = {"pratos": servidor.catalogo.pratos, "bebidas": servidor.catalogo.bebidas,
+                          "gastronomias": servidor.catalogo.gastronomias}.get(tipo, {})
+                if nome not in tabela:
+                    return self._responder(404)
+                self._responder(200, tabela[nome])
+
+            def do_POST(self):
+                tamanho = int(self.headers.get("Content-Length") or 0)
+                corpo = json.loads(self.rfile.read(tamanho) or b"{}")
+                if not self._antes():
+                    return
+                if self.path.strip("/") != "precos":
+                    return self._responder(404)
+                self._responder(200, {
+                    "pratos": {n: servidor.catalogo.pratos[n] for n in corpo.get("pratos", [])
+                               if n in servidor.catalogo.pratos},
+                    "bebidas": {n: servidor.catalogo.bebidas[n] for n in corpo.get("bebidas", [])
+                                if n in servidor.catalogo.bebidas},
+                })
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", porta), Handler)
+        self.httpd.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self.httpd.server_address[1]}"
+        self._thread = None
+
+    def iniciar(self):
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def parar(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.iniciar()
+
+    def __exit__(self, *exc):
+        self.parar()
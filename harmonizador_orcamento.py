@@ -0,0 +1,184 @@
+"""Budget-constrained whole-menu optimizer.
+
+Needs NumPy (through PontuadorHarmonizacao), so it lives outside Harmonizador;
+``MenuEngine.otimizar`` imports this module on first use.
+"""
+import heapq
+import math
+
+import numpy as np
+
+from Harmonizador import (BEBIDAS_MENU, PRECO_PADRAO_BEBIDA, PRECO_PADRAO_PRATO, Bebida, MenuEngine,
+                          candidatos_cardapio, fetch_online_data_lote, indice_cardapio)
+from harmonizador_pontuacao import PontuadorHarmonizacao
+
+# ================== OTIMIZAÇÃO POR ORÇAMENTO ==================
+# Price buckets of the dynamic program; the step grows with the budget past this
+MAX_FAIXAS = 2000
+
+def podar(custos, notas, quantidade):
+    """Indices of the options that can still appear in a top-``quantidade`` result.
+
+    An option is dropped when ``quantidade`` others cost no more and score at
+    least as much: swapping it for any of them never makes a menu worse.
+    """
+    ordem = np.lexsort((-notas, custos)).tolist()
+    notas = notas.tolist()
+    melhores = []
+    mantidos = []
+    for i in ordem:
+        if len(melhores) < quantidade:
+            heapq.heappush(melhores, notas[i])
+        elif notas[i] > melhores[0]:
+            heapq.heapreplace(melhores, notas[i])
+        else:
+            continue
+        mantidos.append(i)
+    return np.array(mantidos, dtype=np.intp)
+
+def podar_por_linha(custos, notas, quantidade):
+    """podar for every row of ``notas`` against shared ``custos``; returns a keep mask.
+
+    Columns are visited once in price order, vectorized over the rows.
+    """
+    melhores = np.full((notas.shape[0], quantidade), -np.inf)
+    mantidos = np.zeros(notas.shape, dtype=bool)
+    linhas = np.arange(notas.shape[0])
+    for j in np.argsort(custos, kind="stable").tolist():
+        coluna = notas[:, j]
+        pior = melhores.argmin(axis=1)
+        entra = coluna > melhores[linhas, pior]
+        mantidos[:, j] = entra
+        melhores[linhas[entra], pior[entra]] = coluna[entra]
+    return mantidos
+
+class OtimizadorMenu:
+    """Best menus whose ``valor_total`` fits a budget, by pairing quality.
+
+    A menu is three courses; each course option is a dish plus its drinks
+    (one for entrada and principal, digestivo and sem_alcool for the
+    dessert), scored with the PontuadorHarmonizacao. Per dish, drinks that
+    are both pricier and worse than ``quantidade`` others are pruned before
+    combining, and again per course. The courses are then merged with a
+    multiple-choice knapsack over price buckets that keeps the
+    ``quantidade`` best partial menus per bucket, so the work grows with
+    options x buckets instead of the product of all catalogs.
+
+    Course costs are rounded up to whole buckets, so every returned menu is
+    within budget; with integer prices and budgets under MAX_FAIXAS the
+    search is exact. Dish and drink prices are fetched on every query, so
+    price changes apply without rebuilding the optimizer.
+    """
+
+    def __init__(self, engine=None, pontuador=None):
+        self.engine = engine or MenuEngine()
+        self.pontuador = pontuador or self.engine.pontuador or PontuadorHarmonizacao()
+
+    def _precos_bebidas(self):
+        """Current price of every pontuador drink, in pontuador order"""
+        bebidas = self.pontuador.bebidas
+        precos = fetch_online_data_lote(bebidas=sorted({b["nome"] for b in bebidas})).get("bebidas", {})
+        return np.array([precos.get(b["nome"], {}).get("preco", PRECO_PADRAO_BEBIDA) for b in bebidas],
+                        dtype=float)
+
+    def _bebidas(self, tipo_bebida, pratos, precos):
+        """Drinks of one category with their prices and dish x drink scores"""
+        indices = np.flatnonzero(self.pontuador.categorias == tipo_bebida)
+        if not len(indices):
+            chef = Bebida(nome="Seleção do Chef", tipo=tipo_bebida, intensidade=None, harmonizacao="Geral")
+            return [chef], np.array([PRECO_PADRAO_BEBIDA], dtype=float), np.zeros((len(pratos), 1))
+        bebidas = [self.pontuador.bebidas[j] for j in indices]
+        return bebidas, precos[indices], self.pontuador.pontuar(pratos)[:, indices].astype(float)
+
+    def _opcoes(self, pratos, tipos, quantidade, limite, precos_bebidas):
+        """Pruned (cost, score, (dish, drinks)) options for one course"""
+        precos = fetch_online_data_lote(pratos=sorted({p["nome"] for p in pratos})).get("pratos", {})
+        preco_pratos = np.array([precos.get(p["nome"], {}).get("preco", PRECO_PADRAO_PRATO) for p in pratos],
+                                dtype=float)
+        slots = [self._bebidas(tipo, pratos, precos_bebidas) for tipo in tipos]
+        mantidas = [podar_por_linha(preco_bebidas, notas_bebidas, quantidade)
+                    for _, preco_bebidas, notas_bebidas in slots]
+
+        partes = []
+        for i in np.flatnonzero(preco_pratos <= limite).tolist():
+            # Every combination of this dish's surviving drinks, one per slot
+            grade = np.meshgrid(*(np.flatnonzero(m[i]) for m in mantidas), indexing="ij")
+            indices = [g.ravel() for g in grade]
+            custo = preco_pratos[i] + sum(slot[1][j] for slot, j in zip(slots, indices))
+            nota = sum(slot[2][i, j] for slot, j in zip(slots, indices))
+            dentro = custo <= limite
+            partes.append((np.full(dentro.sum(), i), [j[dentro] for j in indices], custo[dentro], nota[dentro]))
+        if not partes:
+            return np.zeros(0), np.zeros(0), []
+
+        prato = np.concatenate([p[0] for p in partes])
+        bebidas = [np.concatenate([p[1][s] for p in partes]) for s in range(len(slots))]
+        custos = np.concatenate([p[2] for p in partes])
+        notas = np.concatenate([p[3] for p in partes])
+        mantidos = podar(custos, notas, quantidade)
+        escolhas = [(pratos[prato[k]], tuple(slot[0][b[k]] for slot, b in zip(slots, bebidas)))
+                    for k in mantidos.tolist()]
+        return custos[mantidos], notas[mantidos], escolhas
+
+    def melhores(self, contexto, orcamento, quantidade=3, passo=None):
+        """Up to ``quantidade`` (nota, Menu) pairs within ``orcamento``, best first.
+
+        Empty when no complete menu fits the budget.
+        """
+        resolvido = self.engine.resolver_contexto(contexto)
+        passo = passo or max(1.0, orcamento / MAX_FAIXAS)
+        faixas = int(math.floor(orcamento / passo + 1e-9))
+        indice = indice_cardapio()
+        tipo = resolvido["tipo_bebida"]
+
+        cursos = [
+            (candidatos_cardapio("entradas", resolvido["cozinha"], resolvido["dieta_entrada"], indice,
+                                 resolvido["intensidade"]), (tipo,)),
+            (candidatos_cardapio("principais", resolvido["cozinha"], resolvido["dieta_principal"], indice,
+                                 resolvido["intensidade"]), (tipo,)),
+            (self.engine.ia.opcoes_sobremesa(resolvido), ("digestivos", "sem_alcool")),
+        ]
+
+        # notas[b, r]: r-th best score of a partial menu costing exactly b buckets
+        notas = np.full((faixas + 1, quantidade), -np.inf)
+        notas[0, 0] = 0.0
+        faixa = np.arange(faixas + 1)[:, None]
+        caminhos = []
+        precos_bebidas = self._precos_bebidas()
+        for pratos, tipos in cursos:
+            custos, notas_curso, escolhas = self._opcoes(list(pratos), tipos, quantidade, orcamento,
+                                                         precos_bebidas)
+            if not escolhas:
+                return []
+            custos = np.ceil(custos / passo - 1e-9).astype(np.intp)
+
+            # Every (bucket, option, rank) extension at once, then the best per bucket
+            origem = faixa - custos[None, :]
+            valido = origem >= 0
+            candidatas = np.where(valido[:, :, None],
+                                  notas[np.maximum(origem, 0)] + notas_curso[None, :, None], -np.inf)
+            candidatas = candidatas.reshape(faixas + 1, -1)
+            melhores = np.argsort(-candidatas, axis=1, kind="stable")[:, :quantidade]
+            notas = np.take_along_axis(candidatas, melhores, axis=1)
+            caminhos.append((custos, escolhas, melhores))
+
+        finais = np.argsort(-notas, axis=None, kind="stable")[:quantidade]
+        resultado = []
+        for final in finais.tolist():
+            b, r = divmod(final, quantidade)
+            nota = notas[b, r]
+            if not np.isfinite(nota):
+                break
+            # Walk the back-pointers from the dessert course to the starter
+            escolhidos = []
+            for custos, escolhas, melhores in reversed(caminhos):
+                opcao, r = divmod(int(melhores[b, r]), quantidade)
+                escolhidos.append(escolhas[opcao])
+                b -= custos[opcao]
+            (entrada, (bebida_entrada,)), (principal, (bebida_principal,)), (sobremesa, bebidas_sobremesa) = \
+                reversed(escolhidos)
+            bebidas = dict(zip(BEBIDAS_MENU, (bebida_entrada, bebida_principal) + bebidas_sobremesa))
+            menu = self.engine._compor(resolvido["ocasiao"], resolvido["expectativas"],
+                                       resolvido["sugestao_especial"], entrada, principal, sobremesa, bebidas)
+            resultado.append((float(nota), menu))
+        return resultado
@@ -0,0 +1,202 @@
+"""Vectorized dish x drink pairing scorer.
+
+Needs NumPy, so it lives outside Harmonizador; ``Harmonizador.PontuadorHarmonizacao``
+imports this module on first access.
+"""
+import numpy as np
+
+import Harmonizador
+from Harmonizador import (INTENSIDADES_COMPATIVEIS, PRECO_PADRAO_BEBIDA, Bebida, Sobremesa,
+                          _tags_harmonizacao, fetch_online_data, fetch_online_data_lote)
+
+# ================== PONTUAÇÃO DE HARMONIZAÇÃO ==================
+ORDEM_INTENSIDADE = ("leve", "média", "alta")
+
+# Pairing tags a dish asks for, derived from its catalog fields
+TAGS_PRATO = {
+    ("categoria", "entradas"): ("Entradas", "Aperitivos"),
+    ("categoria", "sobremesas"): ("Sobremesas", "Doces"),
+    ("dieta", "carnes"): ("Carnes",),
+    ("dieta", "peixes"): ("Peixes",),
+    ("dieta", "vegetariana"): ("Pratos leves",),
+    ("dieta", "vegana"): ("Pratos leves", "Saladas"),
+    ("intensidade", "leve"): ("Pratos leves",),
+    ("intensidade", "alta"): ("Pratos fortes",),
+}
+
+PESOS_PADRAO = {"intensidade": 1.0, "harmonizacao": 1.5, "preco": 0.25}
+
+# Share of the pairing score a "Geral" drink gets with any dish
+NOTA_GERAL = 0.25
+
+def _tabela_intensidade():
+    # Rows: dish intensity, columns: drink intensity; last index is "unknown"
+    n = len(ORDEM_INTENSIDADE)
+    tabela = np.full((n + 1, n + 1), 0.5, dtype=np.float32)
+    for i, prato in enumerate(ORDEM_INTENSIDADE):
+        aceitas = INTENSIDADES_COMPATIVEIS.get(prato, ())
+        for j, bebida in enumerate(ORDEM_INTENSIDADE):
+            tabela[i, j] = 1.0 if bebida == prato else 0.6 if bebida in aceitas else 0.0
+    return tabela
+
+def _ordinal(intensidade):
+    try:
+        return ORDEM_INTENSIDADE.index(intensidade)
+    except ValueError:
+        return len(ORDEM_INTENSIDADE)
+
+class PontuadorHarmonizacao:
+    """Ranks drinks for dishes with one vectorized dish x drink score matrix.
+
+    Dishes and drinks are encoded once as arrays (intensity ordinal, one-hot
+    pairing tags, price) and every score is a weighted sum of three
+    components, each computed for all pairs at once:
+
+    - ``intensidade``: INTENSIDADES_COMPATIVEIS as a lookup table
+    - ``harmonizacao``: share of the dish's tags the drink covers
+    - ``preco``: cheaper drinks score higher, relative to the list
+
+    ``candidatos(prato, tipo_bebida)`` returns the top ``k`` drinks of the
+    category, so a pontuador can stand in for MatrizHarmonizacao in the
+    engine (``MenuEngine(pontuador=...)``). Build a new one after changing
+    the drink list.
+    """
+
+    def __init__(self, bebidas=None, k=1, pesos=None, cardapio_base=None):
+        # Read at build time: the catalog may have been swapped since import
+        bebidas = Harmonizador.bebidas_base if bebidas is None else bebidas
+        if not isinstance(bebidas, dict):
+            bebidas = {None: list(bebidas)}
+        self.k = k
+        self.pesos = dict(PESOS_PADRAO, **(pesos or {}))
+        self.tabela_intensidade = _tabela_intensidade()
+        self._candidatos = {}
+
+        cardapio_base = Harmonizador.cardapio if cardapio_base is None else cardapio_base
+        # Mapped tables give the names without building their records
+        self.categoria_prato = {nome: categoria for categoria, pratos in cardapio_base.items()
+                                for nome in (pratos.coluna("nome") if hasattr(pratos, "coluna")
+                                             else (p["nome"] for p in pratos))}
+
+        self.bebidas = [b for itens in bebidas.values() for b in itens]
+        self.posicao = {b["nome"]: j for j, b in enumerate(self.bebidas)}
+        dados = fetch_online_data_lote(bebidas=sorted(self.posicao)).get("bebidas", {})
+        # Plain SKU lists take their category from the online catalog
+        self.categorias = np.array([categoria or dados.get(b["nome"], {}).get("categoria")
+                                    for categoria, itens in bebidas.items() for b in itens], dtype=object)
+
+        tags = [set(_tags_harmonizacao(bebida.get("harmonizacao", "Geral")))
+                | set(dados.get(bebida["nome"], {}).get("harmonizacao", ()))
+                for bebida in self.bebidas]
+        self.vocabulario = {tag: i for i, tag in enumerate(sorted(set().union(*tags) - {"Geral"}))}
+
+        n = len(self.bebidas)
+        self.tags = np.zeros((n, len(self.vocabulario)), dtype=np.float32)
+        for i, tags_bebida in enumerate(tags):
+            for tag in tags_bebida:
+                if tag in self.vocabulario:
+                    self.tags[i, self.vocabulario[tag]] = 1.0
+        self.geral = np.array(["Geral" in t for t in tags], dtype=np.float32)
+        self.intensidade = np.array([_ordinal(b.get("intensidade")) for b in self.bebidas], dtype=np.intp)
+        self.preco = np.array([dados.get(b["nome"], {}).get("preco", PRECO_PADRAO_BEBIDA)
+                               for b in self.bebidas], dtype=np.float32)
+        maximo = self.preco.max() if n else 0.0
+        self.valor = 1.0 - self.preco / maximo if maximo > 0 else np.zeros(n, dtype=np.float32)
+
+    def tags_prato(self, prato):
+        """Pairing tags the dish asks for: catalog-derived plus any from the online API"""
+        categoria = "sobremesas" if isinstance(prato, Sobremesa) else self.categoria_prato.get(prato["nome"])
+        tags = set()
+        for chave in (("categoria", categoria), ("dieta", prato.get("dieta")),
+                      ("intensidade", prato.get("intensidade"))):
+            tags.update(TAGS_PRATO.get(chave, ()))
+        tags.update(fetch_online_data(prato=prato["nome"]).get("harmonizacao", ()))
+        return tags
+
+    def codificar(self, pratos):
+        """Feature arrays for a list of dishes"""
+        tags = np.zeros((len(pratos), len(self.vocabulario)), dtype=np.float32)
+        for i, prato in enumerate(pratos):
+            for tag in self.tags_prato(prato):
+                if tag in self.vocabulario:
+                    tags[i, self.vocabulario[tag]] = 1.0
+        intensidade = np.array([_ordinal(p.get("intensidade")) for p in pratos], dtype=np.intp)
+        return {"tags": tags, "intensidade": intensidade}
+
+    def componentes(self, pratos):
+        """Unweighted dish x drink component matrices, each of shape (pratos, bebidas)"""
+        pratos_cod = self.codificar(pratos)
+        cobertas = pratos_cod["tags"] @ self.tags.T
+        pedidas = np.maximum(pratos_cod["tags"].sum(axis=1, keepdims=True), 1.0)
+        return {
+            "intensidade": self.tabela_intensidade[pratos_cod["intensidade"][:, None], self.intensidade[None, :]],
+            "harmonizacao": np.maximum(cobertas / pedidas, NOTA_GERAL * self.geral[None, :]),
+            "preco": np.broadcast_to(self.valor, (len(pratos), len(self.bebidas))),
+        }
+
+    def pontuar(self, pratos):
+        """Dish x drink compatibility matrix (weighted sum of the components)"""
+        componentes = self.componentes(pratos)
+        notas = np.zeros((len(pratos), len(self.bebidas)), dtype=np.float32)
+        for nome, matriz in componentes.items():
+            notas += self.pesos[nome] * matriz
+        return notas
+
+    def top_k(self, pratos, k=None, tipo_bebida=None):
+        """Best ``k`` (bebida, nota) pairs per dish, optionally within one drink category"""
+        k = self.k if k is None else k
+        notas = self.pontuar(pratos)
+        if tipo_bebida is not None:
+            notas = np.where(self.categorias == tipo_bebida, notas, -np.inf)
+        k = min(k, notas.shape[1])
+        if k <= 0:
+            return [[] for _ in pratos]
+        if k < notas.shape[1]:
+            melhores = np.argpartition(-notas, k - 1, axis=1)[:, :k]
+        else:
+            melhores = np.broadcast_to(np.arange(notas.shape[1]), notas.shape)
+        linhas = np.arange(len(pratos))[:, None]
+        ordem = np.argsort(-notas[linhas, melhores], axis=1, kind="stable")
+        melhores = melhores[linhas, ordem]
+        return [
+            [(self.bebidas[j], float(notas[i, j])) for j in linha if np.isfinite(notas[i, j])]
+            for i, linha in enumerate(melhores.tolist())
+        ]
+
+    def candidatos(self, prato, tipo_bebida):
+        """MatrizHarmonizacao-compatible: the top-k drinks of the category, memoized per dish"""
+        chave = (prato["nome"], tipo_bebida)
+        opcoes = self._candidatos.get(chave)
+        if opcoes is None:
+            opcoes = tuple(b for b, _ in self.top_k([prato], tipo_bebida=tipo_bebida)[0])
+            if not opcoes:
+                opcoes = (Bebida(nome="Seleção do Chef", tipo=tipo_bebida, intensidade=None,
+                                 harmonizacao="Geral"),)
+            self._candidatos[chave] = opcoes
+        return opcoes
+
+    def explicar(self, prato, bebida):
+        """Weighted score components of one pairing, plus their ``total``"""
+        j = self.posicao.get(bebida["nome"])
+        if j is None:
+            return {}
+        explicacao = {componente: round(self.pesos[componente] * float(matriz[0, j]), 3)
+                      for componente, matriz in self.componentes([prato]).items()}
+        explicacao["total"] = round(sum(explicacao.values()), 3)
+        return explicacao
+
+    def descrever(self, prato, bebida):
+        """One-sentence explanation of the pairing from its strongest components"""
+        explicacao = self.explicar(prato, bebida)
+        if not explicacao:
+            return ""
+        motivos = {
+            "intensidade": "intensidade compatível",
+            "harmonizacao": "combina com o estilo do prato",
+            "preco": "bom custo-benefício",
+        }
+        principais = sorted((c for c in motivos if explicacao[c] > 0), key=explicacao.get, reverse=True)[:2]
+        if not principais:
+            return f"{bebida['nome']} acompanha {prato['nome']} como opção da casa."
+        return (f"{bebida['nome']} com {prato['nome']}: "
+                f"{' e '.join(motivos[c] for c in principais)} (nota {explicacao['total']:.2f}).")
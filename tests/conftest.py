@@ -0,0 +1,18 @@
+import os
+import sys
+
+import pytest
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+import Harmonizador
+
+@pytest.fixture(autouse=True)
+def catalogo_padrao():
+    """Puts back the built-in catalog and pricing source after each test"""
+    cardapio, bebidas_base, ocasioes = Harmonizador.cardapio, Harmonizador.bebidas_base, Harmonizador.ocasioes
+    fonte = Harmonizador.fonte_precos
+    yield
+    Harmonizador.instalar_catalogo(cardapio, bebidas_base, ocasioes)
+    Harmonizador.configurar_fonte_precos(fonte)
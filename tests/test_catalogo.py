@@ -0,0 +1,85 @@
+import json
+import os
+
+import pytest
+
+import Harmonizador
+from Harmonizador import ListaCatalogo, MenuEngine, Prato, adicionar_prato, indice_cardapio
+from harmonizador_catalogo import ArmazemCatalogo, TabelaCatalogo, exportar_catalogo_json
+
+@pytest.fixture
+def catalogo_json(tmp_path):
+    caminho = str(tmp_path / "catalogo.json")
+    exportar_catalogo_json(caminho)
+    return caminho
+
+def reescrever(caminho, dados):
+    """Writes ``dados`` and moves the mtime forward, whatever the filesystem's granularity"""
+    estado = os.stat(caminho)
+    with open(caminho, "w", encoding="utf-8") as arquivo:
+        if isinstance(dados, str):
+            arquivo.write(dados)
+        else:
+            json.dump(dados, arquivo, ensure_ascii=False)
+    os.utime(caminho, ns=(estado.st_atime_ns, estado.st_mtime_ns + 10**9))
+
+def nomes(itens):
+    return [item["nome"] for item in itens]
+
+def test_tabelas_mapeadas_iguais_ao_catalogo(catalogo_json):
+    cardapio, bebidas_base = Harmonizador.cardapio, Harmonizador.bebidas_base
+    ArmazemCatalogo(catalogo_json).carregar()
+    assert isinstance(Harmonizador.cardapio["principais"], TabelaCatalogo)
+    for categoria, itens in cardapio.items():
+        assert list(Harmonizador.cardapio[categoria]) == list(itens)
+    for categoria, itens in bebidas_base.items():
+        assert list(Harmonizador.bebidas_base[categoria]) == list(itens)
+    assert MenuEngine().generate({"ocasiao": "Amigos"}).valor_total > 0
+
+def test_recarga_a_quente(catalogo_json):
+    armazem = ArmazemCatalogo(catalogo_json)
+    armazem.carregar()
+    sobremesas = indice_cardapio().filtrar("sobremesas")
+
+    with open(catalogo_json, encoding="utf-8") as arquivo:
+        dados = json.load(arquivo)
+    dados["cardapio"]["principais"].append(
+        {"nome": "Prato Novo", "tipo": "francesa", "dieta": "carnes", "intensidade": "alta"})
+    reescrever(catalogo_json, dados)
+
+    assert armazem.verificar()
+    assert armazem.versao == 2
+    assert "Prato Novo" in nomes(Harmonizador.cardapio["principais"])
+    assert "Prato Novo" in nomes(indice_cardapio().filtrar("principais", "francesa", "carnes"))
+    # Requests still holding the previous version keep reading it
+    assert nomes(sobremesas)
+
+@pytest.mark.parametrize("conteudo", [
+    "{ isto não é json",
+    lambda dados: dict(dados, cardapio=dict(dados["cardapio"], entradas=[])),
+    lambda dados: dict(dados, cardapio=dict(dados["cardapio"], principais=[{"tipo": "francesa"}])),
+])
+def test_catalogo_invalido_mantem_a_versao_atual(catalogo_json, conteudo):
+    armazem = ArmazemCatalogo(catalogo_json)
+    armazem.carregar()
+    principais = nomes(Harmonizador.cardapio["principais"])
+
+    with open(catalogo_json, encoding="utf-8") as arquivo:
+        dados = json.load(arquivo)
+    reescrever(catalogo_json, conteudo if isinstance(conteudo, str) else conteudo(dados))
+
+    assert not armazem.verificar()
+    assert armazem.versao == 1
+    assert nomes(Harmonizador.cardapio["principais"]) == principais
+    # Not retried until the file changes again
+    assert not armazem.verificar()
+
+def test_primeira_edicao_copia_a_tabela(catalogo_json):
+    ArmazemCatalogo(catalogo_json).carregar()
+    indice = indice_cardapio()
+    adicionar_prato("principais", Prato(nome="Prato Novo", tipo="italiana", dieta="vegana", intensidade="leve"))
+    assert isinstance(Harmonizador.cardapio["principais"], ListaCatalogo)
+    assert indice_cardapio() is indice
+    assert "Prato Novo" in nomes(indice.filtrar("principais", "italiana", "vegana"))
+    # Other categories are still served from the mapping
+    assert isinstance(Harmonizador.cardapio["entradas"], TabelaCatalogo)
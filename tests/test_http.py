@@ -0,0 +1,62 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+pytest.importorskip("requests")
+
+from Harmonizador import PRECO_PADRAO_PRATO, catalogo_online
+from harmonizador_http import ClientePrecosHttp, ServidorPrecosLocal
+
+PRATO = next(iter(catalogo_online.pratos))
+BEBIDA = next(iter(catalogo_online.bebidas))
+
+def test_busca_e_desconhecidos():
+    with ServidorPrecosLocal() as servidor:
+        cliente = ClientePrecosHttp(servidor.url)
+        assert cliente.buscar(prato=PRATO)["preco"] == catalogo_online.pratos[PRATO]["preco"]
+        desconhecido = cliente.buscar(prato="Prato Inexistente")
+        assert desconhecido == {"preco": PRECO_PADRAO_PRATO, "gastronomia": "desconhecida"}
+        cliente.fechar()
+
+def test_lote_preenche_desconhecidos():
+    with ServidorPrecosLocal() as servidor:
+        cliente = ClientePrecosHttp(servidor.url)
+        dados = cliente.buscar_lote(pratos=[PRATO, "Prato Inexistente"], bebidas=[BEBIDA])
+        assert dados["pratos"][PRATO]["preco"] == catalogo_online.pratos[PRATO]["preco"]
+        assert dados["pratos"]["Prato Inexistente"]["gastronomia"] == "desconhecida"
+        assert dados["bebidas"][BEBIDA]["preco"] == catalogo_online.bebidas[BEBIDA]["preco"]
+        assert servidor.requisicoes == 1
+        cliente.fechar()
+
+def test_repete_apos_503():
+    with ServidorPrecosLocal(falhas=2) as servidor:
+        cliente = ClientePrecosHttp(servidor.url, tentativas=3, backoff=0)
+        assert cliente.buscar(prato=PRATO)["preco"] == catalogo_online.pratos[PRATO]["preco"]
+        assert servidor.requisicoes == 3
+        assert cliente.requisicoes == 3
+        cliente.fechar()
+
+def test_tentativas_esgotadas_viram_erro():
+    with ServidorPrecosLocal(falhas=5) as servidor:
+        cliente = ClientePrecosHttp(servidor.url, tentativas=2, backoff=0)
+        assert "erro" in cliente.buscar(prato=PRATO)
+        assert servidor.requisicoes == 2
+        cliente.fechar()
+
+def test_consultas_simultaneas_compartilham_uma_requisicao():
+    chamadores = 8
+    with ServidorPrecosLocal(latencia=0.3) as servidor:
+        cliente = ClientePrecosHttp(servidor.url)
+        largada = threading.Barrier(chamadores)
+
+        def buscar(_):
+            largada.wait()
+            return cliente.buscar(prato=PRATO)
+
+        with ThreadPoolExecutor(chamadores) as executor:
+            resultados = list(executor.map(buscar, range(chamadores)))
+        assert all(r["preco"] == catalogo_online.pratos[PRATO]["preco"] for r in resultados)
+        assert servidor.requisicoes == 1
+        assert cliente.coalescidas == chamadores - 1
+        cliente.fechar()
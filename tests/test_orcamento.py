@@ -0,0 +1,78 @@
+"""Budget optimizer against brute force, on random prices of the built-in catalog.
+
+Each case draws random integer prices for the dishes and drinks, a random
+context and a random budget, then compares the scores of
+``MenuEngine.otimizar`` with the best scores found by enumerating every
+complete menu.
+"""
+import itertools
+import random
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from Harmonizador import (MOCK_API_DATA, CatalogoOnline, MenuEngine, candidatos_cardapio,
+                          configurar_fonte_precos, fetch_online_data, ocasioes)
+
+TIPOS_BEBIDA = ("vinhos", "cervejas")
+
+def dados_aleatorios(rng):
+    """Copy of MOCK_API_DATA with random integer prices"""
+    dados = {secao: dict(itens) for secao, itens in MOCK_API_DATA.items()}
+    for secao in ("pratos", "bebidas"):
+        dados[secao] = {nome: dict(info, preco=rng.randint(5, 150)) for nome, info in dados[secao].items()}
+    return dados
+
+def forca_bruta(engine, contexto, orcamento, quantidade):
+    """Best ``quantidade`` scores among every complete menu within budget"""
+    resolvido = engine.resolver_contexto(contexto)
+    pontuador = engine._otimizador[1].pontuador
+    tipo = resolvido["tipo_bebida"]
+    cursos = (
+        (candidatos_cardapio("entradas", resolvido["cozinha"], resolvido["dieta_entrada"], None,
+                             resolvido["intensidade"]), (tipo,)),
+        (candidatos_cardapio("principais", resolvido["cozinha"], resolvido["dieta_principal"], None,
+                             resolvido["intensidade"]), (tipo,)),
+        (engine.ia.opcoes_sobremesa(resolvido), ("digestivos", "sem_alcool")),
+    )
+
+    # Every (cost, score) of each course: one dish plus one drink per slot
+    opcoes = []
+    for pratos, tipos in cursos:
+        pratos = list(pratos)
+        notas = pontuador.pontuar(pratos)
+        curso = []
+        for i, prato in enumerate(pratos):
+            slots = [np.flatnonzero(pontuador.categorias == t).tolist() for t in tipos]
+            for bebidas in itertools.product(*slots):
+                custo = fetch_online_data(prato=prato["nome"])["preco"] + sum(
+                    fetch_online_data(bebida=pontuador.bebidas[j]["nome"])["preco"] for j in bebidas)
+                curso.append((custo, sum(float(notas[i, j]) for j in bebidas)))
+        opcoes.append(curso)
+
+    validas = sorted((sum(n for _, n in combinacao) for combinacao in itertools.product(*opcoes)
+                      if sum(c for c, _ in combinacao) <= orcamento), reverse=True)
+    return validas[:quantidade]
+
+def conferir(engine, contexto, orcamento, quantidade):
+    obtidos = engine.otimizar(contexto, orcamento, quantidade)
+    esperados = forca_bruta(engine, contexto, orcamento, quantidade)
+    assert [round(nota, 4) for nota, _ in obtidos] == [round(nota, 4) for nota in esperados]
+    assert all(menu.valor_total <= orcamento for _, menu in obtidos)
+
+@pytest.mark.parametrize("semente", range(50))
+def test_otimizador_igual_forca_bruta(semente):
+    rng = random.Random(semente)
+    configurar_fonte_precos(CatalogoOnline(dados_aleatorios(rng)))
+    engine = MenuEngine()
+    contexto = {"ocasiao": rng.choice(list(ocasioes)), "tipo_bebida": rng.choice(TIPOS_BEBIDA)}
+    orcamento = rng.randint(40, 600)
+    conferir(engine, contexto, orcamento, 3)
+
+    # Same engine after a price change: results must follow the new prices
+    configurar_fonte_precos(CatalogoOnline(dados_aleatorios(rng)))
+    conferir(engine, contexto, orcamento, 3)
+
+def test_orcamento_insuficiente_sem_menus():
+    assert MenuEngine().otimizar({"ocasiao": "Amigos"}, 1) == []
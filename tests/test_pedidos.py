@@ -0,0 +1,27 @@
+import pytest
+
+from Harmonizador import InterpretadorPedidos
+
+@pytest.fixture(scope="module")
+def interpretador():
+    return InterpretadorPedidos()
+
+@pytest.mark.parametrize("texto, esperado", [
+    ("quero algo vegano com vinho", {"dieta": "vegana", "bebida": "vinhos"}),
+    ("comida francesa leve", {"cozinha": "francesa", "intensidade": "leve"}),
+    ("nada de carne, prefiro peixe", {"dieta": "peixes"}),
+    ("sem carne nem peixe, italiana", {"dieta": "vegetariana", "cozinha": "italiana"}),
+    ("nada de carne, e italiana", {"cozinha": "italiana"}),
+    ("não quero carne ou peixe muito pesado", {}),
+    ("orçamento de R$ 250", {"orcamento": 250.0}),
+    ("até 300 reais para 4 pessoas", {"orcamento": 300.0}),
+])
+def test_interpretar(interpretador, texto, esperado):
+    assert interpretador.interpretar(texto) == esperado
+
+def test_textos_posteriores_prevalecem(interpretador):
+    assert interpretador.interpretar("italiana", "francesa") == {"cozinha": "francesa"}
+
+def test_lexico_proprio():
+    interpretador = InterpretadorPedidos({"cozinha": {"japonesa": ("sushi", "japones")}})
+    assert interpretador.interpretar("Hoje é dia de SUSHI") == {"cozinha": "japonesa"}
@@ -0,0 +1,146 @@
+import asyncio
+
+import pytest
+
+from Harmonizador import (PRECO_PADRAO_PRATO, CachePrecos, MenuEngine, PrecificadorAsync, TransporteSimulado,
+                          catalogo_online, configurar_fonte_precos, versao_dados)
+
+class Relogio:
+    def __init__(self):
+        self.agora = 0.0
+
+    def __call__(self):
+        return self.agora
+
+class FonteContada:
+    """Pricing source that counts lookups; names outside ``precos`` are unknown"""
+
+    def __init__(self, **precos):
+        self.precos = precos
+        self.chamadas = 0
+
+    def buscar(self, prato=None, bebida=None, gastronomia=None):
+        self.chamadas += 1
+        if prato in self.precos:
+            return {"preco": self.precos[prato], "gastronomia": "italiana"}
+        if prato == "quebrado":
+            return {"erro": "Falha simulada"}
+        return {"preco": PRECO_PADRAO_PRATO, "gastronomia": "desconhecida"}
+
+def esperar_revalidacoes(cache):
+    if cache._executor is not None:
+        cache._executor.shutdown(wait=True)
+        cache._executor = None
+
+# ================== CACHE DE PREÇOS ==================
+def test_cache_serve_dentro_do_ttl():
+    relogio = Relogio()
+    fonte = FonteContada(risoto=60)
+    cache = CachePrecos(fonte, ttl=10, relogio=relogio)
+    assert cache.buscar(prato="risoto")["preco"] == 60
+    relogio.agora = 9
+    assert cache.buscar(prato="risoto")["preco"] == 60
+    assert fonte.chamadas == 1
+    assert cache.estatisticas()["hits"] == 1
+
+def test_desconhecidos_expiram_antes():
+    relogio = Relogio()
+    fonte = FonteContada()
+    cache = CachePrecos(fonte, ttl=300, ttl_negativo=5, janela_stale=0, relogio=relogio)
+    cache.buscar(prato="novo")
+    relogio.agora = 6
+    cache.buscar(prato="novo")
+    assert fonte.chamadas == 2
+
+def test_erros_nao_ficam_no_cache():
+    fonte = FonteContada()
+    cache = CachePrecos(fonte)
+    assert "erro" in cache.buscar(prato="quebrado")
+    assert "erro" in cache.buscar(prato="quebrado")
+    assert fonte.chamadas == 2
+
+def test_lru_descarta_o_menos_usado():
+    fonte = FonteContada(a=1, b=2, c=3)
+    cache = CachePrecos(fonte, max_itens=2)
+    cache.buscar(prato="a")
+    cache.buscar(prato="b")
+    cache.buscar(prato="a")
+    cache.buscar(prato="c")  # evicts b, the least recently used
+    assert cache.estatisticas()["evictions"] == 1
+    chamadas = fonte.chamadas
+    cache.buscar(prato="a")
+    assert fonte.chamadas == chamadas
+    cache.buscar(prato="b")
+    assert fonte.chamadas == chamadas + 1
+
+def test_stale_while_revalidate():
+    relogio = Relogio()
+    fonte = FonteContada(risoto=60)
+    cache = CachePrecos(fonte, ttl=10, janela_stale=100, relogio=relogio)
+    configurar_fonte_precos(cache)
+    cache.buscar(prato="risoto")
+    versao = versao_dados()
+
+    fonte.precos["risoto"] = 75
+    relogio.agora = 15
+    # Expired but inside the stale window: the old price now, a refresh in the background
+    assert cache.buscar(prato="risoto")["preco"] == 60
+    esperar_revalidacoes(cache)
+    assert cache.buscar(prato="risoto")["preco"] == 75
+
+    estatisticas = cache.estatisticas()
+    assert estatisticas["stale_hits"] == 1
+    assert estatisticas["revalidacoes"] == 1
+    assert versao_dados() != versao
+
+def test_fora_da_janela_stale_busca_de_novo():
+    relogio = Relogio()
+    fonte = FonteContada(risoto=60)
+    cache = CachePrecos(fonte, ttl=10, janela_stale=5, relogio=relogio)
+    cache.buscar(prato="risoto")
+    fonte.precos["risoto"] = 75
+    relogio.agora = 20
+    assert cache.buscar(prato="risoto")["preco"] == 75
+    assert cache.estatisticas()["stale_hits"] == 0
+
+def test_lote_busca_so_o_que_falta():
+    fonte = FonteContada(a=1, b=2)
+    cache = CachePrecos(fonte)
+    cache.buscar(prato="a")
+    resultado = cache.buscar_lote(pratos=["a", "b"])
+    assert {nome: dados["preco"] for nome, dados in resultado["pratos"].items()} == {"a": 1, "b": 2}
+    assert fonte.chamadas == 2
+
+# ================== PRECIFICAÇÃO ASSÍNCRONA ==================
+def test_precificador_falhas_e_timeout_viram_erro():
+    prato = next(iter(catalogo_online.pratos))
+    falhando = PrecificadorAsync(TransporteSimulado(latencia=0.01, falhas={prato}))
+    assert "erro" in asyncio.run(falhando.buscar(prato=prato))
+    lento = PrecificadorAsync(TransporteSimulado(latencia=1.0), timeout=0.05)
+    assert "Tempo esgotado" in asyncio.run(lento.buscar(prato=prato))["erro"]
+
+def test_menu_async_com_transporte_simulado():
+    transporte = TransporteSimulado(latencia=0.01)
+    precificador = PrecificadorAsync(transporte, limite=4)
+    menu = asyncio.run(MenuEngine().generate_async({"ocasiao": "Amigos"}, precificador=precificador))
+    assert menu.valor_total > 0
+    assert transporte.chamadas > 0
+
+@pytest.mark.parametrize("limite", [1, 3])
+def test_precificador_respeita_o_limite(limite):
+    ativos = []
+    pico = []
+
+    async def transporte(prato=None, bebida=None, gastronomia=None):
+        ativos.append(prato)
+        pico.append(len(ativos))
+        await asyncio.sleep(0.01)
+        ativos.remove(prato)
+        return {"preco": 10}
+
+    async def varias():
+        precificador = PrecificadorAsync(transporte, limite=limite)
+        return await asyncio.gather(*(precificador.buscar(prato=str(i)) for i in range(8)))
+
+    assert all(r["preco"] == 10 for r in asyncio.run(varias()))
+    assert max(pico) == limite